@@ -0,0 +1,69 @@
+"""
+Benchmark for splitting email addresses into their local and domain parts.
+
+Compares :func:`email_normalize.split_address`, which only falls back to
+:func:`email.utils.parseaddr` for addresses with display names, quotes, or
+comments, with parsing every address using :func:`email.utils.parseaddr`.
+
+Usage::
+
+    python benchmarks/address_parsing.py --count 100000
+
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import typing
+from email import utils
+
+import email_normalize
+
+
+def addresses(count: int, display_ratio: float) -> typing.List[str]:
+    values = []
+    for offset in range(0, count):
+        address = 'User.{0}+tag@Domain-{1}.com'.format(offset, offset % 997)
+        if random.random() < display_ratio:
+            address = 'User {} <{}>'.format(offset, address)
+        values.append(address)
+    return values
+
+
+def split_parseaddr(email_address: str) -> typing.Tuple[str, str]:
+    local_part, domain_part = utils.parseaddr(
+        email_address)[1].lower().split('@')
+    return local_part, domain_part
+
+
+def run(name: str, values: typing.List[str],
+        split: typing.Callable[[str], typing.Any]) -> dict:
+    start = time.perf_counter()
+    for value in values:
+        split(value)
+    duration = time.perf_counter() - start
+    return {
+        'splitter': name,
+        'count': len(values),
+        'seconds': round(duration, 6),
+        'nsec_per_address': round(duration / len(values) * 1_000_000_000, 1)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--display-ratio', type=float, default=0.0,
+                        help='Ratio of addresses with a display name')
+    args = parser.parse_args()
+    random.seed(42)
+    values = addresses(args.count, args.display_ratio)
+    sys.stdout.write(json.dumps(run(
+        'parseaddr', values, split_parseaddr)) + '\n')
+    sys.stdout.write(json.dumps(run(
+        'split_address', values, email_normalize.split_address)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
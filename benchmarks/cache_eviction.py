@@ -0,0 +1,82 @@
+"""
+Benchmark for pruning the module level MX cache when it is at its limit.
+
+Each iteration mirrors a cache miss in :meth:`Normalizer.mx_records` on a full
+cache: the least frequently, least recently used item is evicted and a new
+item is inserted. The previous implementation, which sorted the entire cache on
+every prune, can be measured for comparison with ``--sorted``.
+
+Usage::
+
+    python benchmarks/cache_eviction.py --sizes 10000 100000 1000000
+
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import typing
+
+import email_normalize
+
+
+def populate(size: int) -> email_normalize.LFRUCache:
+    cache = email_normalize.LFRUCache()
+    for offset in range(0, size):
+        item = email_normalize.CachedItem([], 3600)
+        item.hits = random.randint(1, 100)
+        item.last_access = time.monotonic()
+        cache['domain-{}.com'.format(offset)] = item
+    return cache
+
+
+def prune_heap(cache: email_normalize.LFRUCache) -> None:
+    cache.evict()
+
+
+def prune_sorted(cache: email_normalize.LFRUCache) -> None:
+    key_to_prune = sorted(
+        cache.items(), key=lambda i: (i[1].hits, i[1].last_access))[0][0]
+    del cache[key_to_prune]
+
+
+def run(size: int, iterations: int,
+        prune: typing.Callable[[email_normalize.LFRUCache], None]) -> dict:
+    cache = populate(size)
+    keys = list(cache.keys())
+    start = time.perf_counter()
+    for offset in range(0, iterations):
+        # Touch an existing item the way a cache hit does
+        item = cache.get(random.choice(keys))
+        if item is not None:
+            item.hits += 1
+            item.last_access = time.monotonic()
+        prune(cache)
+        cache['new-{}.com'.format(offset)] = email_normalize.CachedItem(
+            [], 3600)
+    duration = time.perf_counter() - start
+    return {
+        'size': size,
+        'iterations': iterations,
+        'seconds': round(duration, 6),
+        'usec_per_op': round(duration / iterations * 1_000_000, 3)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--iterations', type=int, default=10_000)
+    parser.add_argument('--sorted', action='store_true',
+                        help='Benchmark the previous sort based pruning')
+    args = parser.parse_args()
+    random.seed(42)
+    prune = prune_sorted if args.sorted else prune_heap
+    for size in args.sizes:
+        sys.stdout.write(json.dumps(run(size, args.iterations, prune)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark for the memory used by MX record caches with many domains.
+
+Domains are generated so that ``--shared`` of them use one of a small number
+of MX record sets, as domains hosted by the same mailbox provider do, with
+the rest using MX records of their own. The memory allocated while filling
+each cache is measured with :mod:`tracemalloc`.
+
+Usage::
+
+    python benchmarks/cache_memory.py --sizes 100000 1000000
+
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import typing
+
+import email_normalize
+
+PROVIDER_RECORDS = [
+    [(1, 'aspmx.l.google.com'), (5, 'alt1.aspmx.l.google.com'),
+     (5, 'alt2.aspmx.l.google.com'), (10, 'alt3.aspmx.l.google.com'),
+     (10, 'alt4.aspmx.l.google.com')],
+    [(0, 'example-com.mail.protection.outlook.com')],
+    [(1, 'mta5.am0.yahoodns.net'), (1, 'mta6.am0.yahoodns.net'),
+     (1, 'mta7.am0.yahoodns.net')],
+    [(10, 'in1-smtp.messagingengine.com'),
+     (20, 'in2-smtp.messagingengine.com')],
+    [(10, 'mx1.emailsrvr.com'), (20, 'mx2.emailsrvr.com')]
+]
+
+CACHES = {
+    'lfru': email_normalize.LFRUCache,
+    'compact': email_normalize.CompactCache
+}
+
+
+def mx_records(offset: int, shared: float) -> typing.List[tuple]:
+    """Return the MX records for a domain as new objects, the way they are
+    returned by each DNS query.
+
+    """
+    if random.random() < shared:
+        return [(priority, ''.join(host)) for priority, host in
+                random.choice(PROVIDER_RECORDS)]
+    return [(10, 'mx1.domain-{}.com'.format(offset)),
+            (20, 'mx2.domain-{}.com'.format(offset))]
+
+
+def run(name: str, size: int, shared: float) -> dict:
+    random.seed(42)
+    gc.collect()
+    tracemalloc.start()
+    cache = CACHES[name]()
+    start = time.perf_counter()
+    for offset in range(0, size):
+        cache.set('domain-{}.com'.format(offset), email_normalize.CachedItem(
+            mx_records(offset, shared), 3600))
+    duration = time.perf_counter() - start
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        'cache': name,
+        'size': size,
+        'shared': shared,
+        'seconds': round(duration, 6),
+        'bytes': current,
+        'bytes_per_domain': round(current / size, 1)
+    }
+    if hasattr(cache, 'nbytes'):
+        result['nbytes'] = cache.nbytes
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100_000, 1_000_000])
+    parser.add_argument('--shared', type=float, default=0.7,
+                        help='Ratio of domains using a provider MX set')
+    parser.add_argument('--caches', nargs='+', choices=sorted(CACHES),
+                        default=sorted(CACHES))
+    args = parser.parse_args()
+    for size in args.sizes:
+        for name in args.caches:
+            sys.stdout.write(json.dumps(run(name, size, args.shared)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for the time taken to import the package in a new interpreter.
+
+Each module is imported ``--runs`` times in a fresh interpreter, after a warm
+up run so that the bytecode of the package is cached as it would be for an
+installed package. Each module prints a JSON line with the median and minimum
+time taken by the import, including the parent package and its dependencies,
+and which of the modules that should be deferred were loaded by it.
+
+Usage::
+
+    python benchmarks/import_time.py --runs 20
+
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import typing
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+MODULES = ['email_normalize', 'email_normalize.providers']
+
+# Modules that should only be loaded on the first DNS lookup
+DEFERRED = ['aiodns', 'pycares', 'sqlite3']
+
+VERSION = (ROOT / 'VERSION').read_text()
+
+SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(round(duration * 1_000_000))
+print(','.join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+
+def import_once(module: str) -> typing.Tuple[int, typing.List[str]]:
+    """Import the module in a new interpreter, returning the import time in
+    microseconds and the deferred modules that were loaded.
+
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    process = subprocess.run(
+        [sys.executable, '-c',
+         SCRIPT.format(module=module, deferred=DEFERRED)],
+        capture_output=True, check=True, env=env, text=True)
+    usec, loaded = (process.stdout.splitlines() + [''])[:2]
+    return int(usec), loaded.split(',') if loaded else []
+
+
+def run(module: str, runs: int) -> dict:
+    import_once(module)
+    timings, loaded = [], []
+    for _offset in range(0, runs):
+        usec, loaded = import_once(module)
+        timings.append(usec)
+    return {
+        'module': module,
+        'version': VERSION.strip(),
+        'python': platform.python_version(),
+        'runs': runs,
+        'median_usec': statistics.median(timings),
+        'min_usec': min(timings),
+        'loaded': loaded
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=20,
+                        help='Imports measured per module')
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    args = parser.parse_args()
+    for module in args.modules:
+        sys.stdout.write(json.dumps(run(module, args.runs)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
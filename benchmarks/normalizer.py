@@ -0,0 +1,222 @@
+"""
+Benchmark suite for Normalizer using an in-process fake DNS resolver.
+
+The fake resolver answers MX queries after a configurable latency, with a
+configurable TTL and failure rate, so that results do not depend on the
+network and can be compared between releases. Each scenario prints a JSON
+line with the throughput and the p50 and p99 latency of
+:meth:`Normalizer.normalize`:
+
+- ``cold``: every address is at a domain that is not cached
+- ``warm``: every address is at a domain that is already cached
+- ``eviction``: addresses are spread over more domains than the cache holds
+- ``burst``: concurrent callers for a few uncached domains
+- ``stream``: :meth:`Normalizer.stream` over a mix of cached and uncached
+  domains, with the latency measured from reading each address to yielding
+  its result
+
+Usage::
+
+    python benchmarks/normalizer.py --count 20000 --latency 0.005
+
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import platform
+import random
+import statistics
+import sys
+import time
+import typing
+import zlib
+
+from aiodns import error
+
+import email_normalize
+
+MX_HOSTS = [
+    'gmail-smtp-in.l.google.com',
+    'mta5.am0.yahoodns.net',
+    'example-com.mail.protection.outlook.com',
+    'mx.example.com'
+]
+
+VERSION = (pathlib.Path(__file__).parent.parent / 'VERSION').read_text()
+
+
+class FakeMXRecord(typing.NamedTuple):
+    host: str
+    priority: int
+    ttl: int
+
+
+class FakeResolver:
+    """Stands in for :class:`aiodns.DNSResolver`, answering MX queries after
+    ``latency`` seconds, plus up to ``jitter`` seconds, and failing
+    ``failure_rate`` of the queries with ``failure_code``.
+
+    """
+    def __init__(self, latency: float = 0.005, jitter: float = 0.0,
+                 ttl: int = 300, failure_rate: float = 0.0,
+                 failure_code: int = error.ARES_ENOTFOUND):
+        self.failure_code = failure_code
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self.latency = latency
+        self.queries = 0
+        self.ttl = ttl
+
+    def query(self, host: str, qtype: str) -> asyncio.Future:
+        self.queries += 1
+        return asyncio.ensure_future(self._query(host))
+
+    async def _query(self, host: str) -> typing.List[FakeMXRecord]:
+        await asyncio.sleep(self.latency + random.random() * self.jitter)
+        if random.random() < self.failure_rate:
+            raise error.DNSError(self.failure_code, 'Fake failure')
+        mx_host = MX_HOSTS[zlib.crc32(host.encode()) % len(MX_HOSTS)]
+        return [FakeMXRecord(mx_host, 10, self.ttl)]
+
+
+def addresses(count: int, domains: int) -> typing.List[str]:
+    return ['user.{0}+tag@domain-{1}.com'.format(offset, offset % domains)
+            for offset in range(0, count)]
+
+
+async def measure(normalizer: email_normalize.Normalizer,
+                  values: typing.List[str],
+                  concurrency: int) -> typing.Tuple[float, typing.List[float]]:
+    """Normalize the addresses with ``concurrency`` callers, returning the
+    total duration and the latency of each call.
+
+    """
+    pending = iter(values)
+    latencies = []
+
+    async def worker() -> None:
+        for value in pending:
+            start = time.perf_counter()
+            await normalizer.normalize(value)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _offset in range(0, concurrency)])
+    return time.perf_counter() - start, latencies
+
+
+async def measure_stream(normalizer: email_normalize.Normalizer,
+                         values: typing.List[str], window: int) \
+        -> typing.Tuple[float, typing.List[float]]:
+    """Normalize the addresses with :meth:`Normalizer.stream`, returning the
+    total duration and the time from reading each address to its result.
+
+    """
+    read_at: typing.Dict[str, float] = {}
+    latencies = []
+
+    async def source() -> typing.AsyncIterator[str]:
+        for value in values:
+            read_at[value] = time.perf_counter()
+            yield value
+
+    start = time.perf_counter()
+    async for result in normalizer.stream(source(), window):
+        latencies.append(time.perf_counter() - read_at.pop(result.address))
+    return time.perf_counter() - start, latencies
+
+
+def summarize(scenario: str, duration: float, latencies: typing.List[float],
+              resolver: FakeResolver, cache_limit: int) -> dict:
+    quantiles = statistics.quantiles(latencies, n=100) \
+        if len(latencies) > 1 else latencies * 99
+    return {
+        'scenario': scenario,
+        'version': VERSION.strip(),
+        'python': platform.python_version(),
+        'count': len(latencies),
+        'cache_limit': cache_limit,
+        'queries': resolver.queries,
+        'seconds': round(duration, 6),
+        'ops_per_sec': round(len(latencies) / duration, 1),
+        'p50_usec': round(quantiles[49] * 1_000_000, 3),
+        'p99_usec': round(quantiles[98] * 1_000_000, 3)
+    }
+
+
+async def run(scenario: str, args: argparse.Namespace) -> dict:
+    cache_limit = args.cache_limit
+    concurrency = args.concurrency
+    if scenario == 'cold':
+        values = addresses(args.count, args.count)
+        cache_limit = max(cache_limit, args.count)
+    elif scenario == 'warm':
+        values = addresses(args.count, args.domains)
+        cache_limit = max(cache_limit, args.domains)
+    elif scenario == 'eviction':
+        values = addresses(args.count, cache_limit * 10)
+        random.shuffle(values)
+    elif scenario == 'stream':
+        values = addresses(args.count, args.domains * 2)
+        random.shuffle(values)
+        cache_limit = max(cache_limit, args.domains * 2)
+    else:
+        values = addresses(args.count, 10)
+        concurrency = args.burst
+
+    resolver = FakeResolver(args.latency, args.jitter, args.ttl,
+                            args.failure_rate)
+    normalizer = email_normalize.Normalizer(
+        cache_limit=cache_limit, cache=email_normalize.LFRUCache(),
+        resolver=resolver)
+    if scenario == 'warm':
+        await normalizer.mx_records_many(
+            {value.split('@')[1] for value in values}, concurrency)
+        resolver.queries = 0
+    elif scenario == 'stream':
+        await normalizer.mx_records_many(
+            ['domain-{}.com'.format(offset)
+             for offset in range(0, args.domains)], concurrency)
+        resolver.queries = 0
+    if scenario == 'stream':
+        duration, latencies = await measure_stream(
+            normalizer, values, args.window)
+    else:
+        duration, latencies = await measure(normalizer, values, concurrency)
+    return summarize(scenario, duration, latencies, resolver, cache_limit)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scenarios', nargs='+',
+                        choices=['cold', 'warm', 'eviction', 'burst',
+                                 'stream'],
+                        default=['cold', 'warm', 'eviction', 'burst',
+                                 'stream'])
+    parser.add_argument('--count', type=int, default=20_000,
+                        help='Addresses normalized per scenario')
+    parser.add_argument('--domains', type=int, default=1_000,
+                        help='Distinct domains in the warm scenario')
+    parser.add_argument('--cache-limit', type=int, default=1_024)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--burst', type=int, default=1_000,
+                        help='Concurrent callers in the burst scenario')
+    parser.add_argument('--window', type=int, default=1_000,
+                        help='In-flight window in the stream scenario')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds each fake DNS query takes')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Maximum random seconds added to the latency')
+    parser.add_argument('--ttl', type=int, default=300,
+                        help='TTL of the fake MX records')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='Ratio of fake DNS queries that fail')
+    args = parser.parse_args()
+    random.seed(42)
+    for scenario in args.scenarios:
+        sys.stdout.write(json.dumps(asyncio.run(run(scenario, args))) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,40 +7,66 @@ specific behaviors such as "Plus addressing" (foo+bar@gmail.com).
 
 """
 import asyncio
-import copy
+import bisect
+import collections
+import concurrent.futures
 import dataclasses
+import enum
+import functools
 import logging
+import math
 import operator
+import re
+import threading
 import time
 import typing
-from email import utils
 
-import aiodns
-from aiodns import error
+from email_normalize import caches, providers
+from email_normalize.caches import (CacheBackend, CachedItem, CompactCache,
+                                    FrozenMXRecords, LFRUCache, MXRecords,
+                                    SQLiteCache, ShardedCache, StripedCache)
+from email_normalize.resolvers import ResolverPool
 
-from email_normalize import providers
+if typing.TYPE_CHECKING:  # pragma: nocover
+    from aiodns import error
 
-LOGGER = logging.getLogger(__name__)
-
-MXRecords = typing.List[typing.Tuple[int, str]]
+__all__ = [
+    'CacheBackend',
+    'CachedItem',
+    'CompactCache',
+    'FrozenMXRecords',
+    'InvalidAddressError',
+    'LFRUCache',
+    'MXRecords',
+    'Normalizer',
+    'ParseError',
+    'ResolverPool',
+    'Result',
+    'SQLiteCache',
+    'ShardedCache',
+    'SplitAddress',
+    'StripedCache',
+    'SyncNormalizer',
+    'bare_address',
+    'cache',
+    'lookup_provider',
+    'normalize',
+    'split_address'
+]
 
-cache: typing.Dict[str, 'CachedItem'] = {}
+LOGGER = logging.getLogger(__name__)
 
+DEFAULT_FAILURE_TTLS = {'servfail': 30, 'timeout': 30}
+TRANSIENT_FAILURES = {'error', 'servfail', 'timeout'}
 
-class CachedItem:
-    """Used to represent a cached lookup for implementing a LFRU cache"""
-    __slots__ = ['cached_at', 'hits', 'last_access', 'mx_records', 'ttl']
+# Upper bounds in seconds of the DNS query latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
 
-    def __init__(self, mx_records: MXRecords, ttl: int):
-        self.cached_at = time.monotonic()
-        self.hits = 0
-        self.last_access: float = 0.0
-        self.mx_records = mx_records
-        self.ttl = ttl
+# Characters that indicate an address is not a bare local@domain address
+NEEDS_PARSING = re.compile(r'[<>"()\s,;:\[\]]')
 
-    @property
-    def expired(self):
-        return (time.monotonic() - self.cached_at) > self.ttl
+cache = LFRUCache()
 
 
 @dataclasses.dataclass(frozen=True)
@@ -55,7 +81,7 @@ class Result:
     :param mx_records: A list of tuples representing the priority and host of
         the MX records found for the email address. If empty, indicates a
         failure to lookup the domain part of the email address.
-    :type mx_records: :data:`~email_normalize.MXRecords`
+    :type mx_records: :class:`~email_normalize.FrozenMXRecords`
     :param mailbox_provider: String that represents the mailbox provider name
         - is `None` if the mailbox provider could not be detected or
         was unsupported.
@@ -63,7 +89,10 @@ class Result:
 
     .. note:: If during the normalization process the MX records could not be
         resolved, the ``mx_records`` attribute will be an empty :class:`list`
-        and the ``mailbox_provider`` attribute will be :data:`None`.
+        and the ``mailbox_provider`` attribute will be :data:`None`. When the
+        address was normalized without DNS resolution by
+        :meth:`Normalizer.normalize_local`, the ``mx_records`` attribute
+        will be an empty :class:`list` and the ``mailbox_provider`` is set.
 
     **Example**
 
@@ -89,6 +118,124 @@ class Result:
     mailbox_provider: typing.Optional[str] = None
 
 
+class ParseError(enum.Enum):
+    """Reasons an email address could not be split into its local and
+    domain parts.
+
+    """
+    EMPTY = 'empty'
+    MISSING_AT = 'missing-at'
+    MULTIPLE_AT = 'multiple-at'
+    EMPTY_LOCAL_PART = 'empty-local-part'
+    EMPTY_DOMAIN_PART = 'empty-domain-part'
+
+
+class InvalidAddressError(ValueError):
+    """Raised when an email address can not be split into its local and
+    domain parts.
+
+    :param str email_address: The address that could not be split
+    :param error: The reason the address could not be split
+    :type error: :class:`~email_normalize.ParseError`
+
+    """
+    def __init__(self, email_address: str, error: ParseError):
+        super().__init__('Invalid email address {!r}: {}'.format(
+            email_address, error.value))
+        self.email_address = email_address
+        self.error = error
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self.email_address, self.error)
+
+
+class SplitAddress(typing.NamedTuple):
+    """The lowercased local and domain parts of an email address returned by
+    :func:`~email_normalize.split_address`. If the address could not be
+    split, ``error`` indicates why and the parts are empty.
+
+    """
+    local_part: str
+    domain_part: str
+    error: typing.Optional[ParseError] = None
+
+
+def bare_address(email_address: str) -> str:
+    """Return the ``local@domain`` part of an email address in the case it
+    was given in, without surrounding whitespace. Addresses with display
+    names, angle brackets, quotes, or comments are parsed with
+    :func:`email.utils.parseaddr`, returning an empty string if they can not
+    be parsed.
+
+    :param email_address: The address to return the bare address of
+    :rtype: str
+
+    """
+    address = email_address.strip()
+    if NEEDS_PARSING.search(address):
+        from email import utils  # Only loaded for addresses that need it
+
+        address = utils.parseaddr(address)[1]
+    return address
+
+
+def split_address(email_address: str) -> SplitAddress:
+    """Split an email address into its lowercased local and domain parts.
+
+    Bare ``local@domain`` addresses are split directly. Addresses with
+    display names, angle brackets, quotes, or comments are parsed with
+    :func:`email.utils.parseaddr` first. Invalid addresses do not raise an
+    exception, instead the ``error`` attribute of the result is set.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        local_part, domain_part, error = email_normalize.split_address(
+            'Foo Bar <foo+bar@gmail.com>')
+
+    :param email_address: The address to split
+    :rtype: :class:`~email_normalize.SplitAddress`
+
+    """
+    address = bare_address(email_address)
+    if not address:
+        return SplitAddress('', '', ParseError.EMPTY)
+    parts = address.lower().split('@')
+    if len(parts) != 2:
+        return SplitAddress('', '', ParseError.MISSING_AT
+                            if len(parts) == 1 else ParseError.MULTIPLE_AT)
+    elif not parts[0]:
+        return SplitAddress('', '', ParseError.EMPTY_LOCAL_PART)
+    elif not parts[1]:
+        return SplitAddress('', '', ParseError.EMPTY_DOMAIN_PART)
+    return SplitAddress(parts[0], parts[1])
+
+
+def lookup_provider(mx_records: MXRecords) \
+        -> typing.Optional[typing.Type[providers.MailboxProvider]]:
+    """Return the mailbox provider for the MX records of a domain, or
+    :data:`None` if no provider matches. The provider is memoized on
+    :class:`~email_normalize.FrozenMXRecords`, such as those of a
+    :class:`~email_normalize.Result`, so that it is only matched once per
+    cached domain.
+
+    :param mx_records: The MX records to match
+    :type mx_records: :data:`~email_normalize.MXRecords`
+    :rtype: type or None
+
+    """
+    try:
+        return mx_records.provider
+    except AttributeError:
+        pass
+    provider = providers.lookup_hosts(
+        tuple(host for _priority, host in mx_records))
+    if isinstance(mx_records, FrozenMXRecords):
+        mx_records.provider = provider
+    return provider
+
+
 class Normalizer:
     """Class for normalizing an email address and resolving MX records.
 
@@ -100,8 +247,9 @@ class Normalizer:
     address.
 
     This class implements a least frequent recently used cache that respects
-    the DNS TTL returned when performing MX lookups. Data is cached at the
-    **module** level.
+    the DNS TTL returned when performing MX lookups. By default, data is
+    cached at the **module** level. Concurrent lookups for a domain that is
+    not cached share a single in-flight DNS query.
 
     **Usage Example**
 
@@ -111,10 +259,20 @@ class Normalizer:
             normalizer = email_normalize.Normalizer()
             return await normalizer.normalize('foo@bar.io')
 
-    :param name_servers: Optional list of hostnames to use for DNS resolution
+    :param name_servers: Optional list of hostnames to use for DNS resolution.
+        Ignored when a `resolver` is passed in.
     :type name_servers: list(str) or None
     :param int cache_limit: The maximum number of domain results that are
         cached. Defaults to `1024`.
+    :param cache_limit_bytes: Optional maximum estimated size of the cache
+        in bytes, requiring a cache that estimates its size such as the
+        :class:`~email_normalize.CompactCache`
+    :type cache_limit_bytes: int or None
+    :param int result_cache_size: The maximum number of results of
+        :meth:`normalize` remembered by address, so that normalizing the
+        same address again does not repeat the work. A result is discarded
+        once the MX records of its domain expire or are removed from the
+        cache. Defaults to `0`, which disables remembering results.
 
     :param bool cache_failures: Toggle the behavior of caching DNS resolution
         failures for a given domain. When enabled, failures will be cached
@@ -122,6 +280,56 @@ class Normalizer:
     :param int failure_ttl: Duration in seconds to cache DNS failures. Only
         works when `cache_failures` is set to `True`. Defaults to `300`
         seconds.
+    :param persistent_cache: Optional persistent cache that is checked for a
+        domain prior to performing DNS resolution and that resolved MX
+        records are written to, shared by processes using the same cache.
+    :type persistent_cache: :class:`~email_normalize.SQLiteCache` or None
+    :param cache: Optional cache to use instead of the module level cache,
+        such as a :class:`~email_normalize.ShardedCache` or a cache that is
+        private to this normalizer. Normalizers running in different threads
+        should share a :class:`~email_normalize.StripedCache` instead of the
+        module level cache, which is not thread safe.
+    :type cache: :class:`~email_normalize.CacheBackend` or None
+    :param bool offline: When enabled, addresses at well known domains of
+        mailbox providers, such as ``gmail.com``, are normalized without
+        performing DNS resolution. See :meth:`normalize_local`. Defaults to
+        `False`.
+    :param failure_ttls: Duration in seconds to cache DNS failures by the
+        class of failure: ``nxdomain``, ``nodata``, ``servfail``,
+        ``timeout``, or ``error`` for any other failure. Classes that are not
+        specified use `failure_ttl`. Defaults to `30` seconds for
+        ``servfail`` and ``timeout``.
+    :type failure_ttls: dict(str, int) or None
+    :param float refresh_ahead: When greater than `0`, popular cached
+        domains are resolved again in the background once less than this
+        fraction of their TTL remains, so that they do not expire. Defaults
+        to `0`.
+    :param int refresh_hits: The number of hits for a cached domain to be
+        considered popular for `refresh_ahead`. Defaults to `10`.
+    :param float serve_stale: Duration in seconds that expired MX records
+        are returned for while they are resolved again in the background.
+        Defaults to `0`.
+    :param on_hit: Optional callback invoked with the domain when its MX
+        records are found in the cache
+    :type on_hit: typing.Callable[[str], None] or None
+    :param on_miss: Optional callback invoked with the domain when its MX
+        records are not in the cache
+    :type on_miss: typing.Callable[[str], None] or None
+    :param on_evict: Optional callback invoked with the domain that was
+        evicted when the cache is at `cache_limit`
+    :type on_evict: typing.Callable[[str], None] or None
+    :param on_resolve: Optional callback invoked with the domain, the
+        duration of the DNS query in seconds, and the class of failure or
+        :data:`None` if the query succeeded
+    :type on_resolve: typing.Callable[[str, float, str or None], None] or None
+    :param resolver: Optional resolver pool to query DNS with, which may be
+        shared with other normalizers on the same event loop to limit the
+        number of outstanding queries. Use a pool to configure the timeout,
+        tries, rotation, and TCP behavior of the resolvers.
+    :type resolver: :class:`~email_normalize.ResolverPool` or None
+
+    Callbacks are invoked on the event loop and must not block. See
+    :meth:`stats` for the counters that are kept regardless of callbacks.
 
     """
 
@@ -129,48 +337,129 @@ class Normalizer:
                  name_servers: typing.Optional[typing.List[str]] = None,
                  cache_limit: int = 1024,
                  cache_failures: bool = True,
-                 failure_ttl: int = 300) -> 'Normalizer':
-        self._resolver = aiodns.DNSResolver(name_servers)
+                 failure_ttl: int = 300,
+                 persistent_cache: typing.Optional[SQLiteCache] = None,
+                 cache: typing.Optional[CacheBackend] = None,
+                 offline: bool = False,
+                 failure_ttls: typing.Optional[typing.Dict[str, int]] = None,
+                 refresh_ahead: float = 0.0,
+                 refresh_hits: int = 10,
+                 serve_stale: float = 0.0,
+                 on_hit: typing.Optional[typing.Callable[[str], None]] = None,
+                 on_miss: typing.Optional[typing.Callable[[str], None]] = None,
+                 on_evict: typing.Optional[
+                     typing.Callable[[str], None]] = None,
+                 on_resolve: typing.Optional[typing.Callable[
+                     [str, float, typing.Optional[str]], None]] = None,
+                 resolver: typing.Optional[ResolverPool] = None,
+                 cache_limit_bytes: typing.Optional[int] = None,
+                 result_cache_size: int = 0) \
+            -> 'Normalizer':
+        # The module level cache is shadowed by the cache argument
+        self.cache = cache if cache is not None else globals()['cache']
+        if cache_limit_bytes is not None and not hasattr(self.cache, 'nbytes'):
+            raise ValueError(
+                'cache_limit_bytes requires a cache that estimates its size, '
+                'such as CompactCache')
+        self._resolver = resolver if resolver is not None \
+            else ResolverPool(name_servers)
         self.cache_failures = cache_failures
         self.cache_limit = cache_limit
+        self.cache_limit_bytes = cache_limit_bytes
         self.failure_ttl = failure_ttl
+        self.failure_ttls = dict(DEFAULT_FAILURE_TTLS, **(failure_ttls or {}))
+        self.offline = offline
+        self.persistent_cache = persistent_cache
+        self.refresh_ahead = refresh_ahead
+        self.refresh_hits = refresh_hits
+        self.result_cache_size = result_cache_size
+        self.serve_stale = serve_stale
+        self.on_evict = on_evict
+        self.on_hit = on_hit
+        self.on_miss = on_miss
+        self.on_resolve = on_resolve
+        self._evictions = 0
+        self._failures: typing.Dict[str, int] = {}
+        self._hits = 0
+        self._inflight: typing.Dict[str, asyncio.Future] = {}
+        self._latencies = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._latency_sum = 0.0
+        self._misses = 0
+        self._queries = 0
+        self._refreshes = 0
+        self._result_hits = 0
+        self._results: typing.Optional[typing.OrderedDict[
+            str, typing.Tuple[Result, str, typing.Optional[float]]]] = \
+            collections.OrderedDict() if result_cache_size > 0 else None
+        self._stale = 0
 
     async def mx_records(self, domain_part: str) -> MXRecords:
         """Resolve MX records for a domain returning a list of tuples with the
         MX priority and value.
 
+        The records are returned as :class:`~email_normalize.FrozenMXRecords`
+        that are shared with the cache. Use
+        :meth:`~email_normalize.FrozenMXRecords.copy` to obtain a list that
+        can be modified.
+
         :param domain_part: The domain to resolve MX records for
         :type domain_part: str
         :rtype:  :data:`~email_normalize.MXRecords`
 
         """
-        if self._skip_cache(domain_part):
-            try:
-                records = await self._resolver.query(domain_part, 'MX')
-            except error.DNSError as err:
-                LOGGER.debug('Failed to resolve %r: %s', domain_part, err)
-                if not self.cache_failures:
-                    return []
-                mx_records, ttl = [], self.failure_ttl
-            else:
-                mx_records = [(r.priority, r.host) for r in records]
-                ttl = min((r.ttl for r in records if r.ttl >= 0),
-                          default=self.failure_ttl)
+        item = await self._cached_item(domain_part)
+        return item.mx_records if item is not None else FrozenMXRecords()
+
+    async def _cached_item(self, domain_part: str) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for a domain, resolving it if it is not
+        cached, or :data:`None` if it could not be resolved and failures are
+        not cached.
 
-            # Prune the cache if over the limit, finding least used, oldest
-            if len(cache.keys()) >= self.cache_limit:
-                key_to_prune = sorted(
-                    cache.items(), key=lambda i: (
-                        i[1].hits, i[1].last_access))[0][0]
-                LOGGER.debug('Pruning cache of %s', key_to_prune)
-                del cache[key_to_prune]
+        """
+        item = self._cache_hit(domain_part)
+        if item is None:
+            item = await self._cache_miss(domain_part)
+        return item
 
-            cache[domain_part] = CachedItem(
-                sorted(mx_records, key=operator.itemgetter(0, 1)), ttl)
+    def _cache_hit(self, domain_part: str) -> typing.Optional[CachedItem]:
+        """Return the cached item for a domain without waiting, refreshing it
+        in the background if it is stale or about to expire, or :data:`None`
+        if it is not cached.
 
-        cache[domain_part].hits += 1
-        cache[domain_part].last_access = time.monotonic()
-        return copy.deepcopy(cache[domain_part].mx_records)
+        """
+        item = self.cache.get(domain_part, stale=self.serve_stale)
+        if item is None:
+            return None
+        self._hits += 1
+        if self.on_hit is not None:
+            self.on_hit(domain_part)
+        if item.expired:
+            self._stale += 1
+        if item.expired or (
+                self.refresh_ahead and item.hits >= self.refresh_hits
+                and item.remaining < item.ttl * self.refresh_ahead):
+            LOGGER.debug('Refreshing MX records for %r', domain_part)
+            self._query_inflight(domain_part, item)
+        item.hits += 1
+        item.last_access = time.monotonic()
+        return item
+
+    async def _cache_miss(self, domain_part: str) \
+            -> typing.Optional[CachedItem]:
+        """Resolve the MX records for a domain that is not cached, returning
+        the cached item or :data:`None` if it could not be resolved and
+        failures are not cached.
+
+        """
+        self._misses += 1
+        if self.on_miss is not None:
+            self.on_miss(domain_part)
+        item = await self._resolve(domain_part)
+        if item is not None:
+            item.hits += 1
+            item.last_access = time.monotonic()
+        return item
 
     async def normalize(self, email_address: str) -> Result:
         """Return a :class:`~email_normalize.Result` instance containing the
@@ -185,49 +474,887 @@ class Normalizer:
         :rtype: :class:`~email_normalize.Result`
 
         """
-        address = utils.parseaddr(email_address)
-        local_part, domain_part = address[1].lower().split('@')
-        mx_records = await self.mx_records(domain_part)
-        provider = self._lookup_provider(mx_records)
+        if self._results is not None:
+            result = self._memoized(email_address)
+            if result is not None:
+                return result
+        local_part, domain_part = self._split(email_address)
+        if self.offline:
+            result = self._offline_result(
+                email_address, local_part, domain_part)
+            if result is not None:
+                self._memoize(email_address, domain_part, result, None)
+                return result
+        if self._results is None:
+            mx_records = await self.mx_records(domain_part)
+            return self._result(email_address, local_part, domain_part,
+                                mx_records, lookup_provider(mx_records))
+        return self._item_result(email_address, local_part, domain_part,
+                                 await self._cached_item(domain_part))
+
+    async def normalize_many(self,
+                             email_addresses: typing.Iterable[str],
+                             concurrency: int = 10) -> typing.List[Result]:
+        """Normalize multiple email addresses, returning a list of
+        :class:`~email_normalize.Result` instances in the same order as the
+        addresses that were passed in.
+
+        Addresses are grouped by their domain part so that the MX records for
+        each distinct domain are resolved only once, with at most
+        ``concurrency`` domains being resolved at the same time.
+
+        :param email_addresses: The addresses to normalize
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :rtype: list(:class:`~email_normalize.Result`)
+        :raises ValueError: If an address can not be split into its local
+            and domain parts. The first invalid address in the input is
+            raised prior to any DNS resolution.
+        :raises ValueError: If ``concurrency`` is less than `1`
+
+        """
+        return [result async for result in self.iter_normalize(
+            email_addresses, concurrency)]
+
+    async def iter_normalize(self,
+                             email_addresses: typing.Iterable[str],
+                             concurrency: int = 10,
+                             ordered: bool = True) \
+            -> typing.AsyncIterator[Result]:
+        """Normalize multiple email addresses, yielding a
+        :class:`~email_normalize.Result` for each address.
+
+        Addresses are grouped by their domain part so that the MX records for
+        each distinct domain are resolved only once, with at most
+        ``concurrency`` domains being resolved at the same time. When
+        ``ordered`` is :data:`True`, results are yielded in the same order as
+        the addresses that were passed in. Otherwise results are yielded as
+        soon as the domain for the address has been resolved.
+
+        **Usage Example**
+
+        .. code-block:: python
+
+            async for result in normalizer.iter_normalize(addresses):
+                print(result.normalized_address)
+
+        :param email_addresses: The addresses to normalize
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :param bool ordered: Yield results in input order. Defaults to
+            `True`.
+        :raises ValueError: If an address can not be split into its local
+            and domain parts. The first invalid address in the input is
+            raised prior to any DNS resolution.
+        :raises ValueError: If ``concurrency`` is less than `1`
+
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        addresses: typing.List[typing.Tuple[str, str, str]] = []
+        results: typing.List[typing.Optional[Result]] = []
+        groups: typing.Dict[str, typing.List[int]] = {}
+        for email_address in email_addresses:
+            local_part, domain_part = self._split(email_address)
+            result = self._offline_result(
+                email_address, local_part, domain_part) \
+                if self.offline else None
+            if result is None:
+                groups.setdefault(domain_part, []).append(len(results))
+            addresses.append((email_address, local_part, domain_part))
+            results.append(result)
+
+        resolved = self._iter_mx_records(list(groups.keys()), concurrency)
+        offset = 0
+        try:
+            if not ordered:
+                for result in results:
+                    if result is not None:
+                        yield result
+            while True:
+                while ordered and offset < len(results) \
+                        and results[offset] is not None:
+                    yield results[offset]
+                    results[offset] = None
+                    offset += 1
+                if not groups:
+                    break
+                domain_part, mx_records = await resolved.__anext__()
+                provider = lookup_provider(mx_records)
+                for index in groups.pop(domain_part):
+                    result = self._result(
+                        *addresses[index], mx_records, provider)
+                    if ordered:
+                        results[index] = result
+                    else:
+                        yield result
+        finally:
+            await resolved.aclose()
+
+    async def stream(self,
+                     email_addresses: typing.AsyncIterable[str],
+                     window: int = 100,
+                     ordered: bool = False) -> typing.AsyncIterator[Result]:
+        """Normalize a stream of email addresses, such as the messages of a
+        queue consumer, yielding a :class:`~email_normalize.Result` for each
+        address.
+
+        At most ``window`` addresses are read from the stream ahead of the
+        results that have been yielded, so a slow consumer of the results
+        stops the reading of addresses and the DNS queries for them, and the
+        memory used stays bounded. Addresses at cached domains are normalized
+        as they are read. Each distinct uncached domain is resolved once in
+        the background, and its addresses wait for it. When ``ordered`` is
+        :data:`False`, results are yielded as soon as they are available, so
+        cached addresses do not wait behind slow DNS queries. Otherwise they
+        are yielded in the order of the stream.
+
+        **Usage Example**
+
+        .. code-block:: python
+
+            async for result in normalizer.stream(consumer, window=500):
+                await producer.send(result.normalized_address)
+
+        :param email_addresses: The addresses to normalize
+        :param int window: The maximum number of addresses read from the
+            stream that have not been yielded. Defaults to `100`.
+        :param bool ordered: Yield results in stream order. Defaults to
+            `False`.
+        :raises ValueError: If an address can not be split into its local
+            and domain parts, when it is read from the stream
+
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        source = email_addresses.__aiter__()
+        pending: typing.Deque[typing.List[typing.Any]] = collections.deque()
+        ready: typing.Deque[Result] = collections.deque()
+        tasks: typing.Dict[asyncio.Future, str] = {}
+        waiting: typing.Dict[str, typing.List[typing.List[typing.Any]]] = {}
+        pull: typing.Optional[asyncio.Future] = None
+        exhausted, unyielded = False, 0
+
+        def complete(entry: typing.List[typing.Any],
+                     item: typing.Optional[CachedItem]) -> None:
+            entry[3] = self._item_result(*entry[:3], item)
+            if not ordered:
+                ready.append(entry[3])
+
+        try:
+            while True:
+                if ordered:
+                    while pending and pending[0][3] is not None:
+                        yield pending.popleft()[3]
+                        unyielded -= 1
+                else:
+                    while ready:
+                        yield ready.popleft()
+                        unyielded -= 1
+                if exhausted and not unyielded:
+                    break
+
+                email_address, received = '', False
+                if exhausted or unyielded >= window:
+                    done, _pending = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED)
+                elif not tasks and pull is None:
+                    try:
+                        email_address = await source.__anext__()
+                        received = True
+                    except StopAsyncIteration:
+                        exhausted = True
+                    done = set()
+                else:
+                    if pull is None:
+                        pull = asyncio.ensure_future(source.__anext__())
+                    done, _pending = await asyncio.wait(
+                        set(tasks) | {pull},
+                        return_when=asyncio.FIRST_COMPLETED)
+                    if pull in done:
+                        done.discard(pull)
+                        try:
+                            email_address = pull.result()
+                            received = True
+                        except StopAsyncIteration:
+                            exhausted = True
+                        pull = None
+
+                for task in done:
+                    item = task.result()
+                    for entry in waiting.pop(tasks.pop(task)):
+                        complete(entry, item)
+
+                if not received:
+                    continue
+                unyielded += 1
+                result = self._memoized(email_address) \
+                    if self._results is not None else None
+                if result is None:
+                    local_part, domain_part = self._split(email_address)
+                    if self.offline:
+                        result = self._offline_result(
+                            email_address, local_part, domain_part)
+                        if result is not None:
+                            self._memoize(
+                                email_address, domain_part, result, None)
+                entry = [email_address, local_part, domain_part, result] \
+                    if result is None else [None, None, None, result]
+                if ordered:
+                    pending.append(entry)
+                if result is not None:
+                    if not ordered:
+                        ready.append(result)
+                elif entry[2] in waiting:
+                    waiting[entry[2]].append(entry)
+                else:
+                    item = self._cache_hit(entry[2])
+                    if item is not None:
+                        complete(entry, item)
+                    else:
+                        waiting[entry[2]] = [entry]
+                        tasks[asyncio.ensure_future(
+                            self._cache_miss(entry[2]))] = entry[2]
+        finally:
+            for task in list(tasks) + ([pull] if pull else []):
+                task.cancel()
+
+    async def mx_records_many(self,
+                              domains: typing.Iterable[str],
+                              concurrency: int = 10) \
+            -> typing.Dict[str, MXRecords]:
+        """Resolve MX records for multiple domains, returning a
+        :class:`dict` of the MX records by domain.
+
+        :param domains: The domains to resolve MX records for
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :rtype: dict(str, :data:`~email_normalize.MXRecords`)
+        :raises ValueError: If ``concurrency`` is less than `1`
+
+        """
+        return {domain_part: mx_records
+                async for domain_part, mx_records in self._iter_mx_records(
+                    list(dict.fromkeys(domains)), concurrency)}
+
+    async def prefetch(self,
+                       domains: typing.Iterable[str],
+                       concurrency: int = 10) -> int:
+        """Resolve and cache the MX records for domains ahead of time, such
+        as the most common domains after a deploy, returning the number of
+        distinct domains that were prefetched. Domains that are already
+        cached are not resolved again.
+
+        :param domains: The domains to prefetch MX records for
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :rtype: int
+        :raises ValueError: If ``concurrency`` is less than `1`
+
+        """
+        count = 0
+        async for _domain_part, _mx_records in self._iter_mx_records(
+                list(dict.fromkeys(domains)), concurrency):
+            count += 1
+        return count
+
+    def normalize_local(self, email_address: str) -> typing.Optional[Result]:
+        """Normalize an email address without performing DNS resolution,
+        returning a :class:`~email_normalize.Result` if the domain part of
+        the address is a well known domain of a mailbox provider, such as
+        ``gmail.com``, or :data:`None` if it is not.
+
+        .. note:: As MX records are not resolved, the ``mx_records``
+            attribute of the result will be an empty :class:`list` while the
+            ``mailbox_provider`` is set.
+
+        :param email_address: The address to normalize
+        :rtype: :class:`~email_normalize.Result` or None
+        :raises ValueError: If the address can not be split into its local
+            and domain parts
+
+        """
+        local_part, domain_part = self._split(email_address)
+        return self._offline_result(email_address, local_part, domain_part)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Return a snapshot of the counters kept by the normalizer, for
+        tuning ``cache_limit`` and the failure TTLs:
+
+        - ``hits``, ``misses``, and ``hit_ratio`` of MX record lookups
+        - ``stale``: hits that returned expired MX records
+        - ``refreshes``: background queries for cached domains
+        - ``evictions``: domains evicted to stay within ``cache_limit``
+        - ``inflight``: DNS queries currently in progress
+        - ``queries``: DNS queries performed
+        - ``failures``: failed DNS queries by class of failure
+        - ``query_latency``: the ``count`` and ``sum`` in seconds of the DNS
+          query durations, and the number of queries in each of the
+          ``buckets``, keyed by their upper bound in seconds
+        - ``results`` and ``result_hits``: the number of remembered results
+          of :meth:`normalize` and the calls that returned one
+        - ``cache``: the stats of the cache backend
+
+        :rtype: dict
+
+        """
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': self._hits / lookups if lookups else 0.0,
+            'stale': self._stale,
+            'refreshes': self._refreshes,
+            'evictions': self._evictions,
+            'inflight': len(self._inflight),
+            'queries': self._queries,
+            'failures': dict(self._failures),
+            'query_latency': {
+                'count': self._queries,
+                'sum': self._latency_sum,
+                'buckets': dict(zip(LATENCY_BUCKETS + (math.inf,),
+                                    self._latencies))
+            },
+            'results': len(self._results or ()),
+            'result_hits': self._result_hits,
+            'cache': self.cache.stats()
+        }
+
+    def export_cache(self) -> bytes:
+        """Return a compact snapshot of the MX records in the cache that
+        have not expired, preserving their remaining TTLs, that can be
+        passed to :meth:`import_cache` to warm the cache of a new instance.
+
+        :rtype: bytes
+
+        """
+        return caches.dump_snapshot(self.cache)
+
+    def import_cache(self, snapshot: bytes) -> int:
+        """Add the MX records of a snapshot created by :meth:`export_cache`
+        to the cache, returning the number of domains added. Domains that are
+        already cached and records that have expired since the snapshot was
+        taken are skipped, and the most used domains of the snapshot are
+        added first until the cache reaches `cache_limit` or
+        `cache_limit_bytes`.
+
+        :param bytes snapshot: The snapshot to import
+        :rtype: int
+        :raises ValueError: If the snapshot is not a supported snapshot
+
+        """
+        count, free = 0, self.cache_limit - len(self.cache)
+        for domain_part, item in caches.load_snapshot(snapshot):
+            if count >= free or (
+                    self.cache_limit_bytes is not None
+                    and self.cache.nbytes >= self.cache_limit_bytes):
+                break
+            elif domain_part not in self.cache:
+                self.cache.set(domain_part, item)
+                count += 1
+        return count
+
+    def _cache_full(self) -> bool:
+        """Return whether the cache is at `cache_limit` items or at
+        `cache_limit_bytes` bytes.
+
+        """
+        return len(self.cache) >= self.cache_limit or (
+            self.cache_limit_bytes is not None
+            and self.cache.nbytes >= self.cache_limit_bytes)
+
+    def _item_result(self, email_address: str, local_part: str,
+                     domain_part: str,
+                     item: typing.Optional[CachedItem]) -> Result:
+        """Return the result for an address using the cached item of its
+        domain, remembering it if results are remembered.
+
+        """
+        mx_records = item.mx_records if item is not None \
+            else FrozenMXRecords()
+        result = self._result(email_address, local_part, domain_part,
+                              mx_records, lookup_provider(mx_records))
+        if item is not None:
+            self._memoize(email_address, domain_part, result, item)
+        return result
+
+    def _memoize(self, email_address: str, domain_part: str, result: Result,
+                 item: typing.Optional[CachedItem]) -> None:
+        """Remember the result for an address, tied to the cached item of its
+        domain or to no item for an offline result, evicting the least
+        recently used result if over `result_cache_size`.
+
+        """
+        if self._results is None:
+            return
+        self._results[email_address] = (
+            result, domain_part, item.cached_at if item is not None else None)
+        if len(self._results) > self.result_cache_size:
+            self._results.popitem(last=False)
+
+    def _memoized(self, email_address: str) -> typing.Optional[Result]:
+        """Return the remembered result for an address, or :data:`None` if
+        there is none or the cached item it is tied to has since expired,
+        been replaced, or been removed from the cache.
+
+        The time the item was cached is compared with the entry in the cache,
+        which may have been replaced by another normalizer sharing the cache,
+        or copied by the cache backend.
+
+        """
+        entry = self._results.get(email_address)
+        if entry is None:
+            return None
+        result, domain_part, cached_at = entry
+        if cached_at is not None:
+            item = self.cache.get(domain_part, stale=self.serve_stale)
+            if item is None or item.expired or item.cached_at != cached_at:
+                del self._results[email_address]
+                return None
+            item.hits += 1
+            item.last_access = time.monotonic()
+        self._results.move_to_end(email_address)
+        self._result_hits += 1
+        return result
+
+    def _observe_query(self, domain_part: str, duration: float,
+                       failure: typing.Optional[str]) -> None:
+        """Record the duration and outcome of a DNS query"""
+        self._queries += 1
+        self._latencies[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self._latency_sum += duration
+        if failure is not None:
+            self._failures[failure] = self._failures.get(failure, 0) + 1
+        if self.on_resolve is not None:
+            self.on_resolve(domain_part, duration, failure)
+
+    def _offline_result(self, email_address: str, local_part: str,
+                        domain_part: str) -> typing.Optional[Result]:
+        """Return the result for an address at a well known domain of a
+        mailbox provider, or :data:`None` if the domain is not known.
+
+        """
+        provider = providers.ProviderDomains.get(domain_part)
+        if provider is None:
+            return None
+        return self._result(
+            email_address, local_part, domain_part, FrozenMXRecords(),
+            provider)
+
+    @staticmethod
+    def _result(email_address: str, local_part: str, domain_part: str,
+                mx_records: MXRecords,
+                provider: typing.Optional[providers.MailboxProvider]) \
+            -> Result:
+        """Apply the rules for the mailbox provider to the address, returning
+        the result.
+
+        """
         if provider:
-            if provider.Flags & providers.Rules.LOCAL_PART_AS_HOSTNAME:
-                local_part, domain_part = self._local_part_as_hostname(
-                    local_part, domain_part)
-            if provider.Flags & providers.Rules.STRIP_PERIODS:
-                local_part = local_part.replace('.', '')
-            if provider.Flags & providers.Rules.PLUS_ADDRESSING:
-                local_part = local_part.split('+')[0]
-            if provider.Flags & providers.Rules.DASH_ADDRESSING:
-                local_part = local_part.split('-')[0]
+            local_part, domain_part = provider.transform(
+                email_address, local_part, domain_part)
         return Result(email_address, '@'.join([local_part, domain_part]),
                       mx_records, provider.__name__ if provider else None)
 
     @staticmethod
-    def _local_part_as_hostname(local_part: str,
-                                domain_part: str) -> typing.Tuple[str, str]:
-        domain_segments = domain_part.split('.')
-        if len(domain_segments) > 2:
-            local_part = domain_segments[0]
-            domain_part = '.'.join(domain_segments[1:])
+    def _split(email_address: str) -> typing.Tuple[str, str]:
+        """Return the lowercased local and domain parts of an address,
+        raising :exc:`~email_normalize.InvalidAddressError` if it can not be
+        split.
+
+        """
+        local_part, domain_part, parse_error = split_address(email_address)
+        if parse_error is not None:
+            raise InvalidAddressError(email_address, parse_error)
         return local_part, domain_part
 
+    async def _query(self, domain_part: str,
+                     previous: typing.Optional[CachedItem] = None) \
+            -> typing.Optional[CachedItem]:
+        """Query DNS for the MX records of a domain, adding the result to the
+        cache. Returns :data:`None` if the query failed and failures are not
+        cached. If a persistent cache is configured, it is checked prior to
+        querying DNS.
+
+        When refreshing the ``previous`` cached item, its hits are carried
+        over, and it is kept if the query fails with a transient error.
+
+        """
+        item = None
+        if self.persistent_cache is not None and previous is None:
+            item = self.persistent_cache.get(domain_part)
+        if item is None:
+            from aiodns import error  # Loaded on the first DNS query
+
+            failure, records = None, []
+            start = time.perf_counter()
+            try:
+                records = await self._resolver.query(domain_part, 'MX')
+            except error.DNSError as err:
+                failure = self._failure(err)
+                LOGGER.debug('Failed to resolve %r (%s): %s',
+                             domain_part, failure, err)
+            self._observe_query(
+                domain_part, time.perf_counter() - start, failure)
+            if failure is None:
+                mx_records = [(r.priority, r.host) for r in records]
+                ttl = min((r.ttl for r in records if r.ttl >= 0),
+                          default=self.failure_ttl)
+            elif previous is not None and failure in TRANSIENT_FAILURES:
+                return previous
+            elif not self.cache_failures:
+                return None
+            else:
+                mx_records = []
+                ttl = self.failure_ttls.get(failure, self.failure_ttl)
+            item = CachedItem(
+                sorted(mx_records, key=operator.itemgetter(0, 1)), ttl,
+                error=failure)
+            if previous is not None:
+                item.hits = previous.hits
+                item.last_access = previous.last_access
+            if self.persistent_cache is not None:
+                self.persistent_cache.set(domain_part, item)
+
+        # Prune the cache if over the limit, finding least used, oldest
+        if domain_part not in self.cache:
+            while self._cache_full():
+                evicted = self.cache.evict()
+                if evicted is None:
+                    break
+                LOGGER.debug('Pruning cache of %s', evicted)
+                self._evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(evicted)
+
+        self.cache.set(domain_part, item)
+        # Return the stored entry as backends such as CompactCache copy the
+        # item, so that hits and access times are recorded in the cache
+        return self.cache.get(domain_part, stale=self.serve_stale) or item
+
+    def _query_done(self, domain_part: str, future: asyncio.Future) -> None:
+        if self._inflight.get(domain_part) is future:
+            del self._inflight[domain_part]
+        if not future.cancelled():
+            future.exception()  # Mark as retrieved if every waiter went away
+
+    def _query_inflight(self, domain_part: str,
+                        previous: typing.Optional[CachedItem] = None) \
+            -> asyncio.Future:
+        """Return the in-flight query for a domain, starting it if there is
+        not one in progress.
+
+        """
+        future = self._inflight.get(domain_part)
+        if future is None:
+            if previous is not None:
+                self._refreshes += 1
+            future = asyncio.ensure_future(
+                self._query(domain_part, previous))
+            future.add_done_callback(
+                functools.partial(self._query_done, domain_part))
+            self._inflight[domain_part] = future
+        return future
+
+    async def _resolve(self, domain_part: str) -> typing.Optional[CachedItem]:
+        """Return the cached item for a domain from a DNS query, sharing a
+        single in-flight query between concurrent callers for the same
+        domain. The query is shielded so that a cancelled caller does not
+        cancel it for the other callers waiting on it.
+
+        """
+        return await asyncio.shield(self._query_inflight(domain_part))
+
+    async def _iter_mx_records(self, domains: typing.Sequence[str],
+                               concurrency: int) \
+            -> typing.AsyncIterator[typing.Tuple[str, MXRecords]]:
+        """Resolve the MX records for each domain with at most
+        ``concurrency`` lookups in progress, yielding tuples of the domain
+        and its MX records as they are resolved.
+
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        pending = iter(domains)
+        resolved = asyncio.Queue()
+
+        async def resolve() -> None:
+            for domain_part in pending:
+                try:
+                    mx_records = await self.mx_records(domain_part)
+                except Exception as err:
+                    resolved.put_nowait((domain_part, err))
+                    return
+                resolved.put_nowait((domain_part, mx_records))
+
+        workers = [asyncio.ensure_future(resolve())
+                   for _offset in range(0, min(concurrency, len(domains)))]
+        try:
+            for _offset in range(0, len(domains)):
+                domain_part, mx_records = await resolved.get()
+                if isinstance(mx_records, Exception):
+                    raise mx_records
+                yield domain_part, mx_records
+        finally:
+            for worker in workers:
+                worker.cancel()
+
     @staticmethod
-    def _lookup_provider(mx_records: typing.List[typing.Tuple[int, str]]) \
-            -> typing.Optional[providers.MailboxProvider]:
-        for priority, host in mx_records:
-            lchost = host.lower()
-            for provider in providers.Providers:
-                for domain in provider.MXDomains:
-                    if lchost.endswith(domain):
-                        return provider
-
-    def _skip_cache(self, domain: str) -> bool:
-        if domain not in cache:
-            return True
-        elif cache[domain].expired:
-            del cache[domain]
-            return True
-        return False
+    def _failure(err: 'error.DNSError') -> str:
+        """Return the class of failure for a DNS error"""
+        from aiodns import error
+
+        return {
+            error.ARES_ENODATA: 'nodata',
+            error.ARES_ENOTFOUND: 'nxdomain',
+            error.ARES_ESERVFAIL: 'servfail',
+            error.ARES_ETIMEOUT: 'timeout'
+        }.get(err.args[0] if err.args else None, 'error')
+
+
+class SyncNormalizer:
+    """Blocking interface to a :class:`~email_normalize.Normalizer` for use
+    in applications that do not use :mod:`asyncio`, such as Django views or
+    Celery tasks.
+
+    A single :class:`~email_normalize.Normalizer` and its resolver are kept
+    alive on an event loop running in a background thread, so that the setup
+    cost is only paid once and the MX record cache and in-flight lookups are
+    shared by every caller. Methods may be called from any number of threads
+    concurrently, other than from the background thread itself.
+
+    Call :meth:`close` when done with the instance, or use it as a context
+    manager.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        normalizer = email_normalize.SyncNormalizer()
+        result = normalizer.normalize('foo@bar.io')
+        normalizer.close()
+
+    Arguments are passed through to the :class:`~email_normalize.Normalizer`.
+    Callbacks such as ``on_hit`` are invoked on the background thread.
+
+    """
+    def __init__(self, *args, **kwargs):
+        self._closing = False
+        self._futures: typing.Set[concurrent.futures.Future] = set()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, name='email-normalize', daemon=True)
+        self._thread.start()
+        self._normalizer: Normalizer = self._submit(
+            self._create(*args, **kwargs), None)
+
+    def __enter__(self) -> 'SyncNormalizer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """Indicates if the instance has been closed"""
+        return self._loop.is_closed() or not self._thread.is_alive()
+
+    @property
+    def offline(self) -> bool:
+        """Indicates if addresses at well known mailbox provider domains are
+        normalized without resolving their MX records
+
+        """
+        return self._normalizer.offline
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """Stop the background event loop, cancelling any lookups that are
+        still in progress, and wait for the thread to exit. Calls that are
+        waiting for a result, or that are made once the instance is closing,
+        raise :exc:`RuntimeError`.
+
+        :param timeout: Optional number of seconds to wait for the thread
+        :type timeout: float or None
+
+        """
+        with self._lock:
+            if not self._closing and self._thread.is_alive():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._closing = True
+        self._thread.join(timeout)
+
+    def mx_records(self, domain_part: str,
+                   timeout: typing.Optional[float] = None) -> MXRecords:
+        """Resolve MX records for a domain, blocking until they are resolved.
+        See :meth:`Normalizer.mx_records`.
+
+        :param domain_part: The domain to resolve MX records for
+        :param timeout: Optional number of seconds to wait for the result
+        :type timeout: float or None
+        :rtype: :data:`~email_normalize.MXRecords`
+
+        """
+        return self._submit(self._normalizer.mx_records(domain_part), timeout)
+
+    def mx_records_many(self,
+                        domains: typing.Iterable[str],
+                        concurrency: int = 10,
+                        timeout: typing.Optional[float] = None) \
+            -> typing.Dict[str, MXRecords]:
+        """Resolve MX records for multiple domains, blocking until all of
+        them are resolved. See :meth:`Normalizer.mx_records_many`.
+
+        :param domains: The domains to resolve MX records for
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :param timeout: Optional number of seconds to wait for the result
+        :type timeout: float or None
+        :rtype: dict(str, :data:`~email_normalize.MXRecords`)
+
+        """
+        return self._submit(self._normalizer.mx_records_many(
+            list(domains), concurrency), timeout)
+
+    def normalize(self, email_address: str,
+                  timeout: typing.Optional[float] = None) -> Result:
+        """Normalize an email address, blocking until it is normalized.
+        See :meth:`Normalizer.normalize`.
+
+        :param email_address: The address to normalize
+        :param timeout: Optional number of seconds to wait for the result
+        :type timeout: float or None
+        :rtype: :class:`~email_normalize.Result`
+
+        """
+        return self._submit(
+            self._normalizer.normalize(email_address), timeout)
+
+    def normalize_many(self,
+                       email_addresses: typing.Iterable[str],
+                       concurrency: int = 10,
+                       timeout: typing.Optional[float] = None) \
+            -> typing.List[Result]:
+        """Normalize multiple email addresses, blocking until all of them are
+        normalized. See :meth:`Normalizer.normalize_many`.
+
+        :param email_addresses: The addresses to normalize
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :param timeout: Optional number of seconds to wait for the results
+        :type timeout: float or None
+        :rtype: list(:class:`~email_normalize.Result`)
+
+        """
+        return self._submit(self._normalizer.normalize_many(
+            list(email_addresses), concurrency), timeout)
+
+    def prefetch(self,
+                 domains: typing.Iterable[str],
+                 concurrency: int = 10,
+                 timeout: typing.Optional[float] = None) -> int:
+        """Resolve and cache the MX records for domains ahead of time,
+        blocking until all of them are resolved. See
+        :meth:`Normalizer.prefetch`.
+
+        :param domains: The domains to prefetch MX records for
+        :param int concurrency: The maximum number of domains to resolve
+            concurrently. Defaults to `10`.
+        :param timeout: Optional number of seconds to wait for the domains
+        :type timeout: float or None
+        :rtype: int
+
+        """
+        return self._submit(self._normalizer.prefetch(
+            list(domains), concurrency), timeout)
+
+    def export_cache(self, timeout: typing.Optional[float] = None) -> bytes:
+        """Return a snapshot of the cache taken on the background event
+        loop. See :meth:`Normalizer.export_cache`.
+
+        :param timeout: Optional number of seconds to wait for the snapshot
+        :type timeout: float or None
+        :rtype: bytes
+
+        """
+        return self._submit(self._call(self._normalizer.export_cache), timeout)
+
+    def import_cache(self, snapshot: bytes,
+                     timeout: typing.Optional[float] = None) -> int:
+        """Add the MX records of a snapshot to the cache on the background
+        event loop. See :meth:`Normalizer.import_cache`.
+
+        :param bytes snapshot: The snapshot to import
+        :param timeout: Optional number of seconds to wait for the import
+        :type timeout: float or None
+        :rtype: int
+
+        """
+        return self._submit(
+            self._call(self._normalizer.import_cache, snapshot), timeout)
+
+    def stats(self, timeout: typing.Optional[float] = None) \
+            -> typing.Dict[str, typing.Any]:
+        """Return a snapshot of the counters kept by the normalizer, taken
+        on the background event loop. See :meth:`Normalizer.stats`.
+
+        :param timeout: Optional number of seconds to wait for the snapshot
+        :type timeout: float or None
+        :rtype: dict
+
+        """
+        return self._submit(self._call(self._normalizer.stats), timeout)
+
+    @staticmethod
+    async def _create(*args, **kwargs) -> Normalizer:
+        """Create the normalizer on the event loop it will be used on"""
+        return Normalizer(*args, **kwargs)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            # Tasks such as shielded queries may start others as they are
+            # cancelled, so cancel until none remain
+            tasks = asyncio.all_tasks(self._loop)
+            while tasks:
+                for task in tasks:
+                    task.cancel()
+                self._loop.run_until_complete(
+                    asyncio.gather(*tasks, return_exceptions=True))
+                tasks = asyncio.all_tasks(self._loop)
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+            with self._lock:
+                self._closing = True
+                for future in self._futures:
+                    if not future.done():
+                        future.set_exception(
+                            RuntimeError('SyncNormalizer is closed'))
+
+    @staticmethod
+    async def _call(function: typing.Callable, *args) -> typing.Any:
+        """Call a function of the normalizer on the background event loop"""
+        return function(*args)
+
+    def _submit(self, coroutine: typing.Coroutine,
+                timeout: typing.Optional[float]) -> typing.Any:
+        with self._lock:
+            if self._closing or self.closed:
+                coroutine.close()
+                raise RuntimeError('SyncNormalizer is closed')
+            future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+            self._futures.add(future)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.CancelledError:
+            if self._closing:
+                raise RuntimeError('SyncNormalizer is closed')
+            raise
+        finally:
+            with self._lock:
+                self._futures.discard(future)
 
 
 def normalize(email_address: str) -> Result:
@@ -236,7 +1363,10 @@ def normalize(email_address: str) -> Result:
     This method abstracts the :mod:`asyncio` base for this library and
     provides a blocking function. If you intend to use this library as part of
     an :mod:`asyncio` based application, it is recommended that you use
-    the :meth:`~email_normalize.Normalizer.normalize` instead.
+    the :meth:`~email_normalize.Normalizer.normalize` instead. If you are
+    normalizing many addresses in a blocking application, use a
+    :class:`~email_normalize.SyncNormalizer` to avoid creating a new
+    event loop and resolver for each address.
 
     .. note:: If the MX records could not be resolved, the ``mx_records``
         attribute of the result will be an empty :class:`list` and the
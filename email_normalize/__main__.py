@@ -0,0 +1,5 @@
+import sys
+
+from email_normalize import cli
+
+sys.exit(cli.main())
@@ -0,0 +1,950 @@
+"""
+MX Record Cache Implementations
+"""
+import array
+import heapq
+import io
+import itertools
+import json
+import logging
+import pickle
+import random
+import sys
+import threading
+import time
+import typing
+import zlib
+
+LOGGER = logging.getLogger(__name__)
+
+MXRecords = typing.List[typing.Tuple[int, str]]
+
+SNAPSHOT_VERSION = 1
+
+
+def _immutable(method: str) -> typing.Callable:
+    def raise_type_error(self, *args, **kwargs):
+        raise TypeError(
+            '{} is immutable, use copy() for a mutable list'.format(
+                type(self).__name__))
+    raise_type_error.__name__ = method
+    return raise_type_error
+
+
+class FrozenMXRecords(list):
+    """An immutable :class:`list` of MX record tuples. Cached MX records are
+    stored as :class:`~email_normalize.FrozenMXRecords` so that they can be
+    shared by the cache and every :class:`~email_normalize.Result` without
+    being copied.
+
+    Methods that would modify the list raise :exc:`TypeError`. Code that
+    needs to modify the records should use :meth:`copy`, which returns a
+    mutable :class:`list`.
+
+    """
+    __slots__ = ['provider']
+
+    __setitem__ = _immutable('__setitem__')
+    __delitem__ = _immutable('__delitem__')
+    __iadd__ = _immutable('__iadd__')
+    __imul__ = _immutable('__imul__')
+    append = _immutable('append')
+    clear = _immutable('clear')
+    extend = _immutable('extend')
+    insert = _immutable('insert')
+    pop = _immutable('pop')
+    remove = _immutable('remove')
+    reverse = _immutable('reverse')
+    sort = _immutable('sort')
+
+    def __copy__(self) -> 'FrozenMXRecords':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'FrozenMXRecords':
+        return self
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __reduce__(self) -> tuple:
+        return type(self), (list(self), )
+
+    def copy(self) -> MXRecords:
+        """Return a mutable copy of the MX records"""
+        return list(self)
+
+
+class CachedItem:
+    """Used to represent a cached lookup for implementing a LFRU cache
+
+    :param mx_records: The MX records for the domain, stored as
+        :class:`~email_normalize.FrozenMXRecords`
+    :param int ttl: The TTL of the records in seconds
+    :param remaining: The number of seconds remaining until the item expires,
+        used when restoring an item that was cached earlier. Defaults to the
+        full TTL.
+    :type remaining: float or None
+    :param error: For a cached failure, the class of the DNS error such as
+        ``nxdomain`` or ``timeout``
+    :type error: str or None
+
+    """
+    __slots__ = ['cached_at', 'error', 'hits', 'last_access', 'mx_records',
+                 'ttl']
+
+    def __init__(self, mx_records: MXRecords, ttl: int,
+                 remaining: typing.Optional[float] = None,
+                 error: typing.Optional[str] = None):
+        self.cached_at = time.monotonic()
+        if remaining is not None:
+            self.cached_at -= ttl - remaining
+        self.error = error
+        self.hits = 0
+        self.last_access: float = 0.0
+        self.mx_records = mx_records \
+            if isinstance(mx_records, FrozenMXRecords) \
+            else FrozenMXRecords(mx_records)
+        self.ttl = ttl
+
+    @property
+    def expired(self):
+        return (time.monotonic() - self.cached_at) > self.ttl
+
+    @property
+    def remaining(self) -> float:
+        """The number of seconds remaining until the item expires, negative
+        once it has expired.
+
+        """
+        return self.ttl - (time.monotonic() - self.cached_at)
+
+
+class CacheBackend(typing.Protocol):
+    """The interface a cache must implement to be used by the
+    :class:`~email_normalize.Normalizer` for caching MX record lookups.
+
+    The :class:`~email_normalize.Normalizer` records hits and access times on
+    the :class:`~email_normalize.CachedItem` instances returned by
+    :meth:`get` and calls :meth:`evict` prior to :meth:`set` when the number
+    of cached items has reached its ``cache_limit``.
+
+    """
+    def __contains__(self, key: str) -> bool:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+    def clear(self) -> None:
+        """Remove all items from the cache"""
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the least frequently, least recently used item from the
+        cache, returning its key or :data:`None` if the cache is empty.
+
+        """
+
+    def get(self, key: str, stale: float = 0.0) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for the key or :data:`None` if it is not
+        cached or has expired. Items that expired less than ``stale``
+        seconds ago are returned.
+
+        """
+
+    def items(self) -> typing.Iterable[typing.Tuple[str, CachedItem]]:
+        """Return the keys and cached items, which may include expired
+        items that have not been removed yet.
+
+        """
+
+    def set(self, key: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the key"""
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the cache counters"""
+
+
+class LFRUCache(dict):
+    """A :class:`dict` of :class:`~email_normalize.CachedItem` instances
+    that keeps a heap ordered by hits and last access, allowing the least
+    frequently, least recently used item to be evicted in ``O(log n)`` time.
+    This is the default :class:`~email_normalize.CacheBackend`.
+
+    Heap entries are invalidated lazily. When the entry at the top of the heap
+    no longer reflects the hits and last access of the cached item, it is
+    pushed back with the current values. Entries for items that were replaced
+    or removed are discarded when they surface.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._heap: typing.List[tuple] = []
+        self._counter = itertools.count()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale = 0
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key: str, item: CachedItem) -> None:
+        if dict.get(self, key) is item:
+            return
+        super().__setitem__(key, item)
+        heapq.heappush(self._heap, (
+            item.hits, item.last_access, next(self._counter), key, item))
+        if len(self._heap) > (len(self) * 2) + 64:
+            self._compact()
+
+    def clear(self) -> None:
+        super().clear()
+        self._heap.clear()
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the least frequently, least recently used item from the
+        cache, returning its key or :data:`None` if the cache is empty.
+
+        """
+        entry = self._peek()
+        if entry is None:
+            return None
+        heapq.heappop(self._heap)
+        super().__delitem__(entry[3])
+        self._evictions += 1
+        return entry[3]
+
+    def get(self, key: str,
+            default: typing.Optional[CachedItem] = None,
+            stale: float = 0.0) -> typing.Optional[CachedItem]:
+        """Return the cached item for the key, or ``default`` if it is not
+        cached. Items that expired less than ``stale`` seconds ago are
+        returned, other expired items are removed and ``default`` is
+        returned.
+
+        """
+        item = dict.get(self, key)
+        if item is None:
+            self._misses += 1
+            return default
+        elif item.expired:
+            if stale and item.remaining > -stale:
+                self._stale += 1
+                return item
+            self.pop(key, None)
+            self._expirations += 1
+            self._misses += 1
+            return default
+        self._hits += 1
+        return item
+
+    def set(self, key: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the key"""
+        self[key] = item
+
+    def setdefault(self, key: str, default: CachedItem) -> CachedItem:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the cache counters"""
+        return {
+            'size': len(self),
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'expirations': self._expirations,
+            'stale': self._stale
+        }
+
+    def update(self, *args, **kwargs) -> None:
+        for key, item in dict(*args, **kwargs).items():
+            self[key] = item
+
+    def _compact(self) -> None:
+        """Rebuild the heap, dropping entries for items no longer cached"""
+        self._heap = [
+            (item.hits, item.last_access, order, key, item)
+            for _hits, _last_access, order, key, item in self._heap
+            if dict.get(self, key) is item]
+        heapq.heapify(self._heap)
+
+    def _peek(self) -> typing.Optional[tuple]:
+        """Return the heap entry for the item that would be evicted next,
+        bringing stale entries up to date on the way.
+
+        """
+        while self._heap:
+            hits, last_access, order, key, item = self._heap[0]
+            if dict.get(self, key) is not item:
+                heapq.heappop(self._heap)
+            elif item.hits != hits or item.last_access != last_access:
+                heapq.heapreplace(self._heap, (
+                    item.hits, item.last_access, order, key, item))
+            else:
+                return self._heap[0]
+        return None
+
+
+class ShardedCache:
+    """A :class:`~email_normalize.CacheBackend` that partitions items across
+    a fixed number of :class:`~email_normalize.LFRUCache` shards by the hash
+    of the key. Each shard maintains its own eviction heap, keeping heaps
+    small and compaction local to a shard. No locks are used.
+
+    :param int shards: The number of shards to partition items across.
+        Defaults to `16`.
+
+    """
+    def __init__(self, shards: int = 16):
+        self.shards = [LFRUCache() for _offset in range(0, shards)]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._shard(key)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def clear(self) -> None:
+        """Remove all items from the cache"""
+        for shard in self.shards:
+            shard.clear()
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the least frequently, least recently used item across all
+        of the shards, returning its key or :data:`None` if the cache is
+        empty.
+
+        """
+        candidates = [(entry, shard) for entry, shard in (
+            (shard._peek(), shard) for shard in self.shards)
+            if entry is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: c[0])[1].evict()
+
+    def get(self, key: str, stale: float = 0.0) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for the key or :data:`None` if it is not
+        cached or has expired. Items that expired less than ``stale``
+        seconds ago are returned.
+
+        """
+        return self._shard(key).get(key, stale=stale)
+
+    def items(self) -> typing.Iterator[typing.Tuple[str, CachedItem]]:
+        """Return the keys and cached items of all of the shards"""
+        return itertools.chain.from_iterable(
+            shard.items() for shard in self.shards)
+
+    def set(self, key: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the key"""
+        self._shard(key)[key] = item
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the cache counters, summed across shards"""
+        stats: typing.Dict[str, int] = {}
+        for shard in self.shards:
+            for key, value in shard.stats().items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def _index(self, key: str) -> int:
+        return hash(key) % len(self.shards)
+
+    def _shard(self, key: str) -> LFRUCache:
+        return self.shards[self._index(key)]
+
+
+class StripedCache(ShardedCache):
+    """A thread safe :class:`~email_normalize.ShardedCache` that guards each
+    shard with its own lock, so that normalizers running event loops in
+    multiple threads can share a cache. Lookups of keys in different shards
+    do not wait on each other, and a lock is only held for the duration of a
+    single operation on its shard.
+
+    The hits and last access recorded on the returned
+    :class:`~email_normalize.CachedItem` instances are not locked, as a lost
+    update only affects which item is evicted next.
+
+    :param int shards: The number of shards to partition items across.
+        Defaults to `16`.
+
+    """
+    def __init__(self, shards: int = 16):
+        super().__init__(shards)
+        self._locks = [threading.Lock() for _offset in range(0, shards)]
+
+    def clear(self) -> None:
+        """Remove all items from the cache"""
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                shard.clear()
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the least frequently, least recently used item across all
+        of the shards, returning its key or :data:`None` if the cache is
+        empty. Only one shard is locked at a time, so the item evicted is
+        the least used at the time its shard was inspected.
+
+        """
+        candidates = []
+        for index, lock in enumerate(self._locks):
+            with lock:
+                entry = self.shards[index]._peek()
+            if entry is not None:
+                candidates.append((entry, index))
+        for _entry, index in sorted(candidates, key=lambda c: c[0][:3]):
+            with self._locks[index]:
+                key = self.shards[index].evict()
+            if key is not None:
+                return key
+        return None
+
+    def get(self, key: str, stale: float = 0.0) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for the key or :data:`None` if it is not
+        cached or has expired. Items that expired less than ``stale``
+        seconds ago are returned.
+
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            return self.shards[index].get(key, stale=stale)
+
+    def items(self) -> typing.List[typing.Tuple[str, CachedItem]]:
+        """Return a copy of the keys and cached items of all of the shards"""
+        items = []
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def set(self, key: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the key"""
+        index = self._index(key)
+        with self._locks[index]:
+            self.shards[index][key] = item
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the cache counters, summed across shards"""
+        stats: typing.Dict[str, int] = {}
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                shard_stats = shard.stats()
+            for key, value in shard_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+
+class _CompactItem(CachedItem):
+    """A :class:`~email_normalize.CachedItem` that reads and writes its
+    values from the arrays of a :class:`~email_normalize.CompactCache`.
+    Writes are ignored once the entry has been removed from the cache.
+
+    """
+    __slots__ = ['_cache', '_key', '_slot']
+
+    def __init__(self, cache: 'CompactCache', key: str, slot: int):
+        self._cache = cache
+        self._key = key
+        self._slot = slot
+
+    @property
+    def cached_at(self) -> float:
+        return self._cache._cached_at[self._slot]
+
+    @cached_at.setter
+    def cached_at(self, value: float) -> None:
+        if self._cache._keys[self._slot] is self._key:
+            self._cache._cached_at[self._slot] = value
+
+    @property
+    def error(self) -> typing.Optional[str]:
+        return self._cache._error_names[self._cache._errors[self._slot]]
+
+    @property
+    def hits(self) -> int:
+        return self._cache._hits_by_slot[self._slot]
+
+    @hits.setter
+    def hits(self, value: int) -> None:
+        if self._cache._keys[self._slot] is self._key:
+            self._cache._hits_by_slot[self._slot] = value
+
+    @property
+    def last_access(self) -> float:
+        return self._cache._last_access[self._slot]
+
+    @last_access.setter
+    def last_access(self, value: float) -> None:
+        if self._cache._keys[self._slot] is self._key:
+            self._cache._last_access[self._slot] = value
+
+    @property
+    def mx_records(self) -> FrozenMXRecords:
+        return self._cache._sets[self._cache._set_ids[self._slot]]
+
+    @property
+    def ttl(self) -> int:
+        return self._cache._ttl[self._slot]
+
+
+class CompactCache:
+    """A memory efficient :class:`~email_normalize.CacheBackend` for caches
+    of millions of domains.
+
+    Identical sets of MX records, such as those of domains hosted by the
+    same mailbox provider, are stored once and referenced by ID, with the
+    host names interned. The expiry, hits, and last access of each entry are
+    stored in arrays instead of a :class:`~email_normalize.CachedItem` per
+    domain, and :meth:`get` returns a lightweight view of the entry.
+
+    Eviction is approximated by sampling ``samples`` entries at random and
+    evicting the least frequently, least recently used of them, avoiding the
+    memory overhead of an eviction heap.
+
+    The :attr:`nbytes` estimate of the memory used by the cache allows the
+    :class:`~email_normalize.Normalizer` to limit the cache by size with its
+    ``cache_limit_bytes`` argument.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        normalizer = email_normalize.Normalizer(
+            cache=email_normalize.CompactCache(),
+            cache_limit=10_000_000, cache_limit_bytes=512 * 1024 * 1024)
+
+    :param int samples: The number of entries sampled when evicting.
+        Defaults to `16`.
+
+    """
+    # The array items, the key reference, and the index entry of an entry
+    _ENTRY_BYTES = sum(
+        array.array(code).itemsize for code in 'ddqQlb') + 8 + 24
+
+    def __init__(self, samples: int = 16):
+        self.samples = samples
+        self._random = random.Random()
+        self.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def nbytes(self) -> int:
+        """An estimate of the memory used by the cache in bytes"""
+        return (len(self._keys) * self._ENTRY_BYTES + self._key_bytes
+                + self._set_bytes + sys.getsizeof(self._index)
+                + sys.getsizeof(self._set_index) + sys.getsizeof(self._sets))
+
+    def clear(self) -> None:
+        """Remove all items from the cache"""
+        self._index: typing.Dict[str, int] = {}
+        self._keys: typing.List[typing.Optional[str]] = []
+        self._free: typing.List[int] = []
+        self._cached_at = array.array('d')
+        self._last_access = array.array('d')
+        self._ttl = array.array('q')
+        self._hits_by_slot = array.array('Q')
+        self._set_ids = array.array('l')
+        self._errors = array.array('b')
+        self._error_codes: typing.Dict[typing.Optional[str], int] = {None: 0}
+        self._error_names: typing.List[typing.Optional[str]] = [None]
+        self._set_index: typing.Dict[FrozenMXRecords, int] = {}
+        self._sets: typing.List[typing.Optional[FrozenMXRecords]] = []
+        self._set_refs = array.array('L')
+        self._free_sets: typing.List[int] = []
+        self._key_bytes = 0
+        self._set_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale = 0
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the least frequently, least recently used of a random
+        sample of items from the cache, returning its key or :data:`None` if
+        the cache is empty.
+
+        """
+        if not self._index:
+            return None
+        candidate = None
+        for _offset in range(0, self.samples):
+            slot = self._random.randrange(len(self._keys))
+            if self._keys[slot] is not None:
+                rank = (self._hits_by_slot[slot], self._last_access[slot])
+                if candidate is None or rank < candidate[0]:
+                    candidate = rank, slot
+        slot = candidate[1] if candidate is not None \
+            else next(iter(self._index.values()))
+        key = self._keys[slot]
+        self._remove(key, slot)
+        self._evictions += 1
+        return key
+
+    def get(self, key: str, stale: float = 0.0) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for the key or :data:`None` if it is not
+        cached. Items that expired less than ``stale`` seconds ago are
+        returned, other expired items are removed and :data:`None` is
+        returned.
+
+        """
+        slot = self._index.get(key)
+        if slot is None:
+            self._misses += 1
+            return None
+        remaining = self._ttl[slot] - (
+            time.monotonic() - self._cached_at[slot])
+        if remaining < 0:
+            if stale and remaining > -stale:
+                self._stale += 1
+                return _CompactItem(self, self._keys[slot], slot)
+            self._remove(key, slot)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._hits += 1
+        return _CompactItem(self, self._keys[slot], slot)
+
+    def items(self) -> typing.Iterator[typing.Tuple[str, CachedItem]]:
+        """Return the keys and cached items, including expired items that
+        have not been removed yet.
+
+        """
+        for key, slot in list(self._index.items()):
+            yield key, _CompactItem(self, self._keys[slot], slot)
+
+    def set(self, key: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the key"""
+        set_id = self._intern(item.mx_records)
+        error = self._error_codes.get(item.error)
+        if error is None:
+            error = self._error_codes[item.error] = len(self._error_names)
+            self._error_names.append(item.error)
+        slot = self._index.get(key)
+        if slot is not None:
+            self._release(self._set_ids[slot])
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._keys)
+            self._keys.append(None)
+            for values in (self._cached_at, self._last_access, self._ttl,
+                           self._hits_by_slot, self._set_ids, self._errors):
+                values.append(0)
+        if self._keys[slot] is None:
+            self._index[key] = slot
+            self._keys[slot] = key
+            self._key_bytes += sys.getsizeof(key)
+        self._cached_at[slot] = item.cached_at
+        self._last_access[slot] = item.last_access
+        self._ttl[slot] = int(item.ttl)
+        self._hits_by_slot[slot] = item.hits
+        self._set_ids[slot] = set_id
+        self._errors[slot] = error
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the cache counters"""
+        return {
+            'size': len(self),
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'expirations': self._expirations,
+            'stale': self._stale,
+            'mx_sets': len(self._set_index),
+            'nbytes': self.nbytes
+        }
+
+    def _intern(self, mx_records: MXRecords) -> int:
+        """Return the ID of the stored set of MX records equal to the
+        records, storing them if they are not stored yet.
+
+        """
+        if not isinstance(mx_records, FrozenMXRecords):
+            mx_records = FrozenMXRecords(mx_records)
+        set_id = self._set_index.get(mx_records)
+        if set_id is None:
+            records = FrozenMXRecords(
+                (priority, sys.intern(host)) for priority, host in mx_records)
+            if self._free_sets:
+                set_id = self._free_sets.pop()
+                self._sets[set_id] = records
+            else:
+                set_id = len(self._sets)
+                self._sets.append(records)
+                self._set_refs.append(0)
+            self._set_index[records] = set_id
+            self._set_bytes += self._set_size(records)
+        self._set_refs[set_id] += 1
+        return set_id
+
+    def _release(self, set_id: int) -> None:
+        """Release a reference to a stored set of MX records, removing the
+        set once it is no longer referenced.
+
+        """
+        self._set_refs[set_id] -= 1
+        if not self._set_refs[set_id]:
+            records = self._sets[set_id]
+            del self._set_index[records]
+            self._sets[set_id] = None
+            self._free_sets.append(set_id)
+            self._set_bytes -= self._set_size(records)
+
+    def _remove(self, key: str, slot: int) -> None:
+        del self._index[key]
+        self._keys[slot] = None
+        self._free.append(slot)
+        self._key_bytes -= sys.getsizeof(key)
+        self._release(self._set_ids[slot])
+
+    @staticmethod
+    def _set_size(records: FrozenMXRecords) -> int:
+        """Return the size of a set of MX records, counting the interned
+        host names as if they were not shared with other sets.
+
+        """
+        return sys.getsizeof(records) + sum(
+            sys.getsizeof(record) + sys.getsizeof(record[1])
+            for record in records)
+
+
+class SQLiteCache:
+    """A persistent MX record cache stored in a SQLite database, allowing
+    multiple processes on the same host to share cached lookups and for
+    cached lookups to survive a restart.
+
+    Items are stored with their TTL and the absolute time they expire at.
+    Items that have expired are not returned and when an item is returned
+    its remaining TTL is preserved. The database is opened in WAL mode so
+    that readers in one process do not block writers in another.
+
+    In addition to being used as the ``persistent_cache`` of a
+    :class:`~email_normalize.Normalizer`, it implements the
+    :class:`~email_normalize.CacheBackend` interface, evicting the item that
+    expires soonest. Hits and access times are not persisted.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        normalizer = email_normalize.Normalizer(
+            persistent_cache=email_normalize.SQLiteCache('/tmp/mx.db'))
+
+    :param str path: The path to the SQLite database file
+    :param float timeout: Seconds to wait for a lock held by another process.
+        Defaults to `5.0`.
+    :param int purge_interval: Remove expired items from the database after
+        this many items have been written. Defaults to `1000`.
+
+    """
+    def __init__(self, path: str, timeout: float = 5.0,
+                 purge_interval: int = 1000):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        import sqlite3  # Only loaded when a persistent cache is used
+
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None,
+            check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS mx_records ('
+            'domain TEXT PRIMARY KEY, mx_records TEXT NOT NULL, '
+            'ttl INTEGER NOT NULL, expires_at REAL NOT NULL, error TEXT)')
+
+    def __contains__(self, domain: str) -> bool:
+        return self._connection.execute(
+            'SELECT 1 FROM mx_records WHERE domain = ?',
+            (domain, )).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM mx_records WHERE expires_at > ?',
+            (time.time(), )).fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all items from the database"""
+        self._connection.execute('DELETE FROM mx_records')
+
+    def close(self) -> None:
+        """Close the connection to the database"""
+        self._connection.close()
+
+    def evict(self) -> typing.Optional[str]:
+        """Remove the item that expires soonest, returning its key or
+        :data:`None` if the database is empty.
+
+        """
+        row = self._connection.execute(
+            'SELECT domain FROM mx_records '
+            'ORDER BY expires_at LIMIT 1').fetchone()
+        if row is None:
+            return None
+        self._connection.execute(
+            'DELETE FROM mx_records WHERE domain = ?', (row[0], ))
+        self._evictions += 1
+        return row[0]
+
+    def get(self, domain: str, stale: float = 0.0) \
+            -> typing.Optional[CachedItem]:
+        """Return the cached item for the domain, or :data:`None` if the
+        domain is not cached or the cached item has expired. Items that
+        expired less than ``stale`` seconds ago are returned.
+
+        """
+        row = self._connection.execute(
+            'SELECT mx_records, ttl, expires_at, error FROM mx_records '
+            'WHERE domain = ?', (domain, )).fetchone()
+        remaining = row[2] - time.time() if row is not None else -stale
+        if remaining <= -stale:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return CachedItem(
+            [(priority, host) for priority, host in json.loads(row[0])],
+            row[1], min(remaining, row[1]), row[3])
+
+    def items(self) -> typing.List[typing.Tuple[str, CachedItem]]:
+        """Return the domains and cached items that have not expired"""
+        now = time.time()
+        return [
+            (domain, CachedItem(
+                [(priority, host) for priority, host in json.loads(records)],
+                ttl, min(expires_at - now, ttl), error))
+            for domain, records, ttl, expires_at, error in
+            self._connection.execute(
+                'SELECT domain, mx_records, ttl, expires_at, error '
+                'FROM mx_records WHERE expires_at > ?', (now, ))]
+
+    def set(self, domain: str, item: CachedItem) -> None:
+        """Add or replace the cached item for the domain"""
+        self._connection.execute(
+            'INSERT OR REPLACE INTO mx_records '
+            '(domain, mx_records, ttl, expires_at, error) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (domain, json.dumps(item.mx_records, separators=(',', ':')),
+             item.ttl, time.time() + item.remaining, item.error))
+        self._writes += 1
+        if self._writes >= self.purge_interval:
+            self.purge()
+
+    def purge(self) -> int:
+        """Remove expired items from the database, returning the number of
+        items removed.
+
+        """
+        self._writes = 0
+        cursor = self._connection.execute(
+            'DELETE FROM mx_records WHERE expires_at <= ?', (time.time(), ))
+        LOGGER.debug('Purged %i expired items from %s',
+                     cursor.rowcount, self.path)
+        return cursor.rowcount
+
+    def stats(self) -> typing.Dict[str, int]:
+        """Return a snapshot of the counters for this connection"""
+        return {
+            'size': len(self),
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions
+        }
+
+
+def dump_snapshot(cache: CacheBackend) -> bytes:
+    """Return a compressed snapshot of the items in the cache that have not
+    expired, ordered by their hits so that the most used items are restored
+    first. The remaining TTL of each item is stored along with the time the
+    snapshot was taken.
+
+    :param cache: The cache to snapshot
+    :type cache: :class:`~email_normalize.CacheBackend`
+    :rtype: bytes
+
+    """
+    items = sorted(
+        ((key, item) for key, item in list(cache.items()) if not item.expired),
+        key=lambda value: value[1].hits, reverse=True)
+    records: typing.Dict[tuple, MXRecords] = {}
+    return zlib.compress(pickle.dumps((
+        SNAPSHOT_VERSION, time.time(),
+        [(key, records.setdefault(tuple(item.mx_records),
+                                  list(item.mx_records)),
+          item.ttl, item.remaining, item.error, item.hits)
+         for key, item in items]), 4), 1)
+
+
+def load_snapshot(snapshot: bytes) \
+        -> typing.Iterator[typing.Tuple[str, CachedItem]]:
+    """Iterate over the keys and cached items of a snapshot created by
+    :func:`dump_snapshot`, with the remaining TTL of each item reduced by
+    the time elapsed since the snapshot was taken. Items that have expired
+    since are skipped. The snapshot is validated before the first item is
+    returned, and items with the same MX records share one
+    :class:`~email_normalize.FrozenMXRecords`.
+
+    :param bytes snapshot: The snapshot to load
+    :raises ValueError: If the snapshot is not a supported snapshot
+
+    """
+    try:
+        version, created_at, items = _SnapshotUnpickler(
+            io.BytesIO(zlib.decompress(snapshot))).load()
+    except (pickle.UnpicklingError, TypeError, ValueError, zlib.error) as err:
+        raise ValueError('Invalid cache snapshot: {}'.format(err))
+    if version != SNAPSHOT_VERSION:
+        raise ValueError('Unsupported cache snapshot version: {!r}'.format(
+            version))
+    entries: typing.List[typing.Tuple[str, CachedItem]] = []
+    records: typing.Dict[tuple, FrozenMXRecords] = {}
+    try:
+        elapsed = max(time.time() - created_at, 0.0)
+        for key, mx_records, ttl, remaining, error, hits in items:
+            if not isinstance(key, str) \
+                    or not isinstance(ttl, (int, float)) \
+                    or not isinstance(hits, int) \
+                    or not (error is None or isinstance(error, str)):
+                raise ValueError('invalid item {!r}'.format(key))
+            remaining -= elapsed
+            if remaining <= 0:
+                continue
+            mx_records = tuple(mx_records)
+            frozen = records.get(mx_records)
+            if frozen is None:
+                for priority, host in mx_records:
+                    if not isinstance(priority, int) \
+                            or not isinstance(host, str):
+                        raise ValueError(
+                            'invalid MX records for {!r}'.format(key))
+                frozen = records[mx_records] = FrozenMXRecords(mx_records)
+            item = CachedItem(frozen, ttl, remaining, error)
+            item.hits = hits
+            entries.append((key, item))
+    except (TypeError, ValueError) as err:
+        raise ValueError('Invalid cache snapshot: {}'.format(err))
+    return iter(entries)
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Only allows the builtin types that snapshots are made of, so that
+    loading a snapshot can not import or call anything.
+
+    """
+    def find_class(self, module: str, name: str) -> typing.NoReturn:
+        raise pickle.UnpicklingError(
+            'Unsupported type in snapshot: {}.{}'.format(module, name))
@@ -0,0 +1,215 @@
+"""
+Command line interface for normalizing email addresses in bulk
+
+Input is read and written in batches so that memory use remains constant
+regardless of the size of the input, while all of the batches share a single
+event loop, :class:`~email_normalize.Normalizer`, and MX record cache.
+
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import sys
+import typing
+
+import email_normalize
+from email_normalize import providers
+
+LOGGER = logging.getLogger(__name__)
+
+FORMATS = ['text', 'csv', 'jsonl']
+
+
+def parse_args(argv: typing.Optional[typing.List[str]] = None) \
+        -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='email-normalize',
+        description='Normalize email addresses, stripping mailbox provider '
+                    'specific behaviors such as plus addressing')
+    parser.add_argument(
+        'input', nargs='?', default='-',
+        help='File to read addresses from, defaults to stdin')
+    parser.add_argument(
+        '-o', '--output', default='-',
+        help='File to write results to, defaults to stdout')
+    parser.add_argument(
+        '-f', '--format', choices=FORMATS, default='text',
+        help='Input and output format. text expects one address per line '
+             'and writes the normalized address, csv and jsonl add the '
+             'normalized_address and mailbox_provider fields to each row. '
+             'Defaults to text')
+    parser.add_argument(
+        '-c', '--column', default='email',
+        help='The CSV column or JSON key that contains the address. For CSV '
+             'input without a header, this is the zero based column index. '
+             'Defaults to email')
+    parser.add_argument(
+        '--no-header', action='store_true',
+        help='CSV input does not have a header row')
+    parser.add_argument(
+        '-n', '--name-server', action='append', dest='name_servers',
+        help='Name server to use for DNS resolution, may be repeated')
+    parser.add_argument(
+        '--concurrency', type=int, default=10,
+        help='Maximum number of concurrent DNS lookups. Defaults to 10')
+    parser.add_argument(
+        '--batch-size', type=int, default=10000,
+        help='Number of rows to read and normalize at a time. '
+             'Defaults to 10000')
+    parser.add_argument(
+        '--cache-limit', type=int, default=1024,
+        help='Maximum number of domains to cache MX records for. '
+             'Defaults to 1024')
+    parser.add_argument(
+        '--offline', action='store_true',
+        help='Normalize addresses at well known mailbox provider domains '
+             'without performing DNS resolution')
+    parser.add_argument(
+        '--providers', metavar='FILE',
+        help='JSON data file of additional mailbox provider definitions')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true',
+        help='Enable debug logging')
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error('--batch-size must be at least 1, not {}'.format(
+            args.batch_size))
+    elif args.no_header and not args.column.isdecimal():
+        parser.error('--column must be a zero based column index when '
+                     '--no-header is set, not {!r}'.format(args.column))
+    return args
+
+
+class Reader:
+    """Reads rows and extracts the address from them"""
+    def __init__(self, handle: typing.TextIO, args: argparse.Namespace):
+        self.handle = handle
+        self.args = args
+        self.header: typing.Optional[typing.List[str]] = None
+
+    def rows(self) -> typing.Iterator[typing.Tuple[typing.Any, str]]:
+        """Yield tuples of the row and the address contained in the row"""
+        if self.args.format == 'csv':
+            yield from self._csv_rows()
+        elif self.args.format == 'jsonl':
+            for number, line in enumerate(self.handle, 1):
+                if line.strip():
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError(
+                            'Line {} is not a JSON object'.format(number))
+                    yield row, str(row.get(self.args.column) or '')
+        else:
+            for line in self.handle:
+                line = line.strip()
+                if line:
+                    yield line, line
+
+    def _csv_rows(self) -> typing.Iterator[typing.Tuple[typing.Any, str]]:
+        reader = csv.reader(self.handle)
+        if self.args.no_header:
+            column = int(self.args.column)
+        else:
+            self.header = next(reader, [])
+            try:
+                column = self.header.index(self.args.column)
+            except ValueError:
+                raise ValueError('Column {!r} not found in CSV header'.format(
+                    self.args.column))
+        for row in reader:
+            yield row, row[column] if column < len(row) else ''
+
+
+class Writer:
+    """Writes the rows that were read with the normalization results"""
+    def __init__(self, handle: typing.TextIO, args: argparse.Namespace):
+        self.handle = handle
+        self.args = args
+        self.csv_writer = csv.writer(handle) \
+            if args.format == 'csv' else None
+
+    def write_header(self, header: typing.Optional[typing.List[str]]) -> None:
+        if self.csv_writer is not None and header is not None:
+            self.csv_writer.writerow(
+                header + ['normalized_address', 'mailbox_provider'])
+
+    def write(self, row: typing.Any,
+              result: typing.Optional[email_normalize.Result]) -> None:
+        normalized = result.normalized_address if result else ''
+        provider = result.mailbox_provider if result else None
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(row + [normalized, provider or ''])
+        elif self.args.format == 'jsonl':
+            row['normalized_address'] = normalized or None
+            row['mailbox_provider'] = provider
+            self.handle.write(json.dumps(row))
+            self.handle.write('\n')
+        else:
+            self.handle.write(normalized)
+            self.handle.write('\n')
+
+
+async def process(reader: Reader, writer: Writer,
+                  args: argparse.Namespace) -> int:
+    """Normalize the rows from the reader in batches, writing them out.
+    Returns the number of rows processed.
+
+    """
+    normalizer = email_normalize.Normalizer(
+        args.name_servers, cache_limit=args.cache_limit,
+        offline=args.offline)
+    rows = reader.rows()
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, args.batch_size))
+        if count == 0:
+            writer.write_header(reader.header)
+        if not batch:
+            return count
+        addresses = []
+        for _row, address in batch:
+            parse_error = email_normalize.split_address(address).error
+            if parse_error is not None:
+                LOGGER.debug('Skipping invalid address %r: %s',
+                             address, parse_error.value)
+                address = None
+            addresses.append(address)
+        results = iter(await normalizer.normalize_many(
+            [address for address in addresses if address is not None],
+            args.concurrency))
+        for (row, _address), address in zip(batch, addresses):
+            writer.write(row, next(results) if address is not None else None)
+        count += len(batch)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING)
+    if args.providers:
+        try:
+            providers.register(*providers.load(args.providers))
+        except (OSError, ValueError) as err:
+            sys.stderr.write('email-normalize: error: {}\n'.format(err))
+            return 1
+    input_handle = output_handle = None
+    try:
+        input_handle = sys.stdin if args.input == '-' else open(
+            args.input, 'r', encoding='utf-8', newline='')
+        output_handle = sys.stdout if args.output == '-' else open(
+            args.output, 'w', encoding='utf-8', newline='')
+        count = asyncio.run(process(
+            Reader(input_handle, args), Writer(output_handle, args), args))
+    except (OSError, ValueError) as err:
+        sys.stderr.write('email-normalize: error: {}\n'.format(err))
+        return 1
+    finally:
+        if input_handle not in (None, sys.stdin):
+            input_handle.close()
+        if output_handle not in (None, sys.stdout):
+            output_handle.close()
+    LOGGER.debug('Normalized %i rows', count)
+    return 0
@@ -0,0 +1,327 @@
+"""
+Grouping of large address sets by their normalized address
+
+Finding the accounts that share a canonical mailbox means grouping addresses
+by their normalized address. The functions in this module consume an
+iterable of addresses, or of ``(id, address)`` pairs, in batches so that the
+distinct domains of each batch are resolved once, and add each result to a
+:class:`Deduplicator`. The :class:`Deduplicator` keys its groups by a hash of
+the normalized address and, once it holds more than ``max_entries``
+addresses, spills its groups to partition files on disk by that hash, so
+that sets larger than memory can be grouped one partition at a time.
+
+"""
+import hashlib
+import itertools
+import logging
+import os
+import pickle
+import tempfile
+import typing
+
+import email_normalize
+
+LOGGER = logging.getLogger(__name__)
+
+Item = typing.Union[str, typing.Tuple[typing.Any, str]]
+Member = typing.Tuple[typing.Any, str]
+
+
+class Group(typing.NamedTuple):
+    """Addresses that share a normalized address"""
+    normalized_address: str
+    mailbox_provider: typing.Optional[str]
+    members: typing.List[Member]
+
+
+class Deduplicator:
+    """Groups normalization results by their normalized address using
+    bounded memory.
+
+    Groups are kept in memory keyed by a 16 byte hash of the normalized
+    address. When more than ``max_entries`` addresses are held, the groups
+    are appended to one of ``partitions`` files in ``directory`` by their
+    hash and removed from memory. :meth:`groups` then merges one partition
+    at a time, so memory use is bounded by the size of the largest
+    partition. The partition files are removed by :meth:`close`.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        with dedupe.Deduplicator() as deduplicator:
+            for user_id, result in results:
+                deduplicator.add(result, user_id)
+            for group in deduplicator.groups(min_size=2):
+                print(group.normalized_address, group.members)
+
+    :param int max_entries: The maximum number of addresses to hold in memory
+        before spilling to disk. Defaults to `1000000`.
+    :param int partitions: The number of partition files to spill to.
+        Defaults to `64`.
+    :param directory: Optional directory to create the partition files in,
+        defaulting to the system temporary directory
+    :type directory: str or None
+    :raises ValueError: If ``max_entries`` or ``partitions`` is less than `1`
+
+    """
+    def __init__(self,
+                 max_entries: int = 1_000_000,
+                 partitions: int = 64,
+                 directory: typing.Optional[str] = None):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        elif partitions < 1:
+            raise ValueError('partitions must be at least 1')
+        self.directory = directory
+        self.invalid = 0
+        self.max_entries = max_entries
+        self.partitions = partitions
+        self._entries = 0
+        self._groups: typing.Dict[bytes, list] = {}
+        self._spill_directory: typing.Optional[
+            tempfile.TemporaryDirectory] = None
+        self._spilled = 0
+        self._spills = 0
+
+    def __enter__(self) -> 'Deduplicator':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """The number of addresses added"""
+        return self._entries
+
+    @property
+    def spills(self) -> int:
+        """The number of times the groups in memory were spilled to disk"""
+        return self._spills
+
+    def add(self, result: email_normalize.Result,
+            identifier: typing.Any = None) -> None:
+        """Add a normalization result to its group, identified by
+        ``identifier``, spilling the groups to disk if over ``max_entries``.
+
+        :param result: The result to add
+        :type result: :class:`~email_normalize.Result`
+        :param identifier: Optional picklable identifier of the address,
+            such as an account id
+
+        """
+        key = hashlib.blake2b(
+            result.normalized_address.encode('utf-8'),
+            digest_size=16).digest()
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = group = [
+                result.normalized_address, result.mailbox_provider, []]
+        group[2].append((identifier, result.address))
+        self._entries += 1
+        if self._entries - self._spilled > self.max_entries:
+            self._spill()
+
+    def close(self) -> None:
+        """Remove the groups in memory and the partition files"""
+        self._groups.clear()
+        if self._spill_directory is not None:
+            self._spill_directory.cleanup()
+            self._spill_directory = None
+
+    def groups(self, min_size: int = 1) -> typing.Iterator[Group]:
+        """Yield the groups with at least ``min_size`` members. Groups held
+        only in memory are yielded in the order they were first added,
+        otherwise groups are yielded one partition at a time.
+
+        :param int min_size: The minimum number of members of the groups to
+            yield. Defaults to `1`, use `2` to only yield duplicates.
+        :rtype: typing.Iterator[Group]
+
+        """
+        if self._spill_directory is None:
+            for group in self._groups.values():
+                if len(group[2]) >= min_size:
+                    yield Group(group[0], group[1], list(group[2]))
+            return
+        if self._groups:
+            self._spill()
+        for partition in range(0, self.partitions):
+            merged: typing.Dict[bytes, list] = {}
+            for key, group in self._read(partition):
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = group
+                else:
+                    existing[2].extend(group[2])
+            for group in merged.values():
+                if len(group[2]) >= min_size:
+                    yield Group(group[0], group[1], group[2])
+
+    def _path(self, partition: int) -> str:
+        return os.path.join(self._spill_directory.name,
+                            '{:04d}.spill'.format(partition))
+
+    def _read(self, partition: int) \
+            -> typing.Iterator[typing.Tuple[bytes, list]]:
+        """Yield the spilled groups of a partition"""
+        try:
+            handle = open(self._path(partition), 'rb')
+        except FileNotFoundError:
+            return
+        with handle:
+            while True:
+                try:
+                    yield from pickle.load(handle)
+                except EOFError:
+                    return
+
+    def _spill(self) -> None:
+        """Append the groups in memory to their partition files"""
+        if self._spill_directory is None:
+            self._spill_directory = tempfile.TemporaryDirectory(
+                prefix='email-normalize-', dir=self.directory)
+        buckets: typing.List[list] = [[] for _ in range(0, self.partitions)]
+        for key, group in self._groups.items():
+            buckets[int.from_bytes(key[:4], 'big') % self.partitions].append(
+                (key, group))
+        for partition, bucket in enumerate(buckets):
+            if bucket:
+                with open(self._path(partition), 'ab') as handle:
+                    pickle.dump(bucket, handle, pickle.HIGHEST_PROTOCOL)
+        LOGGER.debug('Spilled %i groups of %i addresses to disk',
+                     len(self._groups), self._entries - self._spilled)
+        self._spilled = self._entries
+        self._groups.clear()
+        self._spills += 1
+
+
+async def dedupe(items: typing.Iterable[Item],
+                 normalizer: email_normalize.Normalizer,
+                 min_size: int = 1,
+                 batch_size: int = 10_000,
+                 concurrency: int = 10,
+                 deduplicator: typing.Optional[Deduplicator] = None) \
+        -> typing.AsyncIterator[Group]:
+    """Group addresses by their normalized address, yielding the groups
+    once all of the addresses have been normalized.
+
+    Items are either addresses, identified by their position in ``items``,
+    or ``(id, address)`` pairs. They are normalized ``batch_size`` at a time
+    with :meth:`~email_normalize.Normalizer.normalize_many`, so that each
+    distinct domain of a batch is resolved once and cached for the batches
+    that follow. Addresses that can not be split into their local and domain
+    parts are skipped and counted in :attr:`Deduplicator.invalid`.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        from email_normalize import dedupe
+
+        normalizer = email_normalize.Normalizer()
+        async for group in dedupe.dedupe(
+                users.items(), normalizer, min_size=2):
+            print(group.normalized_address, [id for id, _ in group.members])
+
+    :param items: The addresses or ``(id, address)`` pairs to group
+    :param normalizer: The normalizer used to normalize the addresses
+    :type normalizer: :class:`~email_normalize.Normalizer`
+    :param int min_size: The minimum number of members of the groups to
+        yield. Defaults to `1`, use `2` to only yield duplicates.
+    :param int batch_size: The number of addresses to normalize at a time.
+        Defaults to `10000`.
+    :param int concurrency: The maximum number of domains to resolve
+        concurrently. Defaults to `10`.
+    :param deduplicator: Optional :class:`Deduplicator` to add the results
+        to, such as one with a lower ``max_entries``. A deduplicator that is
+        passed in is not closed.
+    :type deduplicator: :class:`Deduplicator` or None
+    :rtype: typing.AsyncIterator[Group]
+    :raises ValueError: If ``batch_size`` is less than `1`
+
+    """
+    owned = deduplicator is None
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    try:
+        for batch in _batches(items, batch_size, deduplicator):
+            results = await normalizer.normalize_many(
+                [address for _identifier, address in batch], concurrency)
+            for (identifier, _address), result in zip(batch, results):
+                deduplicator.add(result, identifier)
+        for group in deduplicator.groups(min_size):
+            yield group
+    finally:
+        if owned:
+            deduplicator.close()
+
+
+def dedupe_sync(items: typing.Iterable[Item],
+                normalizer: email_normalize.SyncNormalizer,
+                min_size: int = 1,
+                batch_size: int = 10_000,
+                concurrency: int = 10,
+                deduplicator: typing.Optional[Deduplicator] = None,
+                timeout: typing.Optional[float] = None) \
+        -> typing.Iterator[Group]:
+    """Group addresses by their normalized address, blocking while each
+    batch is normalized. See :func:`dedupe`.
+
+    :param items: The addresses or ``(id, address)`` pairs to group
+    :param normalizer: The normalizer used to normalize the addresses
+    :type normalizer: :class:`~email_normalize.SyncNormalizer`
+    :param int min_size: The minimum number of members of the groups to
+        yield. Defaults to `1`, use `2` to only yield duplicates.
+    :param int batch_size: The number of addresses to normalize at a time.
+        Defaults to `10000`.
+    :param int concurrency: The maximum number of domains to resolve
+        concurrently. Defaults to `10`.
+    :param deduplicator: Optional :class:`Deduplicator` to add the results
+        to. A deduplicator that is passed in is not closed.
+    :type deduplicator: :class:`Deduplicator` or None
+    :param timeout: Optional number of seconds to wait for each batch
+    :type timeout: float or None
+    :rtype: typing.Iterator[Group]
+    :raises ValueError: If ``batch_size`` is less than `1`
+
+    """
+    owned = deduplicator is None
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    try:
+        for batch in _batches(items, batch_size, deduplicator):
+            results = normalizer.normalize_many(
+                [address for _identifier, address in batch], concurrency,
+                timeout)
+            for (identifier, _address), result in zip(batch, results):
+                deduplicator.add(result, identifier)
+        yield from deduplicator.groups(min_size)
+    finally:
+        if owned:
+            deduplicator.close()
+
+
+def _batches(items: typing.Iterable[Item], batch_size: int,
+             deduplicator: Deduplicator) \
+        -> typing.Iterator[typing.List[Member]]:
+    """Yield batches of ``(id, address)`` pairs with the addresses that can
+    not be split removed and counted as invalid.
+
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    pairs = ((offset, item) if isinstance(item, str) else item
+             for offset, item in enumerate(items))
+    while True:
+        chunk = list(itertools.islice(pairs, batch_size))
+        if not chunk:
+            break
+        batch = []
+        for identifier, address in chunk:
+            if email_normalize.split_address(address).error is not None:
+                deduplicator.invalid += 1
+            else:
+                batch.append((identifier, address))
+        if batch:
+            yield batch
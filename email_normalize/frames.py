@@ -0,0 +1,217 @@
+"""
+Vectorized normalization of pandas and Arrow address columns
+
+Normalizing a column of addresses one address at a time spends most of its
+time in the Python interpreter. The functions in this module split the
+addresses of a column with vectorized string operations, factorize the domain
+parts so that each distinct domain is resolved only once, and apply the
+mailbox provider rules to all addresses of the matching providers at once.
+
+Requires :mod:`pandas`, which is installed with the ``pandas`` extra. Arrow
+arrays are supported when :mod:`pyarrow` is installed, which is included in
+the ``arrow`` extra.
+
+"""
+import re
+import typing
+from email import utils
+
+import numpy
+import pandas
+
+import email_normalize
+from email_normalize import providers
+
+try:
+    import pyarrow
+except ImportError:  # pragma: nocover
+    pyarrow = None
+
+Column = typing.Union[pandas.Series, typing.Sequence[str], typing.Any]
+Frame = typing.Union[pandas.DataFrame, typing.Any]
+
+_STRING_DTYPE = pandas.StringDtype('pyarrow') if pyarrow else 'string'
+
+
+class _SplitColumn(typing.NamedTuple):
+    addresses: pandas.Series
+    stripped: pandas.Series
+    local_parts: pandas.Series
+    domain_parts: pandas.Series
+    codes: numpy.ndarray
+    domains: typing.List[str]
+    arrow: bool
+
+
+async def normalize_column(values: Column,
+                           normalizer: email_normalize.Normalizer,
+                           concurrency: int = 10) -> Frame:
+    """Normalize a column of email addresses, returning the results as
+    columns with the same row order and index as the input.
+
+    The result has an ``address`` column with the original addresses, and
+    ``normalized_address`` and ``mailbox_provider`` columns as categorical
+    values. Addresses that can not be split into their local and domain
+    parts have a null ``normalized_address``. A :class:`pandas.DataFrame` is
+    returned for a :class:`pandas.Series` or sequence of addresses, and a
+    :class:`pyarrow.Table` with dictionary encoded columns is returned for an
+    Arrow array.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        from email_normalize import frames
+
+        normalizer = email_normalize.Normalizer()
+        results = await frames.normalize_column(df['email'], normalizer)
+
+    :param values: The addresses to normalize
+    :type values: pandas.Series, pyarrow.Array, or list(str)
+    :param normalizer: The normalizer used to resolve MX records
+    :type normalizer: :class:`~email_normalize.Normalizer`
+    :param int concurrency: The maximum number of domains to resolve
+        concurrently. Defaults to `10`.
+    :rtype: pandas.DataFrame or pyarrow.Table
+
+    """
+    column = _split_column(values)
+    mx_records = await normalizer.mx_records_many(
+        _unresolved(column.domains, normalizer.offline), concurrency)
+    return _normalize_column(column, mx_records, normalizer.offline)
+
+
+def normalize_column_sync(values: Column,
+                          normalizer: email_normalize.SyncNormalizer,
+                          concurrency: int = 10,
+                          timeout: typing.Optional[float] = None) -> Frame:
+    """Normalize a column of email addresses, blocking until the MX records
+    of its domains are resolved. See :func:`normalize_column`.
+
+    The vectorized work is done in the calling thread, only the distinct
+    domains are resolved on the event loop of the
+    :class:`~email_normalize.SyncNormalizer`.
+
+    :param values: The addresses to normalize
+    :type values: pandas.Series, pyarrow.Array, or list(str)
+    :param normalizer: The normalizer used to resolve MX records
+    :type normalizer: :class:`~email_normalize.SyncNormalizer`
+    :param int concurrency: The maximum number of domains to resolve
+        concurrently. Defaults to `10`.
+    :param timeout: Optional number of seconds to wait for the MX records
+    :type timeout: float or None
+    :rtype: pandas.DataFrame or pyarrow.Table
+
+    """
+    offline = normalizer.offline
+    column = _split_column(values)
+    mx_records = normalizer.mx_records_many(
+        _unresolved(column.domains, offline), concurrency, timeout)
+    return _normalize_column(column, mx_records, offline)
+
+
+def _split_column(values: Column) -> _SplitColumn:
+    """Split the addresses into their lowercased local and domain parts and
+    factorize the domain parts.
+
+    """
+    arrow = pyarrow is not None and isinstance(
+        values, (pyarrow.Array, pyarrow.ChunkedArray))
+    addresses = values.to_pandas() if arrow else pandas.Series(values)
+    stripped = addresses.astype(_STRING_DTYPE).str.strip()
+    parse = stripped.str.contains(
+        email_normalize.NEEDS_PARSING.pattern, na=False).to_numpy(bool)
+    if parse.any():
+        stripped[parse] = [
+            utils.parseaddr(value)[1] for value in stripped[parse]]
+    lowered = stripped.str.lower()
+    local_parts = lowered.str.replace(r'(?s)@.*', '', regex=True)
+    domain_parts = lowered.str.replace(r'(?s)^[^@]*@', '', regex=True)
+    valid = ((lowered.str.count('@') == 1)
+             & (local_parts.str.len() > 0)
+             & (domain_parts.str.len() > 0)).to_numpy(bool, na_value=False)
+    local_parts = local_parts.where(valid)
+    domain_parts = domain_parts.where(valid)
+    codes, domains = pandas.factorize(domain_parts)
+    return _SplitColumn(addresses, stripped, local_parts, domain_parts,
+                        codes, list(domains), arrow)
+
+
+def _unresolved(domains: typing.List[str], offline: bool) -> typing.List[str]:
+    """Return the domains that need their MX records resolved"""
+    if not offline:
+        return domains
+    return [domain_part for domain_part in domains
+            if domain_part not in providers.ProviderDomains]
+
+
+def _normalize_column(column: _SplitColumn,
+                      mx_records: typing.Dict[str, email_normalize.MXRecords],
+                      offline: bool) -> Frame:
+    """Apply the provider rules to the split column, with the rules of each
+    provider applied in the same order as its compiled transform, as a mask
+    over the addresses at its domains.
+
+    """
+    empty = email_normalize.FrozenMXRecords()
+    domain_providers = []
+    for domain_part in column.domains:
+        provider = providers.ProviderDomains.get(domain_part) \
+            if offline else None
+        if provider is None:
+            provider = email_normalize.lookup_provider(
+                mx_records.get(domain_part, empty))
+        domain_providers.append(provider)
+
+    # Invalid addresses have a code of -1, which maps to the trailing entry
+    names = sorted({provider.__name__
+                    for provider in domain_providers if provider})
+    provider_codes = numpy.array(
+        [names.index(provider.__name__) if provider else -1
+         for provider in domain_providers] + [-1])[column.codes]
+
+    local_parts = column.local_parts.copy()
+    domain_parts = column.domain_parts.copy()
+    for provider in {provider for provider in domain_providers if provider}:
+        mask = numpy.array(
+            [candidate is provider for candidate in domain_providers]
+            + [False])[column.codes]
+        _apply_rules(provider, mask, column, local_parts, domain_parts)
+
+    frame = pandas.DataFrame({
+        'address': column.addresses,
+        'normalized_address': pandas.Categorical(
+            local_parts + '@' + domain_parts),
+        'mailbox_provider': pandas.Categorical.from_codes(
+            provider_codes, categories=names)
+    }, index=column.addresses.index)
+    if column.arrow:
+        return pyarrow.Table.from_pandas(frame, preserve_index=False)
+    return frame
+
+
+def _apply_rules(provider: typing.Type[providers.MailboxProvider],
+                 mask: numpy.ndarray, column: _SplitColumn,
+                 local_parts: pandas.Series,
+                 domain_parts: pandas.Series) -> None:
+    """Apply the rules of a provider to the masked addresses in place"""
+    separators = providers.tag_separators(provider)
+    if provider.PreserveCase:
+        local_parts[mask] = column.stripped[mask].str.replace(
+            r'(?s)@.*', '', regex=True)
+    if provider.Flags & providers.Rules.LOCAL_PART_AS_HOSTNAME:
+        hostname = mask & (domain_parts.str.count(r'\.') > 1).to_numpy(
+            bool, na_value=False)
+        if hostname.any():
+            local_parts[hostname] = domain_parts[hostname].str.replace(
+                r'(?s)\..*', '', regex=True)
+            domain_parts[hostname] = domain_parts[hostname].str.replace(
+                r'(?s)^[^.]*\.', '', regex=True)
+    if provider.Flags & providers.Rules.STRIP_PERIODS:
+        local_parts[mask] = local_parts[mask].str.replace(
+            '.', '', regex=False)
+    if separators:
+        local_parts[mask] = local_parts[mask].str.replace(
+            '(?s)[{}].*'.format(re.escape(separators)), '', regex=True)
+    if provider.Aliases:
+        domain_parts[mask] = domain_parts[mask].replace(provider.Aliases)
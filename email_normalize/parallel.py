@@ -0,0 +1,280 @@
+"""
+Multi-process normalization for CPU bound bulk jobs
+
+Once MX records are cached, normalizing an address is bound by the CPU work
+of parsing the address and applying the mailbox provider rules. The
+:class:`~email_normalize.parallel.ParallelNormalizer` resolves the distinct
+domains of its input once in the parent process, then shards the addresses by
+domain across single process pools so that each domain is always normalized
+by the same worker. Each chunk of addresses is shipped with the MX records
+for its domains, and the workers return only the normalized address and
+mailbox provider for each address, keeping serialization overhead low.
+
+The input is read a window of addresses at a time and each worker has a
+bounded number of chunks outstanding, so that memory use does not grow with
+the size of the input.
+
+"""
+import collections
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import typing
+import zlib
+
+import email_normalize
+from email_normalize import providers
+
+WorkerResult = typing.Tuple[str, typing.Optional[str]]
+
+
+def _normalize_chunk(email_addresses: typing.List[str],
+                     mx_records: typing.Dict[str, email_normalize.MXRecords],
+                     offline: bool) -> typing.List[WorkerResult]:
+    """Normalize a chunk of addresses in a worker process using the MX
+    records resolved by the parent process.
+
+    """
+    empty = email_normalize.FrozenMXRecords()
+    records_by_domain = {
+        domain_part: email_normalize.FrozenMXRecords(records)
+        for domain_part, records in mx_records.items()}
+    results = []
+    for email_address in email_addresses:
+        local_part, domain_part = _split(email_address)
+        provider = providers.ProviderDomains.get(domain_part) \
+            if offline else None
+        if provider is None:
+            provider = email_normalize.lookup_provider(
+                records_by_domain.get(domain_part, empty))
+        if provider is not None:
+            local_part, domain_part = provider.transform(
+                email_address, local_part, domain_part)
+        results.append(('@'.join([local_part, domain_part]),
+                        provider.__name__ if provider else None))
+    return results
+
+
+def _split(email_address: str) -> typing.Tuple[str, str]:
+    """Return the lowercased local and domain parts of an address, raising
+    :exc:`~email_normalize.InvalidAddressError` if it can not be split.
+
+    """
+    local_part, domain_part, parse_error = email_normalize.split_address(
+        email_address)
+    if parse_error is not None:
+        raise email_normalize.InvalidAddressError(email_address, parse_error)
+    return local_part, domain_part
+
+
+def _register_providers(
+        definitions: typing.List[typing.Dict[str, typing.Any]]) -> None:
+    """Register the providers of the parent process in a worker process"""
+    providers.register(*[providers.from_definition(definition)
+                         for definition in definitions])
+
+
+class ParallelNormalizer:
+    """Normalize large sets of email addresses using multiple processes.
+
+    MX records are resolved in the parent process by a
+    :class:`~email_normalize.SyncNormalizer`, with each distinct domain
+    resolved once. Addresses are then sharded by domain across ``processes``
+    worker processes in chunks of ``chunk_size`` addresses.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        from email_normalize import parallel
+
+        with parallel.ParallelNormalizer(processes=4) as normalizer:
+            for result in normalizer.iter_normalize(addresses):
+                print(result.normalized_address)
+
+    Additional arguments are passed through to the
+    :class:`~email_normalize.Normalizer` used to resolve MX records.
+    Providers that were added with :func:`email_normalize.providers.register`
+    before the normalizer is created are also used by the worker processes.
+
+    :param processes: The number of worker processes. Defaults to the number
+        of CPUs.
+    :type processes: int or None
+    :param int chunk_size: The number of addresses sent to a worker at a
+        time. Defaults to `1000`.
+    :param int concurrency: The maximum number of domains to resolve
+        concurrently. Defaults to `10`.
+    :param int max_pending: The maximum number of chunks sent to a worker
+        that it has not completed. Defaults to `2`.
+    :raises ValueError: If ``max_pending`` is less than `1`
+
+    """
+    def __init__(self,
+                 processes: typing.Optional[int] = None,
+                 chunk_size: int = 1000,
+                 concurrency: int = 10,
+                 max_pending: int = 2,
+                 **kwargs):
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.offline = kwargs.get('offline', False)
+        definitions = [
+            providers.definition(provider) for provider in providers.Providers
+            if getattr(providers, provider.__name__, None) is not provider]
+        # Workers are started on demand, after the resolver thread of the
+        # SyncNormalizer, so they must not be forked from this process
+        context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in
+            multiprocessing.get_all_start_methods() else 'spawn')
+        self._executors = [
+            concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=context,
+                initializer=_register_providers, initargs=(definitions,))
+            for _offset in range(0, processes or os.cpu_count() or 1)]
+        self._normalizer = email_normalize.SyncNormalizer(**kwargs)
+
+    def __enter__(self) -> 'ParallelNormalizer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker processes and the MX record resolver"""
+        for executor in self._executors:
+            executor.shutdown()
+        self._normalizer.close()
+
+    def normalize_many(self, email_addresses: typing.Iterable[str]) \
+            -> typing.List[email_normalize.Result]:
+        """Normalize multiple email addresses, returning a list of
+        :class:`~email_normalize.Result` instances in the same order as the
+        addresses that were passed in.
+
+        :param email_addresses: The addresses to normalize
+        :rtype: list(:class:`~email_normalize.Result`)
+        :raises ValueError: If an address can not be split into its local
+            and domain parts. The first invalid address in a window of
+            addresses is raised prior to any DNS resolution for the window,
+            see :meth:`iter_normalize`.
+
+        """
+        return list(self.iter_normalize(email_addresses))
+
+    def iter_normalize(self,
+                       email_addresses: typing.Iterable[str],
+                       ordered: bool = True,
+                       window: int = 100_000) \
+            -> typing.Iterator[email_normalize.Result]:
+        """Normalize multiple email addresses, yielding a
+        :class:`~email_normalize.Result` for each address. When ``ordered``
+        is :data:`True`, results are yielded in the same order as the
+        addresses that were passed in, otherwise they are yielded as each
+        chunk is completed by a worker.
+
+        The addresses are read ``window`` at a time, with the addresses of a
+        window normalized before the next window is read.
+
+        :param email_addresses: The addresses to normalize
+        :param bool ordered: Yield results in input order. Defaults to
+            `True`.
+        :param int window: The number of addresses to read at a time.
+            Defaults to `100000`.
+        :raises ValueError: If an address can not be split into its local
+            and domain parts, or if ``window`` is less than `1`. The first
+            invalid address in a window is raised prior to any DNS
+            resolution for the window.
+
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        iterator = iter(email_addresses)
+        while True:
+            addresses = list(itertools.islice(iterator, window))
+            if not addresses:
+                break
+            yield from self._iter_window(addresses, ordered)
+
+    def _iter_window(self, addresses: typing.List[str], ordered: bool) \
+            -> typing.Iterator[email_normalize.Result]:
+        """Normalize a window of addresses, sending at most `max_pending`
+        chunks to each worker at a time.
+
+        """
+        domains = [self._domain_part(address) for address in addresses]
+        shards: typing.List[typing.Deque[typing.List[int]]] = [
+            collections.deque() for _ in self._executors]
+        for index, domain_part in enumerate(domains):
+            shard = shards[zlib.crc32(domain_part.encode('utf-8'))
+                           % len(shards)]
+            if not shard or len(shard[-1]) >= self.chunk_size:
+                shard.append([])
+            shard[-1].append(index)
+
+        mx_records = self._normalizer.mx_records_many(
+            [domain_part for domain_part in set(domains)
+             if not (self.offline
+                     and domain_part in providers.ProviderDomains)],
+            self.concurrency)
+        empty = email_normalize.FrozenMXRecords()
+
+        pending: typing.Dict[concurrent.futures.Future,
+                             typing.Tuple[int, typing.List[int]]] = {}
+
+        def submit(shard: int) -> None:
+            chunk = shards[shard].popleft()
+            chunk_records = {}
+            for index in chunk:
+                if domains[index] in mx_records:
+                    chunk_records[domains[index]] = list(
+                        mx_records[domains[index]])
+            future = self._executors[shard].submit(
+                _normalize_chunk, [addresses[i] for i in chunk],
+                chunk_records, self.offline)
+            pending[future] = shard, chunk
+
+        for shard, chunks in enumerate(shards):
+            for _offset in range(0, min(self.max_pending, len(chunks))):
+                submit(shard)
+
+        results: typing.List[typing.Optional[email_normalize.Result]] = \
+            [None] * len(addresses)
+        offset = 0
+        try:
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    list(pending),
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    shard, chunk = pending.pop(future)
+                    if shards[shard]:
+                        submit(shard)
+                    for index, (normalized, provider) in zip(
+                            chunk, future.result()):
+                        result = email_normalize.Result(
+                            addresses[index], normalized,
+                            mx_records.get(domains[index], empty), provider)
+                        if ordered:
+                            results[index] = result
+                        else:
+                            yield result
+                while offset < len(results) and results[offset] is not None:
+                    yield results[offset]
+                    results[offset] = None
+                    offset += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _domain_part(email_address: str) -> str:
+        """Return the domain part of an address used to shard it, raising
+        :exc:`~email_normalize.InvalidAddressError` if the address can not
+        be split.
+
+        """
+        return _split(email_address)[1]
@@ -1,9 +1,26 @@
 """
 Provider Specific Rules
+
+The rules of each :class:`MailboxProvider` are compiled into a single
+transform function when the provider is defined. Additional providers can be
+defined as subclasses or loaded from a JSON data file with :func:`load`, and
+are added to the providers used for detection with :func:`register`.
+
 """
 import enum
+import functools
+import json
+import re
 import typing
 
+import email_normalize
+
+Transform = typing.Callable[[str, str, str], typing.Tuple[str, str]]
+
+# The keys of a provider definition in a data file
+DEFINITION_KEYS = {'name', 'rules', 'mx_domains', 'domains', 'aliases',
+                   'separators', 'preserve_case'}
+
 
 class Rules(enum.Flag):
     """Represents what features a mailbox provider supports in dynamic
@@ -18,35 +35,164 @@ class Rules(enum.Flag):
     STRIP_PERIODS = enum.auto()
 
 
+def compile_rules(provider: typing.Type['MailboxProvider']) -> Transform:
+    """Compile the rules of a provider into a single transform function that
+    applies only the steps for the rules the provider has, so that
+    normalizing an address is one call without testing each rule.
+
+    :param provider: The provider to compile the rules of
+    :rtype: callable
+
+    """
+    steps: typing.List[Transform] = []
+    if provider.PreserveCase:
+        steps.append(_preserve_case)
+    if provider.Flags & Rules.LOCAL_PART_AS_HOSTNAME:
+        steps.append(_local_part_as_hostname)
+    if provider.Flags & Rules.STRIP_PERIODS:
+        steps.append(_strip_periods)
+    separators = tag_separators(provider)
+    if separators:
+        steps.append(_strip_tag(separators))
+    if provider.Aliases:
+        steps.append(_replace_alias(dict(provider.Aliases)))
+    rules = tuple(steps)
+
+    def transform(email_address: str, local_part: str, domain_part: str) \
+            -> typing.Tuple[str, str]:
+        for step in rules:
+            local_part, domain_part = step(
+                email_address, local_part, domain_part)
+        return local_part, domain_part
+
+    return transform
+
+
+def tag_separators(provider: typing.Type['MailboxProvider']) -> str:
+    """Return the characters that start a tag in the local part of the
+    addresses of a provider.
+
+    :param provider: The provider to return the separators of
+    :rtype: str
+
+    """
+    return ''.join(dict.fromkeys(
+        ('+' if provider.Flags & Rules.PLUS_ADDRESSING else '')
+        + ('-' if provider.Flags & Rules.DASH_ADDRESSING else '')
+        + provider.Separators))
+
+
+def _preserve_case(email_address: str, _local_part: str,
+                   domain_part: str) -> typing.Tuple[str, str]:
+    """Use the local part of the address in the case it was given in"""
+    address = email_normalize.bare_address(email_address) \
+        or email_address.strip()
+    return address.partition('@')[0], domain_part
+
+
+def _local_part_as_hostname(_email_address: str, local_part: str,
+                            domain_part: str) -> typing.Tuple[str, str]:
+    """Use the first label of a subdomain of the domain as the local part"""
+    if domain_part.count('.') > 1:
+        local_part, _, domain_part = domain_part.partition('.')
+    return local_part, domain_part
+
+
+def _strip_periods(_email_address: str, local_part: str,
+                   domain_part: str) -> typing.Tuple[str, str]:
+    """Remove the periods from the local part"""
+    return local_part.replace('.', ''), domain_part
+
+
+def _strip_tag(separators: str) -> Transform:
+    """Return a step that removes the tag starting at the first of the
+    separators from the local part.
+
+    """
+    if len(separators) == 1:
+        def strip_tag(_email_address: str, local_part: str,
+                      domain_part: str) -> typing.Tuple[str, str]:
+            return local_part.partition(separators)[0], domain_part
+    else:
+        split = re.compile('[{}]'.format(re.escape(separators))).split
+
+        def strip_tag(_email_address: str, local_part: str,
+                      domain_part: str) -> typing.Tuple[str, str]:
+            return split(local_part, 1)[0], domain_part
+    return strip_tag
+
+
+def _replace_alias(aliases: typing.Dict[str, str]) -> Transform:
+    """Return a step that replaces an alias domain with its domain"""
+    def replace_alias(_email_address: str, local_part: str,
+                      domain_part: str) -> typing.Tuple[str, str]:
+        return local_part, aliases.get(domain_part, domain_part)
+    return replace_alias
+
+
 class MailboxProvider:
-    """Base class to define the contract for the mail providers"""
-    Flags: Rules
-    MXDomains: typing.Set[str]
+    """Base class to define the contract for the mail providers
+
+    ``MXDomains`` are matched against the hosts of the MX records for a
+    domain, while ``Domains`` are the well known domains of the provider's
+    own addresses, used to detect the provider without DNS resolution.
+
+    ``Aliases`` maps domains to the domain that normalized addresses use,
+    such as ``googlemail.com`` to ``gmail.com``. ``Separators`` are
+    characters that start a tag in the local part, in addition to ``+`` and
+    ``-`` for the ``PLUS_ADDRESSING`` and ``DASH_ADDRESSING`` rules. When
+    ``PreserveCase`` is set, the local part keeps the case it was given in.
+
+    The rules are compiled into the ``transform`` function of the provider
+    when it is defined, which is called with the address and its lowercased
+    local and domain parts and returns the normalized local and domain parts.
+
+    """
+    Flags: Rules = Rules(0)
+    MXDomains: typing.Set[str] = set()
+    Domains: typing.Set[str] = set()
+    Aliases: typing.Dict[str, str] = {}
+    Separators: str = ''
+    PreserveCase: bool = False
+    transform: Transform
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.transform = staticmethod(compile_rules(cls))
 
 
 class Apple(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING
     MXDomains: typing.Set[str] = {'icloud.com'}
+    Domains: typing.Set[str] = {'icloud.com', 'mac.com', 'me.com'}
 
 
 class Fastmail(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING ^ Rules.LOCAL_PART_AS_HOSTNAME
     MXDomains: typing.Set[str] = {'messagingengine.com'}
+    Domains: typing.Set[str] = {'fastmail.com', 'fastmail.fm'}
 
 
 class Google(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING ^ Rules.STRIP_PERIODS
     MXDomains: typing.Set[str] = {'google.com', 'googlemail.com'}
+    Domains: typing.Set[str] = {'gmail.com', 'googlemail.com'}
+    Aliases: typing.Dict[str, str] = {'googlemail.com': 'gmail.com'}
 
 
 class Microsoft(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING
     MXDomains: typing.Set[str] = {'outlook.com'}
+    Domains: typing.Set[str] = {
+        'hotmail.co.uk', 'hotmail.com', 'hotmail.fr', 'live.com',
+        'msn.com', 'outlook.com'}
 
 
 class ProtonMail(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING
     MXDomains: typing.Set[str] = {'protonmail.ch'}
+    Domains: typing.Set[str] = {
+        'pm.me', 'proton.me', 'protonmail.ch', 'protonmail.com'}
 
 
 class Rackspace(MailboxProvider):
@@ -57,16 +203,20 @@ class Rackspace(MailboxProvider):
 class Yahoo(MailboxProvider):
     Flags: Rules = Rules.DASH_ADDRESSING
     MXDomains: typing.Set[str] = {'yahoodns.net'}
+    Domains: typing.Set[str] = {
+        'rocketmail.com', 'yahoo.co.uk', 'yahoo.com', 'ymail.com'}
 
 
 class Yandex(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING
     MXDomains: typing.Set[str] = {'mx.yandex.net', 'yandex.ru'}
+    Domains: typing.Set[str] = {'ya.ru', 'yandex.com', 'yandex.ru'}
 
 
 class Zoho(MailboxProvider):
     Flags: Rules = Rules.PLUS_ADDRESSING
     MXDomains: typing.Set[str] = {'zoho.com'}
+    Domains: typing.Set[str] = {'zoho.com', 'zohomail.com'}
 
 
 Providers = [
@@ -80,3 +230,174 @@ Providers = [
     Yandex,
     Zoho
 ]
+
+ProviderDomains: typing.Dict[str, typing.Type[MailboxProvider]] = {}
+
+MXDomainIndex: typing.Dict[str, typing.Type[MailboxProvider]] = {}
+
+
+def definition(provider: typing.Type[MailboxProvider]) \
+        -> typing.Dict[str, typing.Any]:
+    """Return the definition of a provider as it would be written in a data
+    file loaded by :func:`load`.
+
+    :param provider: The provider to return the definition of
+    :rtype: dict
+
+    """
+    return {
+        'name': provider.__name__,
+        'rules': sorted(rule.name for rule in Rules
+                        if provider.Flags & rule),
+        'mx_domains': sorted(provider.MXDomains),
+        'domains': sorted(provider.Domains),
+        'aliases': dict(provider.Aliases),
+        'separators': provider.Separators,
+        'preserve_case': provider.PreserveCase
+    }
+
+
+def from_definition(value: typing.Dict[str, typing.Any]) \
+        -> typing.Type[MailboxProvider]:
+    """Create a provider from its definition in a data file. Only ``name``
+    is required.
+
+    :param dict value: The definition of the provider
+    :rtype: type
+    :raises ValueError: If the definition is not valid
+
+    """
+    unknown = set(value) - DEFINITION_KEYS
+    if unknown:
+        raise ValueError('Unknown provider keys: {}'.format(
+            ', '.join(sorted(unknown))))
+    elif not value.get('name') or not isinstance(value['name'], str):
+        raise ValueError('Provider definitions require a name')
+    for key in ('rules', 'mx_domains', 'domains'):
+        if not _is_strings(value.get(key, []), list):
+            raise ValueError('{} of provider {!r} must be a list of '
+                             'strings'.format(key, value['name']))
+    aliases = value.get('aliases', {})
+    if not _is_strings(aliases, dict) \
+            or not _is_strings(list(aliases.values()), list):
+        raise ValueError('aliases of provider {!r} must map strings to '
+                         'strings'.format(value['name']))
+    elif not isinstance(value.get('separators', ''), str):
+        raise ValueError('separators of provider {!r} must be a '
+                         'string'.format(value['name']))
+    flags = Rules(0)
+    for name in value.get('rules', []):
+        try:
+            flags |= Rules[name.upper()]
+        except KeyError:
+            raise ValueError('Unknown rule {!r} for provider {!r}'.format(
+                name, value['name']))
+    return typing.cast(typing.Type[MailboxProvider], type(
+        str(value['name']), (MailboxProvider,), {
+            'Flags': flags,
+            'MXDomains': {domain.lower()
+                          for domain in value.get('mx_domains', [])},
+            'Domains': {domain.lower() for domain in value.get('domains', [])},
+            'Aliases': {alias.lower(): domain.lower() for alias, domain
+                        in value.get('aliases', {}).items()},
+            'Separators': value.get('separators', ''),
+            'PreserveCase': bool(value.get('preserve_case', False)),
+            '__module__': __name__}))
+
+
+def _is_strings(value: typing.Any, container: type) -> bool:
+    """Return whether the value is an instance of ``container`` that holds
+    only strings, checking the keys of a :class:`dict`.
+
+    """
+    return isinstance(value, container) \
+        and all(isinstance(item, str) for item in value)
+
+
+def load(path: str) -> typing.List[typing.Type[MailboxProvider]]:
+    """Load provider definitions from a JSON data file containing a list of
+    definitions, returning the providers. The providers are not used for
+    detection until they are passed to :func:`register`.
+
+    .. code-block:: json
+
+        [{"name": "Example",
+          "rules": ["PLUS_ADDRESSING", "STRIP_PERIODS"],
+          "mx_domains": ["mx.example.net"],
+          "domains": ["example.net"],
+          "aliases": {"example-mail.net": "example.net"},
+          "separators": "=",
+          "preserve_case": false}]
+
+    :param str path: The path to the data file
+    :rtype: list(type)
+    :raises ValueError: If the data file is not a list of valid definitions
+
+    """
+    with open(path, 'r', encoding='utf-8') as handle:
+        values = json.load(handle)
+    if not isinstance(values, list) \
+            or not all(isinstance(value, dict) for value in values):
+        raise ValueError('{} is not a list of provider definitions'.format(
+            path))
+    return [from_definition(value) for value in values]
+
+
+def register(*providers: typing.Type[MailboxProvider]) -> None:
+    """Add providers to those used to detect the mailbox provider of an
+    address, replacing any provider with the same name. Providers should be
+    registered before addresses are normalized, as the provider detected for
+    cached MX records is remembered.
+
+    :param providers: The providers to add
+    :type providers: type
+
+    """
+    for provider in providers:
+        for offset, existing in enumerate(Providers):
+            if existing.__name__ == provider.__name__:
+                Providers[offset] = provider
+                break
+        else:
+            Providers.append(provider)
+    ProviderDomains.clear()
+    MXDomainIndex.clear()
+    for provider in Providers:
+        for domain in provider.Domains | set(provider.Aliases):
+            ProviderDomains[domain] = provider
+    for provider in reversed(Providers):
+        for domain in provider.MXDomains:
+            MXDomainIndex[domain.lower()] = provider
+    lookup_hosts.cache_clear()
+
+
+def lookup_host(host: str) -> typing.Optional[typing.Type[MailboxProvider]]:
+    """Return the provider for an MX host if the host is, or is a subdomain
+    of, one of the provider's ``MXDomains``. The most specific domain is
+    matched first by walking the labels of the host from the left.
+
+    """
+    host = host.lower().rstrip('.')
+    provider = MXDomainIndex.get(host)
+    position = host.find('.')
+    while provider is None and position >= 0:
+        provider = MXDomainIndex.get(host[position + 1:])
+        position = host.find('.', position + 1)
+    return provider
+
+
+@functools.lru_cache(maxsize=4096)
+def lookup_hosts(hosts: typing.Tuple[str, ...]) \
+        -> typing.Optional[typing.Type[MailboxProvider]]:
+    """Return the provider for the first MX host that matches a provider,
+    memoized by the set of hosts as many domains share the same MX hosts.
+
+    """
+    for host in hosts:
+        provider = lookup_host(host)
+        if provider is not None:
+            return provider
+    return None
+
+
+register()
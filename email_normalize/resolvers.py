@@ -0,0 +1,137 @@
+"""
+Pooled DNS resolvers shared between normalizers
+"""
+import asyncio
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: nocover
+    import aiodns
+
+
+class ResolverPool:
+    """A pool of :class:`aiodns.DNSResolver` instances that can be shared
+    by any number of :class:`~email_normalize.Normalizer` instances running
+    on the same event loop.
+
+    Each query is sent to the resolver with the fewest outstanding queries,
+    so that a slow query does not stall the queries behind it on the same
+    channel. When multiple name servers are configured, each resolver in the
+    pool prefers a different name server, falling back to the others. The
+    total number of outstanding queries of the pool can be capped with
+    ``max_queries``, with additional queries waiting for a slot.
+
+    The resolvers are created on the first query, on the event loop that
+    the query is performed on. :mod:`aiodns` and :mod:`pycares` are not
+    imported until then, so that processes that never query DNS do not pay
+    for loading them.
+
+    **Usage Example**
+
+    .. code-block:: python
+
+        pool = email_normalize.ResolverPool(
+            ['10.0.0.2', '10.0.0.3'], size=4, timeout=2.0, tries=2,
+            max_queries=100)
+        normalizers = [email_normalize.Normalizer(resolver=pool)
+                       for _offset in range(0, 10)]
+
+    :param name_servers: Optional list of hostnames to use for DNS resolution
+    :type name_servers: list(str) or None
+    :param int size: The number of resolvers in the pool. Defaults to `1`.
+    :param timeout: Optional number of seconds to wait for a name server to
+        respond before trying again. Defaults to the c-ares default.
+    :type timeout: float or None
+    :param tries: Optional number of times to try each name server.
+        Defaults to the c-ares default.
+    :type tries: int or None
+    :param bool rotate: Rotate between the name servers of each resolver for
+        each query instead of always trying them in order. Defaults to
+        `False`.
+    :param bool tcp: Query the name servers using TCP instead of UDP.
+        Defaults to `False`.
+    :param max_queries: Optional limit on the number of outstanding queries
+        of the pool
+    :type max_queries: int or None
+
+    Additional keyword arguments are passed through to
+    :class:`aiodns.DNSResolver`.
+
+    """
+    def __init__(self,
+                 name_servers: typing.Optional[typing.List[str]] = None,
+                 size: int = 1,
+                 timeout: typing.Optional[float] = None,
+                 tries: typing.Optional[int] = None,
+                 rotate: bool = False,
+                 tcp: bool = False,
+                 max_queries: typing.Optional[int] = None,
+                 **kwargs):
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.max_queries = max_queries
+        self.name_servers = name_servers
+        self.size = size
+        self.tcp = tcp
+        self._options = dict(kwargs)
+        if timeout is not None:
+            self._options['timeout'] = timeout
+        if tries is not None:
+            self._options['tries'] = tries
+        if rotate:
+            self._options['rotate'] = True
+        self._outstanding: typing.List[int] = []
+        self._resolvers: typing.List['aiodns.DNSResolver'] = []
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+
+    @property
+    def outstanding(self) -> int:
+        """The number of queries currently in progress"""
+        return sum(self._outstanding)
+
+    async def query(self, host: str, qtype: str) -> typing.Any:
+        """Query DNS using the resolver with the fewest outstanding queries,
+        waiting for a slot if ``max_queries`` are already in progress.
+
+        :param str host: The hostname to query
+        :param str qtype: The record type to query, such as ``MX``
+        :raises aiodns.error.DNSError: If the query fails
+
+        """
+        if not self._resolvers:
+            self._create()
+        if self._semaphore is None:
+            return await self._query(host, qtype)
+        async with self._semaphore:
+            return await self._query(host, qtype)
+
+    def _create(self) -> None:
+        """Create the resolvers and the query limit on the running loop,
+        with each resolver preferring a different name server.
+
+        """
+        import aiodns
+        import pycares
+
+        options = dict(self._options)
+        if self.tcp:
+            options['flags'] = \
+                options.get('flags', 0) | pycares.ARES_FLAG_USEVC
+        for offset in range(0, self.size):
+            name_servers = None
+            if self.name_servers:
+                start = offset % len(self.name_servers)
+                name_servers = \
+                    self.name_servers[start:] + self.name_servers[:start]
+            self._resolvers.append(
+                aiodns.DNSResolver(name_servers, **options))
+        self._outstanding = [0] * self.size
+        if self.max_queries:
+            self._semaphore = asyncio.Semaphore(self.max_queries)
+
+    async def _query(self, host: str, qtype: str) -> typing.Any:
+        index = self._outstanding.index(min(self._outstanding))
+        self._outstanding[index] += 1
+        try:
+            return await self._resolvers[index].query(host, qtype)
+        finally:
+            self._outstanding[index] -= 1
@@ -0,0 +1,43 @@
+import asyncio
+import typing
+
+Records = typing.List[typing.Tuple[int, str]]
+
+
+class FakeMXRecord(typing.NamedTuple):
+    host: str
+    priority: int
+    ttl: int
+
+
+class FakeResolver:
+    """Stands in for :class:`~email_normalize.ResolverPool`, answering MX
+    queries with the ``records`` of each domain, or ``default`` for other
+    domains, after the domain's delay in ``delays``. Errors queued with
+    :meth:`fail` are raised by the next queries for the domain.
+
+    """
+    def __init__(self,
+                 records: typing.Optional[typing.Dict[str, Records]] = None,
+                 default: typing.Optional[Records] = None,
+                 delays: typing.Optional[typing.Dict[str, float]] = None,
+                 ttl: int = 60):
+        self.default = default if default is not None \
+            else [(10, 'mx.zoho.com')]
+        self.delays = delays or {}
+        self.errors: typing.Dict[str, typing.List[Exception]] = {}
+        self.queries: typing.List[str] = []
+        self.records = records or {}
+        self.ttl = ttl
+
+    def fail(self, domain_part: str, err: Exception) -> None:
+        """Raise ``err`` for the next query of the domain"""
+        self.errors.setdefault(domain_part, []).append(err)
+
+    async def query(self, host: str, qtype: str) -> typing.List[FakeMXRecord]:
+        self.queries.append(host)
+        await asyncio.sleep(self.delays.get(host, 0))
+        if self.errors.get(host):
+            raise self.errors[host].pop(0)
+        return [FakeMXRecord(mx_host, priority, self.ttl)
+                for priority, mx_host in self.records.get(host, self.default)]
@@ -0,0 +1,609 @@
+import asyncio
+import copy
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from unittest import mock
+
+import email_normalize
+from email_normalize import caches
+from tests import fakes
+
+
+class SQLiteCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'mx.db')
+        self.cache = email_normalize.SQLiteCache(self.path)
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_set_and_get(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [(5, 'gmail-smtp-in.l.google.com')], 300))
+        item = self.cache.get('gmail.com')
+        self.assertListEqual(
+            item.mx_records, [(5, 'gmail-smtp-in.l.google.com')])
+        self.assertEqual(item.ttl, 300)
+        self.assertFalse(item.expired)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get('gmail.com'))
+
+    def test_items(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [(5, 'gmail-smtp-in.l.google.com')], 300, 100))
+        self.cache.set('expired.com', email_normalize.CachedItem([], 300, -1))
+        items = self.cache.items()
+        self.assertListEqual([key for key, _item in items], ['gmail.com'])
+        self.assertListEqual(
+            items[0][1].mx_records, [(5, 'gmail-smtp-in.l.google.com')])
+        self.assertLessEqual(items[0][1].remaining, 100)
+
+    def test_remaining_ttl_is_preserved(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300, 10))
+        item = self.cache.get('gmail.com')
+        self.assertEqual(item.ttl, 300)
+        self.assertLessEqual(item.remaining, 10)
+        self.assertGreater(item.remaining, 9)
+
+    def test_expired_items_are_not_returned(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300, 10))
+        with mock.patch('time.time', return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get('gmail.com'))
+            self.assertEqual(len(self.cache), 0)
+            self.assertEqual(self.cache.purge(), 1)
+
+    def test_evict_soonest_expiring(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300))
+        self.cache.set('yahoo.com', email_normalize.CachedItem([], 300, 10))
+        self.assertEqual(self.cache.evict(), 'yahoo.com')
+        self.assertIsNone(self.cache.get('yahoo.com'))
+        self.assertDictEqual(self.cache.stats(), {
+            'size': 1, 'hits': 0, 'misses': 1, 'evictions': 1})
+        self.cache.clear()
+        self.assertIsNone(self.cache.evict())
+
+    def test_stale_and_error(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [], 300, -5, 'servfail'))
+        self.assertIsNone(self.cache.get('gmail.com'))
+        item = self.cache.get('gmail.com', stale=10)
+        self.assertTrue(item.expired)
+        self.assertEqual(item.error, 'servfail')
+        self.assertIn('gmail.com', self.cache)
+
+    def test_shared_between_connections(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300))
+        other = email_normalize.SQLiteCache(self.path)
+        self.addCleanup(other.close)
+        self.assertIsNotNone(other.get('gmail.com'))
+
+
+class PersistentNormalizerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.persistent_cache = email_normalize.SQLiteCache(
+            os.path.join(self.directory.name, 'mx.db'))
+        self.resolver = fakes.FakeResolver()
+        self.normalizer = email_normalize.Normalizer(
+            persistent_cache=self.persistent_cache, resolver=self.resolver)
+        email_normalize.cache.clear()
+
+    def tearDown(self) -> None:
+        email_normalize.cache.clear()
+        self.persistent_cache.close()
+        self.directory.cleanup()
+
+    async def test_persistent_cache_is_used(self):
+        self.persistent_cache.set('example.com', email_normalize.CachedItem(
+            [(10, 'mx.zoho.com')], 300))
+        result = await self.normalizer.normalize('foo+bar@example.com')
+        self.assertListEqual(self.resolver.queries, [])
+        self.assertEqual(result.normalized_address, 'foo@example.com')
+        self.assertEqual(result.mailbox_provider, 'Zoho')
+        self.assertIn('example.com', email_normalize.cache)
+
+    async def test_resolved_records_are_persisted(self):
+        await self.normalizer.mx_records('example.com')
+        item = self.persistent_cache.get('example.com')
+        self.assertListEqual(item.mx_records, [(10, 'mx.zoho.com')])
+        self.assertEqual(item.ttl, 60)
+
+
+class FrozenMXRecordsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = email_normalize.FrozenMXRecords(
+            [(5, 'gmail-smtp-in.l.google.com'),
+             (10, 'alt1.gmail-smtp-in.l.google.com')])
+
+    def test_is_a_list(self):
+        self.assertIsInstance(self.records, list)
+        self.assertListEqual(
+            self.records, [(5, 'gmail-smtp-in.l.google.com'),
+                           (10, 'alt1.gmail-smtp-in.l.google.com')])
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            self.records.append((20, 'foo'))
+        with self.assertRaises(TypeError):
+            self.records[0] = (20, 'foo')
+        with self.assertRaises(TypeError):
+            del self.records[0]
+        with self.assertRaises(TypeError):
+            self.records += [(20, 'foo')]
+        with self.assertRaises(TypeError):
+            self.records.sort()
+        self.assertEqual(len(self.records), 2)
+
+    def test_copy_is_mutable(self):
+        records = self.records.copy()
+        self.assertIs(type(records), list)
+        records.append((20, 'foo'))
+        self.assertEqual(len(self.records), 2)
+
+    def test_copy_module_returns_self(self):
+        self.assertIs(copy.copy(self.records), self.records)
+        self.assertIs(copy.deepcopy(self.records), self.records)
+
+    def test_hashable(self):
+        self.assertEqual(
+            hash(self.records),
+            hash(email_normalize.FrozenMXRecords(list(self.records))))
+
+    def test_pickle(self):
+        value = pickle.loads(pickle.dumps(self.records))
+        self.assertIsInstance(value, email_normalize.FrozenMXRecords)
+        self.assertListEqual(value, self.records)
+
+    def test_cached_item_freezes_records(self):
+        item = email_normalize.CachedItem([(10, 'mx.zoho.com')], 60)
+        self.assertIsInstance(item.mx_records, email_normalize.FrozenMXRecords)
+        item = email_normalize.CachedItem(self.records, 60)
+        self.assertIs(item.mx_records, self.records)
+
+
+class SnapshotTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.cache = email_normalize.LFRUCache()
+        for offset in range(0, 5):
+            item = email_normalize.CachedItem(
+                [(10, 'mx.domain-{}.com'.format(offset))], 300, 100)
+            item.hits = offset
+            self.cache['domain-{}.com'.format(offset)] = item
+        self.cache['expired.com'] = email_normalize.CachedItem([], 300, -1)
+        self.cache['failed.com'] = email_normalize.CachedItem(
+            [], 30, error='servfail')
+
+    def normalizer(self, cache_limit=1024) -> email_normalize.Normalizer:
+        return email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), cache_limit=cache_limit)
+
+    async def test_export_and_import(self):
+        snapshot = self.normalizer().export_cache()
+        self.assertIsInstance(snapshot, bytes)
+        source = email_normalize.Normalizer(cache=self.cache)
+        normalizer = self.normalizer()
+        self.assertEqual(normalizer.import_cache(source.export_cache()), 6)
+        self.assertNotIn('expired.com', normalizer.cache)
+        item = normalizer.cache.get('domain-3.com')
+        self.assertIsInstance(item.mx_records, email_normalize.FrozenMXRecords)
+        self.assertListEqual(item.mx_records, [(10, 'mx.domain-3.com')])
+        self.assertEqual(item.ttl, 300)
+        self.assertEqual(item.hits, 3)
+        self.assertGreater(item.remaining, 99)
+        self.assertLessEqual(item.remaining, 100)
+        self.assertEqual(normalizer.cache.get('failed.com').error, 'servfail')
+
+    async def test_elapsed_time_is_subtracted(self):
+        snapshot = caches.dump_snapshot(self.cache)
+        with mock.patch('time.time', return_value=time.time() + 50):
+            items = dict(caches.load_snapshot(snapshot))
+        self.assertLessEqual(items['domain-0.com'].remaining, 50)
+        self.assertNotIn('failed.com', items)
+
+    async def test_most_used_imported_first(self):
+        snapshot = caches.dump_snapshot(self.cache)
+        normalizer = self.normalizer(cache_limit=2)
+        self.assertEqual(normalizer.import_cache(snapshot), 2)
+        self.assertSetEqual(
+            set(dict(normalizer.cache.items())),
+            {'domain-4.com', 'domain-3.com'})
+
+    async def test_existing_items_are_kept(self):
+        normalizer = self.normalizer()
+        existing = email_normalize.CachedItem([(1, 'mx.example.com')], 60)
+        normalizer.cache.set('domain-0.com', existing)
+        self.assertEqual(
+            normalizer.import_cache(caches.dump_snapshot(self.cache)), 5)
+        self.assertIs(normalizer.cache.get('domain-0.com'), existing)
+
+    def test_sharded_cache(self):
+        cache = email_normalize.ShardedCache(4)
+        for key, item in self.cache.items():
+            cache.set(key, item)
+        self.assertSetEqual(
+            {key for key, _item in caches.load_snapshot(
+                caches.dump_snapshot(cache))},
+            {'domain-0.com', 'domain-1.com', 'domain-2.com', 'domain-3.com',
+             'domain-4.com', 'failed.com'})
+
+    def test_invalid_snapshot(self):
+        for snapshot in [b'', b'not a snapshot',
+                         zlib.compress(pickle.dumps((2, 0, []))),
+                         zlib.compress(pickle.dumps(mock.sentinel))]:
+            with self.subTest(snapshot=snapshot):
+                with self.assertRaises(ValueError):
+                    list(caches.load_snapshot(snapshot))
+
+    def test_malformed_snapshot_items(self):
+        for items in [None, [None], [('a.com', None, 60, 30, None, 0)],
+                      [('a.com', [(10, 'mx.a.com')], 60, 30, None)],
+                      [('a.com', [None], 60, 30, None, 0)],
+                      [('a.com', [('10', 'mx.a.com')], 60, 30, None, 0)],
+                      [(1, [], 60, 30, None, 0)],
+                      [('a.com', [], '60', 30, None, 0)],
+                      [('a.com', [], 60, '30', None, 0)]]:
+            snapshot = zlib.compress(pickle.dumps(
+                (caches.SNAPSHOT_VERSION, time.time(), items)))
+            with self.subTest(items=items):
+                with self.assertRaisesRegex(
+                        ValueError, '^Invalid cache snapshot: '):
+                    caches.load_snapshot(snapshot)
+
+    def test_identical_records_are_shared(self):
+        for offset in range(0, 3):
+            self.cache['shared-{}.com'.format(offset)] = \
+                email_normalize.CachedItem([(10, 'mx.shared.com')], 300)
+        items = dict(caches.load_snapshot(caches.dump_snapshot(self.cache)))
+        self.assertIs(items['shared-0.com'].mx_records,
+                      items['shared-2.com'].mx_records)
+        self.assertIsNot(items['shared-0.com'].mx_records,
+                         items['domain-0.com'].mx_records)
+
+    async def test_prefetch(self):
+        resolver = fakes.FakeResolver()
+        normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), resolver=resolver)
+        self.assertEqual(await normalizer.prefetch(
+            ['a.com', 'b.com', 'a.com', 'c.com'], concurrency=2), 3)
+        self.assertEqual(await normalizer.prefetch(['a.com']), 1)
+        self.assertListEqual(
+            sorted(resolver.queries), ['a.com', 'b.com', 'c.com'])
+        self.assertEqual(len(normalizer.cache), 3)
+
+
+class LFRUCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = email_normalize.LFRUCache()
+
+    def test_evict_least_frequently_used(self):
+        for offset in range(0, 10):
+            key = 'key-{}'.format(offset)
+            self.cache[key] = email_normalize.CachedItem([], 60)
+            self.cache[key].hits = 10 - offset
+        self.assertEqual(self.cache.evict(), 'key-9')
+        self.assertEqual(self.cache.evict(), 'key-8')
+        self.assertEqual(len(self.cache), 8)
+
+    def test_evict_least_recently_used(self):
+        for offset in range(0, 10):
+            key = 'key-{}'.format(offset)
+            self.cache[key] = email_normalize.CachedItem([], 60)
+            self.cache[key].hits = 1
+            self.cache[key].last_access = time.monotonic()
+        self.cache['key-0'].last_access = time.monotonic()
+        self.assertEqual(self.cache.evict(), 'key-1')
+
+    def test_evict_skips_replaced_and_deleted_items(self):
+        self.cache['foo'] = email_normalize.CachedItem([], 60)
+        self.cache['bar'] = email_normalize.CachedItem([], 60)
+        self.cache['bar'].hits = 5
+        self.cache['foo'] = email_normalize.CachedItem([], 60)
+        self.cache['foo'].hits = 10
+        self.cache['baz'] = email_normalize.CachedItem([], 60)
+        self.cache['baz'].hits = 1
+        del self.cache['baz']
+        self.assertEqual(self.cache.evict(), 'bar')
+        self.assertEqual(self.cache.evict(), 'foo')
+        self.assertIsNone(self.cache.evict())
+
+    def test_heap_is_compacted(self):
+        for _offset in range(0, 1000):
+            self.cache['foo'] = email_normalize.CachedItem([], 60)
+        self.assertLess(len(self.cache._heap), 100)
+
+    def test_clear(self):
+        self.cache['foo'] = email_normalize.CachedItem([], 60)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.evict())
+
+    def test_get_removes_expired_items(self):
+        self.cache.set('foo', email_normalize.CachedItem([], 60, 0))
+        self.cache.set('bar', email_normalize.CachedItem([], 60))
+        self.assertIsNone(self.cache.get('foo'))
+        self.assertNotIn('foo', self.cache)
+        self.assertIsNotNone(self.cache.get('bar'))
+        self.assertIsNone(self.cache.get('baz'))
+        self.cache.evict()
+        self.assertDictEqual(self.cache.stats(), {
+            'size': 0, 'hits': 1, 'misses': 2,
+            'evictions': 1, 'expirations': 1, 'stale': 0})
+
+    def test_get_stale(self):
+        self.cache.set('foo', email_normalize.CachedItem([], 60, -5))
+        self.assertIs(self.cache.get('foo', stale=10), self.cache['foo'])
+        self.assertEqual(self.cache.stats()['stale'], 1)
+        self.assertIsNone(self.cache.get('foo', stale=2))
+        self.assertNotIn('foo', self.cache)
+
+
+class ShardedCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = email_normalize.ShardedCache(4)
+
+    def test_set_and_get(self):
+        for offset in range(0, 100):
+            self.cache.set(
+                'key-{}'.format(offset), email_normalize.CachedItem([], 60))
+        self.assertEqual(len(self.cache), 100)
+        self.assertIn('key-10', self.cache)
+        self.assertIsNotNone(self.cache.get('key-10'))
+        self.assertIsNone(self.cache.get('foo'))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_evict_across_shards(self):
+        for offset in range(0, 100):
+            item = email_normalize.CachedItem([], 60)
+            item.hits = 100 - offset
+            self.cache.set('key-{}'.format(offset), item)
+        self.assertEqual(self.cache.evict(), 'key-99')
+        self.assertEqual(self.cache.evict(), 'key-98')
+        self.assertNotIn('key-99', self.cache)
+        self.assertEqual(self.cache.stats()['evictions'], 2)
+
+    def test_evict_empty(self):
+        self.assertIsNone(self.cache.evict())
+
+
+class CacheBackendTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_normalizer_cache(self):
+        normalizer = email_normalize.Normalizer(
+            cache=email_normalize.ShardedCache(), cache_limit=2,
+            resolver=fakes.FakeResolver())
+        for domain in ['foo.com', 'bar.com', 'baz.com', 'baz.com']:
+            self.assertListEqual(
+                await normalizer.mx_records(domain), [(10, 'mx.zoho.com')])
+        self.assertEqual(len(normalizer.cache), 2)
+        self.assertNotIn('foo.com', normalizer.cache)
+        self.assertNotIn('foo.com', email_normalize.cache)
+        self.assertEqual(normalizer.cache.get('baz.com').hits, 2)
+        self.assertEqual(normalizer.cache.stats()['evictions'], 1)
+
+    async def test_compact_cache_records_miss(self):
+        cache = email_normalize.CompactCache()
+        normalizer = email_normalize.Normalizer(
+            cache=cache, resolver=fakes.FakeResolver(delays={
+                'foo.com': 0.01}))
+        await asyncio.gather(*[normalizer.mx_records('foo.com')
+                               for _offset in range(0, 3)])
+        slot = cache._index['foo.com']
+        self.assertEqual(cache._hits_by_slot[slot], 3)
+        self.assertGreater(cache._last_access[slot], 0)
+
+    def test_default_is_module_cache(self):
+        normalizer = email_normalize.Normalizer()
+        self.assertIs(normalizer.cache, email_normalize.cache)
+
+
+class StripedCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = email_normalize.StripedCache(4)
+
+    def test_set_get_and_evict(self):
+        for offset in range(0, 8):
+            item = email_normalize.CachedItem([(1, 'mx.example.com')], 60)
+            item.hits = offset
+            self.cache.set('domain-{}.com'.format(offset), item)
+        self.assertEqual(len(self.cache), 8)
+        self.assertIn('domain-3.com', self.cache)
+        self.assertEqual(self.cache.get('domain-3.com').hits, 3)
+        self.assertEqual(self.cache.evict(), 'domain-0.com')
+        self.assertEqual(self.cache.evict(), 'domain-1.com')
+        self.assertIsInstance(self.cache.items(), list)
+        self.assertEqual(len(self.cache.items()), 6)
+        self.assertEqual(self.cache.stats()['evictions'], 2)
+        self.cache.clear()
+        self.assertIsNone(self.cache.evict())
+
+    def test_concurrent_threads(self):
+        errors = []
+
+        def worker(offset: int) -> None:
+            try:
+                for value in range(0, 2_000):
+                    key = 'domain-{}.com'.format((offset * value) % 50)
+                    item = self.cache.get(key)
+                    if item is None:
+                        self.cache.set(key, email_normalize.CachedItem(
+                            [(1, 'mx.example.com')], value % 3 - 1))
+                    else:
+                        item.hits += 1
+                    if len(self.cache) > 20:
+                        self.cache.evict()
+                    if value % 100 == 0:
+                        self.cache.items()
+                        self.cache.stats()
+            except Exception as error:  # pragma: nocover
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker, args=(offset,))
+                   for offset in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual(errors, [])
+        self.assertLessEqual(len(self.cache), 28)
+
+    def test_sync_normalizers_share_cache(self):
+        normalizers = [email_normalize.SyncNormalizer(
+            cache=self.cache, cache_limit=10, resolver=fakes.FakeResolver())
+            for _offset in range(0, 4)]
+
+        def worker(normalizer: email_normalize.SyncNormalizer) -> None:
+            for offset in range(0, 200):
+                normalizer.normalize('foo@domain-{}.com'.format(offset % 25))
+
+        try:
+            threads = []
+            for normalizer in normalizers:
+                threads.append(
+                    threading.Thread(target=worker, args=(normalizer,)))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for normalizer in normalizers:
+                normalizer.close()
+        self.assertLessEqual(len(self.cache), 10 + len(normalizers))
+        self.assertGreater(self.cache.stats()['evictions'], 0)
+
+
+class CompactCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = email_normalize.CompactCache(samples=100)
+
+    def test_set_and_get(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [(5, 'gmail-smtp-in.l.google.com')], 300, error=None))
+        item = self.cache.get('gmail.com')
+        self.assertIsInstance(item, email_normalize.CachedItem)
+        self.assertIsInstance(item.mx_records, email_normalize.FrozenMXRecords)
+        self.assertListEqual(
+            item.mx_records, [(5, 'gmail-smtp-in.l.google.com')])
+        self.assertEqual(item.ttl, 300)
+        self.assertIsNone(item.error)
+        self.assertFalse(item.expired)
+        self.assertIn('gmail.com', self.cache)
+        self.assertEqual(len(self.cache), 1)
+        self.assertIsNone(self.cache.get('yahoo.com'))
+
+    def test_identical_mx_records_are_stored_once(self):
+        for domain in ['a.com', 'b.com']:
+            self.cache.set(domain, email_normalize.CachedItem(
+                [(1, 'aspmx.l.google.com')], 300))
+        self.cache.set('c.com', email_normalize.CachedItem(
+            [(10, 'mx.c.com')], 300))
+        self.assertIs(self.cache.get('a.com').mx_records,
+                      self.cache.get('b.com').mx_records)
+        self.assertEqual(self.cache.stats()['mx_sets'], 2)
+        self.cache.set('c.com', email_normalize.CachedItem(
+            [(1, 'aspmx.l.google.com')], 300))
+        self.assertEqual(self.cache.stats()['mx_sets'], 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['mx_sets'], 0)
+
+    def test_hits_and_last_access_are_written_through(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300))
+        item = self.cache.get('gmail.com')
+        item.hits += 2
+        item.last_access = 10.0
+        item = self.cache.get('gmail.com')
+        self.assertEqual(item.hits, 2)
+        self.assertEqual(item.last_access, 10.0)
+
+    def test_writes_after_removal_are_ignored(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem([], 300))
+        item = self.cache.get('gmail.com')
+        self.assertEqual(self.cache.evict(), 'gmail.com')
+        self.cache.set('yahoo.com', email_normalize.CachedItem([], 300))
+        item.hits = 100
+        self.assertEqual(self.cache.get('yahoo.com').hits, 0)
+
+    def test_expired_and_stale(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [], 300, remaining=-5, error='servfail'))
+        item = self.cache.get('gmail.com', stale=10)
+        self.assertTrue(item.expired)
+        self.assertEqual(item.error, 'servfail')
+        self.assertIsNone(self.cache.get('gmail.com'))
+        self.assertNotIn('gmail.com', self.cache)
+        stats = self.cache.stats()
+        self.assertEqual(stats['stale'], 1)
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_evict_least_used(self):
+        for hits, domain in enumerate(['a.com', 'b.com', 'c.com']):
+            item = email_normalize.CachedItem([], 300)
+            item.hits = 10 - hits
+            self.cache.set(domain, item)
+        self.assertEqual(self.cache.evict(), 'c.com')
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertIsNotNone(self.cache.evict())
+        self.assertIsNotNone(self.cache.evict())
+        self.assertIsNone(self.cache.evict())
+
+    def test_slots_are_reused(self):
+        for offset in range(0, 10):
+            self.cache.set('{}.com'.format(offset),
+                           email_normalize.CachedItem([], 300))
+        for offset in range(0, 10):
+            self.cache.evict()
+            self.cache.set('new-{}.com'.format(offset),
+                           email_normalize.CachedItem([], 300))
+        self.assertEqual(len(self.cache._keys), 10)
+        self.assertEqual(len(self.cache), 10)
+
+    def test_snapshot(self):
+        self.cache.set('gmail.com', email_normalize.CachedItem(
+            [(5, 'gmail-smtp-in.l.google.com')], 300))
+        items = dict(caches.load_snapshot(caches.dump_snapshot(self.cache)))
+        self.assertListEqual(
+            items['gmail.com'].mx_records,
+            [(5, 'gmail-smtp-in.l.google.com')])
+
+
+class CacheLimitBytesTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_evicts_by_size(self):
+        domains = ['domain-{}.com'.format(offset) for offset in range(0, 100)]
+        cache = email_normalize.CompactCache()
+        normalizer = email_normalize.Normalizer(
+            cache=cache, cache_limit=1000, cache_limit_bytes=4096,
+            resolver=fakes.FakeResolver(
+                {domain: [(10, 'mx.{}'.format(domain))]
+                 for domain in domains}))
+        for domain in domains:
+            await normalizer.mx_records(domain)
+        self.assertLess(len(cache), 100)
+        self.assertGreater(normalizer.stats()['evictions'], 0)
+        self.assertLess(cache.nbytes, 4096 + 1024)
+
+    def test_requires_size_estimate(self):
+        with self.assertRaises(ValueError):
+            email_normalize.Normalizer(
+                cache=email_normalize.LFRUCache(), cache_limit_bytes=4096)
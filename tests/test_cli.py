@@ -0,0 +1,160 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from email_normalize import cli, providers
+
+MX_RECORDS = {
+    'gmail.com': [(5, 'gmail-smtp-in.l.google.com')],
+    'yahoo.com': [(1, 'mta5.am0.yahoodns.net')]
+}
+
+
+async def mx_records(domain_part):
+    return MX_RECORDS.get(domain_part, [])
+
+
+class CLITestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'output')
+        patcher = mock.patch('email_normalize.Normalizer.mx_records')
+        self.mx_records = patcher.start()
+        self.mx_records.side_effect = mx_records
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def _run(self, content: str, *args: str) -> str:
+        path = os.path.join(self.directory.name, 'input')
+        with open(path, 'w') as handle:
+            handle.write(content)
+        self.assertEqual(cli.main([path, '-o', self.output] + list(args)), 0)
+        with open(self.output) as handle:
+            return handle.read()
+
+    def test_text(self):
+        output = self._run(
+            'f.o.o+bar@gmail.com\n\nfoo-bar@yahoo.com\nfoo\nbar@baz.com\n',
+            '--batch-size', '2')
+        self.assertEqual(
+            output, 'foo@gmail.com\nfoo@yahoo.com\n\nbar@baz.com\n')
+
+    def test_csv(self):
+        output = self._run(
+            'id,email\n1,f.o.o+bar@gmail.com\n2,foo-bar@yahoo.com\n3,foo\n',
+            '-f', 'csv')
+        self.assertListEqual(output.splitlines(), [
+            'id,email,normalized_address,mailbox_provider',
+            '1,f.o.o+bar@gmail.com,foo@gmail.com,Google',
+            '2,foo-bar@yahoo.com,foo@yahoo.com,Yahoo',
+            '3,foo,,'])
+
+    def test_csv_without_header(self):
+        output = self._run(
+            'f.o.o+bar@gmail.com,1\n', '-f', 'csv', '-c', '0', '--no-header')
+        self.assertListEqual(
+            output.splitlines(),
+            ['f.o.o+bar@gmail.com,1,foo@gmail.com,Google'])
+
+    def test_csv_missing_column(self):
+        path = os.path.join(self.directory.name, 'input')
+        with open(path, 'w') as handle:
+            handle.write('id,address\n1,foo@gmail.com\n')
+        with mock.patch('sys.stderr'):
+            self.assertEqual(cli.main([path, '-f', 'csv']), 1)
+
+    def test_jsonl(self):
+        output = self._run(
+            '{"id": 1, "address": "f.o.o+bar@gmail.com"}\n'
+            '{"id": 2, "address": "foo@bar.com"}\n',
+            '-f', 'jsonl', '-c', 'address')
+        self.assertListEqual(
+            [json.loads(line) for line in output.splitlines()], [
+                {'id': 1, 'address': 'f.o.o+bar@gmail.com',
+                 'normalized_address': 'foo@gmail.com',
+                 'mailbox_provider': 'Google'},
+                {'id': 2, 'address': 'foo@bar.com',
+                 'normalized_address': 'foo@bar.com',
+                 'mailbox_provider': None}])
+
+    def test_jsonl_row_not_an_object(self):
+        path = os.path.join(self.directory.name, 'input')
+        with open(path, 'w') as handle:
+            handle.write('{"email": "foo@gmail.com"}\n[1, 2]\n')
+        with mock.patch('sys.stderr') as stderr:
+            self.assertEqual(cli.main([path, '-f', 'jsonl']), 1)
+        stderr.write.assert_called_once_with(
+            'email-normalize: error: Line 2 is not a JSON object\n')
+
+    def test_no_header_requires_column_index(self):
+        with mock.patch('sys.stderr') as stderr:
+            with self.assertRaises(SystemExit) as context:
+                cli.main(['-f', 'csv', '--no-header'])
+        self.assertEqual(context.exception.code, 2)
+        self.assertIn('--column must be a zero based column index',
+                      ''.join(call.args[0]
+                              for call in stderr.write.call_args_list))
+
+    def test_domains_resolved_once_per_batch(self):
+        self._run('foo@gmail.com\nbar@gmail.com\nbaz@gmail.com\n')
+        self.mx_records.assert_called_once_with('gmail.com')
+
+    def test_offline(self):
+        output = self._run('f.o.o+bar@gmail.com\nfoo+bar@baz.com\n',
+                           '--offline')
+        self.assertEqual(output, 'foo@gmail.com\nfoo+bar@baz.com\n')
+        self.mx_records.assert_called_once_with('baz.com')
+
+    def test_providers(self):
+        registered = list(providers.Providers)
+
+        def restore() -> None:
+            providers.Providers[:] = registered
+            providers.register()
+
+        self.addCleanup(restore)
+        path = os.path.join(self.directory.name, 'providers.json')
+        with open(path, 'w') as handle:
+            json.dump([{'name': 'Baz', 'rules': ['PLUS_ADDRESSING'],
+                        'domains': ['baz.com']}], handle)
+        output = self._run('foo+bar@baz.com\n', '--offline',
+                           '--providers', path)
+        self.assertEqual(output, 'foo@baz.com\n')
+        self.mx_records.assert_not_called()
+
+    def test_invalid_providers(self):
+        path = os.path.join(self.directory.name, 'providers.json')
+        with open(path, 'w') as handle:
+            handle.write('{}')
+        with mock.patch('sys.stderr'):
+            self.assertEqual(cli.main(['--providers', path]), 1)
+
+    def test_invalid_concurrency(self):
+        path = os.path.join(self.directory.name, 'input')
+        with open(path, 'w') as handle:
+            handle.write('foo@gmail.com\n')
+        with mock.patch('sys.stderr') as stderr:
+            self.assertEqual(cli.main([path, '--concurrency', '0']), 1)
+        stderr.write.assert_called_once_with(
+            'email-normalize: error: concurrency must be at least 1\n')
+
+    def test_missing_input(self):
+        path = os.path.join(self.directory.name, 'missing')
+        with mock.patch('sys.stderr') as stderr:
+            self.assertEqual(cli.main([path, '-o', self.output]), 1)
+        message = stderr.write.call_args.args[0]
+        self.assertTrue(message.startswith('email-normalize: error: '))
+        self.assertIn(path, message)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_invalid_batch_size(self):
+        with mock.patch('sys.stderr') as stderr:
+            with self.assertRaises(SystemExit) as context:
+                cli.main(['--batch-size', '0'])
+        self.assertEqual(context.exception.code, 2)
+        self.assertIn('--batch-size must be at least 1',
+                      ''.join(call.args[0]
+                              for call in stderr.write.call_args_list))
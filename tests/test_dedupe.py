@@ -0,0 +1,141 @@
+import os
+import unittest
+
+import email_normalize
+from email_normalize import dedupe
+from tests import fakes
+
+MX_RECORDS = {
+    'example.com': [(1, 'aspmx.l.google.com')],
+    'yahoo.com': [(1, 'mta5.am0.yahoodns.net')]
+}
+
+ADDRESSES = [
+    'F.o.o+bar@gmail.com',
+    'foo@googlemail.com',
+    'foo-bar@yahoo.com',
+    'invalid',
+    'f.o.o@example.com',
+    'foo@yahoo.com',
+    'bar@gmail.com',
+    'foo+baz@example.com'
+]
+
+
+class DeduplicatorTestCase(unittest.TestCase):
+
+    def results(self, count: int) -> list:
+        return [email_normalize.Result(
+            'user{}+{}@example.com'.format(offset % 7, offset),
+            'user{}@example.com'.format(offset % 7), [], None)
+            for offset in range(0, count)]
+
+    def test_in_memory(self):
+        with dedupe.Deduplicator() as deduplicator:
+            for offset, result in enumerate(self.results(20)):
+                deduplicator.add(result, offset)
+            groups = list(deduplicator.groups())
+            self.assertEqual(len(deduplicator), 20)
+            self.assertEqual(deduplicator.spills, 0)
+        self.assertListEqual(
+            [group.normalized_address for group in groups],
+            ['user{}@example.com'.format(offset) for offset in range(0, 7)])
+        self.assertListEqual(
+            groups[0].members,
+            [(0, 'user0+0@example.com'), (7, 'user0+7@example.com'),
+             (14, 'user0+14@example.com')])
+
+    def test_spill_to_disk(self):
+        with dedupe.Deduplicator() as expected:
+            for offset, result in enumerate(self.results(100)):
+                expected.add(result, offset)
+            expectation = {group.normalized_address: group.members
+                           for group in expected.groups()}
+        deduplicator = dedupe.Deduplicator(max_entries=10, partitions=4)
+        for offset, result in enumerate(self.results(100)):
+            deduplicator.add(result, offset)
+        self.assertEqual(deduplicator.spills, 9)
+        directory = deduplicator._spill_directory.name
+        self.assertTrue(os.listdir(directory))
+        groups = {group.normalized_address: sorted(group.members)
+                  for group in deduplicator.groups()}
+        self.assertDictEqual(groups, expectation)
+        self.assertDictEqual(
+            {group.normalized_address: sorted(group.members)
+             for group in deduplicator.groups()}, expectation)
+        deduplicator.close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_min_size(self):
+        with dedupe.Deduplicator(max_entries=5) as deduplicator:
+            for result in self.results(10):
+                deduplicator.add(result)
+            self.assertSetEqual(
+                {group.normalized_address
+                 for group in deduplicator.groups(min_size=2)},
+                {'user0@example.com', 'user1@example.com',
+                 'user2@example.com'})
+
+    def test_invalid_arguments(self):
+        for kwargs in [{'max_entries': 0}, {'partitions': 0}]:
+            with self.subTest(**kwargs):
+                with self.assertRaises(ValueError):
+                    dedupe.Deduplicator(**kwargs)
+
+
+class DedupeTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.resolver = fakes.FakeResolver(MX_RECORDS)
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), offline=True,
+            resolver=self.resolver)
+
+    async def test_addresses(self):
+        deduplicator = dedupe.Deduplicator()
+        groups = [group async for group in dedupe.dedupe(
+            ADDRESSES, self.normalizer, min_size=2, batch_size=3,
+            deduplicator=deduplicator)]
+        self.assertListEqual(groups, [
+            dedupe.Group('foo@gmail.com', 'Google',
+                         [(0, 'F.o.o+bar@gmail.com'),
+                          (1, 'foo@googlemail.com')]),
+            dedupe.Group('foo@yahoo.com', 'Yahoo',
+                         [(2, 'foo-bar@yahoo.com'), (5, 'foo@yahoo.com')]),
+            dedupe.Group('foo@example.com', 'Google',
+                         [(4, 'f.o.o@example.com'),
+                          (7, 'foo+baz@example.com')])])
+        self.assertEqual(deduplicator.invalid, 1)
+        self.assertListEqual(self.resolver.queries, ['example.com'])
+        deduplicator.close()
+
+    async def test_pairs(self):
+        groups = [group async for group in dedupe.dedupe(
+            [('a', 'foo@gmail.com'), ('b', 'bar@gmail.com'),
+             ('c', 'f.oo@gmail.com')], self.normalizer)]
+        self.assertListEqual(
+            [[identifier for identifier, _address in group.members]
+             for group in groups], [['a', 'c'], ['b']])
+
+    async def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            [group async for group in dedupe.dedupe(
+                ADDRESSES, self.normalizer, batch_size=0)]
+
+
+class DedupeSyncTestCase(unittest.TestCase):
+
+    def test_dedupe_sync(self):
+        with email_normalize.SyncNormalizer(offline=True) as normalizer:
+            groups = list(dedupe.dedupe_sync(
+                ['foo+a@gmail.com', 'foo+b@gmail.com', 'bar@icloud.com'],
+                normalizer, min_size=2, batch_size=1))
+        self.assertListEqual(groups, [dedupe.Group(
+            'foo@gmail.com', 'Google',
+            [(0, 'foo+a@gmail.com'), (1, 'foo+b@gmail.com')])])
+
+    def test_invalid_batch_size(self):
+        with email_normalize.SyncNormalizer(offline=True) as normalizer:
+            with self.assertRaises(ValueError):
+                list(dedupe.dedupe_sync(
+                    ['foo@gmail.com'], normalizer, batch_size=0))
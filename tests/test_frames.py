@@ -0,0 +1,166 @@
+import unittest
+from unittest import mock
+
+import email_normalize
+from email_normalize import providers
+
+try:
+    import pandas
+    from email_normalize import frames
+except ImportError:  # pragma: nocover
+    frames = None
+
+try:
+    import pyarrow
+except ImportError:  # pragma: nocover
+    pyarrow = None
+
+MX_RECORDS = {
+    'example.com': [(1, 'aspmx.l.google.com')],
+    'fastmail.com': [(10, 'in1-smtp.messagingengine.com')],
+    'gmail.com': [(5, 'gmail-smtp-in.l.google.com')],
+    'yahoo.com': [(1, 'mta5.am0.yahoodns.net')]
+}
+
+ADDRESSES = [
+    'F.o.o+bar@Gmail.com',
+    'Foo Bar <foo-bar@yahoo.com>',
+    'invalid',
+    'foo@bar.fastmail.com',
+    'f.o.o+bar@example.com',
+    'foo+bar@unknown.org',
+    '@gmail.com'
+]
+
+
+async def mx_records(domain_part):
+    return email_normalize.FrozenMXRecords(MX_RECORDS.get(
+        '.'.join(domain_part.split('.')[-2:]), []))
+
+
+@unittest.skipIf(frames is None, 'pandas is not installed')
+class NormalizeColumnTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache())
+        patcher = mock.patch.object(self.normalizer, 'mx_records')
+        self.mx_records = patcher.start()
+        self.mx_records.side_effect = mx_records
+        self.addCleanup(patcher.stop)
+
+    async def expectations(self) -> list:
+        values = []
+        for address in ADDRESSES:
+            try:
+                result = await self.normalizer.normalize(address)
+            except ValueError:
+                values.append((None, None))
+            else:
+                values.append(
+                    (result.normalized_address, result.mailbox_provider))
+        return values
+
+    async def test_matches_normalize(self):
+        series = pandas.Series(ADDRESSES, index=range(10, 17))
+        frame = await frames.normalize_column(series, self.normalizer)
+        self.assertListEqual(list(frame.index), list(series.index))
+        self.assertListEqual(list(frame['address']), ADDRESSES)
+        self.assertListEqual(
+            [(None if pandas.isna(normalized) else normalized,
+              None if pandas.isna(provider) else provider)
+             for normalized, provider in zip(
+                frame['normalized_address'], frame['mailbox_provider'])],
+            await self.expectations())
+
+    async def test_categorical_columns(self):
+        frame = await frames.normalize_column(
+            ADDRESSES + ADDRESSES, self.normalizer)
+        self.assertIsInstance(
+            frame['normalized_address'].dtype, pandas.CategoricalDtype)
+        self.assertSetEqual(
+            set(frame['mailbox_provider'].cat.categories),
+            {'Fastmail', 'Google', 'Yahoo'})
+
+    async def test_domains_resolved_once(self):
+        await frames.normalize_column(
+            ADDRESSES * 10 + [None], self.normalizer)
+        self.assertListEqual(
+            sorted(call.args[0] for call in self.mx_records.call_args_list),
+            ['bar.fastmail.com', 'example.com', 'gmail.com', 'unknown.org',
+             'yahoo.com'])
+
+    async def test_offline(self):
+        self.normalizer.offline = True
+        frame = await frames.normalize_column(
+            ['f.o.o+bar@gmail.com', 'foo+bar@example.com'], self.normalizer)
+        self.assertListEqual(
+            list(frame['normalized_address']),
+            ['foo@gmail.com', 'foo@example.com'])
+        self.assertListEqual(
+            [call.args[0] for call in self.mx_records.call_args_list],
+            ['example.com'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    async def test_arrow(self):
+        table = await frames.normalize_column(
+            pyarrow.array(ADDRESSES), self.normalizer)
+        self.assertIsInstance(table, pyarrow.Table)
+        self.assertTrue(pyarrow.types.is_dictionary(
+            table.schema.field('normalized_address').type))
+        self.assertListEqual(
+            list(zip(table.column('normalized_address').to_pylist(),
+                     table.column('mailbox_provider').to_pylist())),
+            await self.expectations())
+
+    async def test_empty(self):
+        frame = await frames.normalize_column([], self.normalizer)
+        self.assertEqual(len(frame), 0)
+
+    async def test_provider_rules(self):
+        registered = list(providers.Providers)
+
+        def restore() -> None:
+            providers.Providers[:] = registered
+            providers.register()
+
+        self.addCleanup(restore)
+        providers.register(providers.from_definition({
+            'name': 'Example', 'rules': ['STRIP_PERIODS'],
+            'separators': '=_', 'preserve_case': True,
+            'domains': ['example.net'],
+            'aliases': {'example.org': 'example.net'}}))
+        self.normalizer.offline = True
+        addresses = ['F.o.o=bar@example.org', 'Foo <Foo_Bar@Example.net>',
+                     'foo@googlemail.com', 'f.o.o+bar@example.com']
+        frame = await frames.normalize_column(addresses, self.normalizer)
+        self.assertListEqual(
+            list(frame['normalized_address']),
+            ['Foo@example.net', 'Foo@example.net', 'foo@gmail.com',
+             'foo@example.com'])
+        self.assertListEqual(
+            list(frame['normalized_address']),
+            [(await self.normalizer.normalize(address)).normalized_address
+             for address in addresses])
+
+
+@unittest.skipIf(frames is None, 'pandas is not installed')
+class NormalizeColumnSyncTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        patcher = mock.patch('email_normalize.Normalizer.mx_records')
+        patcher.start().side_effect = mx_records
+        self.addCleanup(patcher.stop)
+        self.normalizer = email_normalize.SyncNormalizer(
+            cache=email_normalize.LFRUCache())
+        self.addCleanup(self.normalizer.close)
+
+    def test_normalize_column_sync(self):
+        frame = frames.normalize_column_sync(
+            pandas.Series(['f.o.o+bar@gmail.com', 'foo-bar@yahoo.com']),
+            self.normalizer)
+        self.assertListEqual(
+            list(frame['normalized_address']),
+            ['foo@gmail.com', 'foo@yahoo.com'])
+        self.assertListEqual(
+            list(frame['mailbox_provider']), ['Google', 'Yahoo'])
@@ -1,10 +1,14 @@
+import threading
+import time
 import typing
 import unittest
 import uuid
 import warnings
+from concurrent import futures
 from unittest import mock
 
 import email_normalize
+from tests import fakes
 
 
 class TestCase(unittest.TestCase):
@@ -78,6 +82,11 @@ class MailboxProviderTestCase(TestCase):
             address, '{}@{}'.format(local_part.replace('.', ''), domain_part),
             mx_records, 'Google')
 
+    def test_google_domain_alias(self):
+        self._perform_test(
+            'f.o.o+test@googlemail.com', 'foo@gmail.com',
+            [(5, 'gmail-smtp-in.l.google.com')], 'Google')
+
     def test_microsoft(self):
         local_part = str(uuid.uuid4())
         domain_part = str(uuid.uuid4())
@@ -131,3 +140,167 @@ class MailboxProviderTestCase(TestCase):
         self._perform_test(
             address, '{}@{}'.format(local_part, domain_part),
             mx_records, 'Zoho')
+
+
+class SyncNormalizerTestCase(TestCase):
+
+    def setUp(self) -> None:
+        patcher = mock.patch('email_normalize.Normalizer.mx_records')
+        self.mx_records = patcher.start()
+        self.mx_records.return_value = [(1, 'aspmx.l.google.com')]
+        self.addCleanup(patcher.stop)
+        self.normalizer = email_normalize.SyncNormalizer()
+        self.addCleanup(self.normalizer.close)
+
+    def test_normalize(self):
+        result = self.normalizer.normalize('f.o.o+bar@gmail.com')
+        self.assertEqual(result.normalized_address, 'foo@gmail.com')
+        self.assertEqual(result.mailbox_provider, 'Google')
+
+    def test_normalize_many(self):
+        results = self.normalizer.normalize_many(
+            ['f.o.o+bar@gmail.com', 'b.a.r@gmail.com'])
+        self.assertListEqual(
+            [r.normalized_address for r in results],
+            ['foo@gmail.com', 'bar@gmail.com'])
+
+    def test_mx_records(self):
+        self.assertListEqual(self.normalizer.mx_records('gmail.com'),
+                             [(1, 'aspmx.l.google.com')])
+
+    def test_normalize_from_many_threads(self):
+        addresses = ['{}+test@gmail.com'.format(offset)
+                     for offset in range(0, 100)]
+        with futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(self.normalizer.normalize, addresses))
+        self.assertListEqual(
+            [r.normalized_address for r in results],
+            ['{}@gmail.com'.format(offset) for offset in range(0, 100)])
+
+    def test_close(self):
+        self.assertFalse(self.normalizer.closed)
+        self.normalizer.close()
+        self.assertTrue(self.normalizer.closed)
+        self.normalizer.close()
+        with self.assertRaises(RuntimeError):
+            self.normalizer.normalize('foo@gmail.com')
+
+    def test_context_manager(self):
+        with email_normalize.SyncNormalizer() as normalizer:
+            result = normalizer.normalize('foo+bar@gmail.com')
+        self.assertEqual(result.normalized_address, 'foo@gmail.com')
+        self.assertTrue(normalizer.closed)
+
+    def test_prefetch(self):
+        self.assertEqual(
+            self.normalizer.prefetch(['gmail.com', 'yahoo.com', 'gmail.com']),
+            2)
+        self.assertEqual(self.mx_records.call_count, 2)
+
+    def test_export_and_import_cache(self):
+        with email_normalize.SyncNormalizer(
+                cache=email_normalize.LFRUCache()) as normalizer:
+            normalizer._normalizer.cache.set(
+                'gmail.com', email_normalize.CachedItem(
+                    [(1, 'aspmx.l.google.com')], 300))
+            snapshot = normalizer.export_cache()
+        with email_normalize.SyncNormalizer(
+                cache=email_normalize.LFRUCache()) as normalizer:
+            self.assertEqual(normalizer.import_cache(snapshot), 1)
+            self.assertIn('gmail.com', normalizer._normalizer.cache)
+
+    def test_offline(self):
+        self.assertFalse(self.normalizer.offline)
+        with email_normalize.SyncNormalizer(offline=True) as normalizer:
+            self.assertTrue(normalizer.offline)
+
+    def test_stats(self):
+        stats = self.normalizer.stats()
+        self.assertEqual(stats['queries'], 0)
+        self.assertIn('size', stats['cache'])
+
+
+class SyncNormalizerCloseTestCase(TestCase):
+
+    def test_close_while_threads_submit(self):
+        resolver = fakes.FakeResolver(delays={
+            'domain-{}.com'.format(offset): 0.001 * (offset % 5)
+            for offset in range(0, 1000)})
+        normalizer = email_normalize.SyncNormalizer(
+            cache=email_normalize.LFRUCache(), resolver=resolver)
+        outcomes: typing.List[str] = []
+        started = threading.Barrier(5)
+
+        def worker(offset: int) -> None:
+            started.wait()
+            for count in range(0, 30):
+                try:
+                    normalizer.normalize('foo@domain-{}.com'.format(
+                        offset * 100 + count))
+                except RuntimeError:
+                    outcomes.append('closed')
+                else:
+                    outcomes.append('normalized')
+
+        threads = [threading.Thread(target=worker, args=(offset,))
+                   for offset in range(0, 4)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        time.sleep(0.01)
+        normalizer.close()
+        for thread in threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(len(outcomes), 120)
+        self.assertIn('closed', outcomes)
+        self.assertTrue(normalizer.closed)
+
+
+class SplitAddressTestCase(TestCase):
+
+    def test_bare_address(self):
+        self.assertEqual(
+            email_normalize.split_address(' Foo.Bar+baz@Gmail.com '),
+            ('foo.bar+baz', 'gmail.com', None))
+
+    def test_display_name(self):
+        self.assertEqual(
+            email_normalize.split_address('Foo Bar <Foo@Gmail.com>'),
+            ('foo', 'gmail.com', None))
+
+    def test_quoted_local_part_matches_parseaddr(self):
+        result = email_normalize.split_address('"foo bar"@gmail.com')
+        self.assertIsNone(result.error)
+        self.assertEqual(result.domain_part, 'gmail.com')
+
+    def test_bare_address_keeps_case(self):
+        for value, expectation in [
+                (' Foo.Bar+baz@Gmail.com ', 'Foo.Bar+baz@Gmail.com'),
+                ('Foo Bar <Foo@Gmail.com>', 'Foo@Gmail.com'),
+                ('Foo <', '')]:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    email_normalize.bare_address(value), expectation)
+
+    def test_errors(self):
+        for value, expectation in [
+                ('', email_normalize.ParseError.EMPTY),
+                ('   ', email_normalize.ParseError.EMPTY),
+                ('foo', email_normalize.ParseError.MISSING_AT),
+                ('foo@bar@baz.com', email_normalize.ParseError.MULTIPLE_AT),
+                ('@gmail.com', email_normalize.ParseError.EMPTY_LOCAL_PART),
+                ('foo@', email_normalize.ParseError.EMPTY_DOMAIN_PART)]:
+            with self.subTest(value=value):
+                result = email_normalize.split_address(value)
+                self.assertEqual(result.error, expectation)
+                self.assertEqual(result.local_part, '')
+                self.assertEqual(result.domain_part, '')
+
+    def test_invalid_address_error(self):
+        with self.assertRaises(email_normalize.InvalidAddressError) as ctx:
+            email_normalize.Normalizer._split('foo')
+        self.assertIsInstance(ctx.exception, ValueError)
+        self.assertEqual(ctx.exception.email_address, 'foo')
+        self.assertEqual(ctx.exception.error,
+                         email_normalize.ParseError.MISSING_AT)
@@ -6,8 +6,10 @@ import uuid
 from unittest import mock
 
 import aiodns
+from aiodns import error
 
 import email_normalize
+from tests import fakes
 
 
 class NormalizerTestCase(unittest.IsolatedAsyncioTestCase):
@@ -94,3 +96,518 @@ class NormalizerTestCase(unittest.IsolatedAsyncioTestCase):
             result = await self.normalizer.normalize('f.o.o+bar@gmail.com')
             self.assertEqual(result.normalized_address, 'foo@gmail.com')
             self.assertEqual(result.mailbox_provider, 'Google')
+
+
+class InFlightTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.resolver = fakes.FakeResolver(delays={'example.com': 0.05})
+        self.normalizer = email_normalize.Normalizer(resolver=self.resolver)
+        email_normalize.cache.clear()
+
+    def tearDown(self):
+        email_normalize.cache.clear()
+
+    async def test_concurrent_lookups_share_query(self):
+        results = await asyncio.gather(*[
+            self.normalizer.mx_records('example.com')
+            for _offset in range(0, 100)])
+        self.assertListEqual(self.resolver.queries, ['example.com'])
+        for result in results:
+            self.assertListEqual(result, [(10, 'mx.zoho.com')])
+        self.assertEqual(email_normalize.cache['example.com'].hits, 100)
+        self.assertDictEqual(self.normalizer._inflight, {})
+
+    async def test_concurrent_failure_is_shared(self):
+        self.resolver.fail('example.com', RuntimeError('boom'))
+        results = await asyncio.gather(*[
+            self.normalizer.mx_records('example.com')
+            for _offset in range(0, 10)], return_exceptions=True)
+        self.assertListEqual(self.resolver.queries, ['example.com'])
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        self.assertNotIn('example.com', email_normalize.cache)
+        self.assertDictEqual(self.normalizer._inflight, {})
+
+    async def test_cancelled_caller_does_not_cancel_query(self):
+        first = asyncio.ensure_future(
+            self.normalizer.mx_records('example.com'))
+        second = asyncio.ensure_future(
+            self.normalizer.mx_records('example.com'))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertListEqual(await second, [(10, 'mx.zoho.com')])
+        self.assertTrue(first.cancelled())
+        self.assertListEqual(self.resolver.queries, ['example.com'])
+
+
+class NormalizeManyTestCase(unittest.IsolatedAsyncioTestCase):
+
+    MX_RECORDS = {
+        'gmail.com': [(5, 'gmail-smtp-in.l.google.com')],
+        'yahoo.com': [(1, 'mta5.am0.yahoodns.net')],
+        'example.com': []
+    }
+
+    def setUp(self) -> None:
+        self.normalizer = email_normalize.Normalizer()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delays = {'gmail.com': 0.03, 'yahoo.com': 0.01}
+
+    async def _mx_records(self, domain_part):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delays.get(domain_part, 0))
+        self.in_flight -= 1
+        return self.MX_RECORDS[domain_part]
+
+    async def test_normalize_many(self):
+        addresses = ['f.o.o+bar@gmail.com', 'foo-bar@yahoo.com',
+                     'foo+bar@example.com', 'b.a.r@gmail.com']
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.side_effect = self._mx_records
+            results = await self.normalizer.normalize_many(addresses)
+        self.assertEqual(mx_records.call_count, 3)
+        self.assertListEqual([r.address for r in results], addresses)
+        self.assertListEqual(
+            [r.normalized_address for r in results],
+            ['foo@gmail.com', 'foo@yahoo.com',
+             'foo+bar@example.com', 'bar@gmail.com'])
+        self.assertListEqual(
+            [r.mailbox_provider for r in results],
+            ['Google', 'Yahoo', None, 'Google'])
+
+    async def test_concurrency_is_bounded(self):
+        self.MX_RECORDS = {'{}.com'.format(offset): []
+                           for offset in range(0, 20)}
+        addresses = ['foo@{}'.format(domain) for domain in self.MX_RECORDS]
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.side_effect = self._mx_records
+            results = await self.normalizer.normalize_many(addresses, 3)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(self.max_in_flight, 3)
+
+    async def test_iter_normalize_unordered(self):
+        addresses = ['foo@gmail.com', 'foo@yahoo.com', 'foo@example.com']
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.side_effect = self._mx_records
+            results = [result async for result in
+                       self.normalizer.iter_normalize(
+                           addresses, ordered=False)]
+        self.assertListEqual(
+            [r.address for r in results],
+            ['foo@example.com', 'foo@yahoo.com', 'foo@gmail.com'])
+
+    async def test_invalid_address_raises_before_resolving(self):
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            with self.assertRaises(ValueError):
+                await self.normalizer.normalize_many(
+                    ['foo@gmail.com', 'foo', 'bar'])
+        mx_records.assert_not_called()
+
+    async def test_invalid_concurrency_raises(self):
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            for concurrency in [0, -1]:
+                with self.assertRaisesRegex(ValueError, 'concurrency'):
+                    await self.normalizer.normalize_many(
+                        ['foo@gmail.com'], concurrency)
+                with self.assertRaisesRegex(ValueError, 'concurrency'):
+                    await self.normalizer.normalize_many([], concurrency)
+                with self.assertRaisesRegex(ValueError, 'concurrency'):
+                    await self.normalizer.mx_records_many(
+                        ['gmail.com'], concurrency)
+                with self.assertRaisesRegex(ValueError, 'concurrency'):
+                    await self.normalizer.prefetch(['gmail.com'], concurrency)
+        mx_records.assert_not_called()
+
+    async def test_resolution_error_raises(self):
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.side_effect = RuntimeError('boom')
+            with self.assertRaises(RuntimeError):
+                await self.normalizer.normalize_many(['foo@gmail.com'])
+
+
+class OfflineTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.normalizer = email_normalize.Normalizer(offline=True)
+
+    def test_normalize_local(self):
+        result = self.normalizer.normalize_local('F.o.o+bar@Gmail.com')
+        self.assertEqual(result.normalized_address, 'foo@gmail.com')
+        self.assertEqual(result.mailbox_provider, 'Google')
+        self.assertListEqual(result.mx_records, [])
+
+    def test_normalize_local_unknown_domain(self):
+        self.assertIsNone(self.normalizer.normalize_local('foo@example.com'))
+
+    async def test_normalize_skips_dns(self):
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            result = await self.normalizer.normalize('foo-bar@yahoo.com')
+        mx_records.assert_not_called()
+        self.assertEqual(result.normalized_address, 'foo@yahoo.com')
+        self.assertEqual(result.mailbox_provider, 'Yahoo')
+
+    async def test_normalize_falls_back_to_dns(self):
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.return_value = [(10, 'mx.zoho.com')]
+            result = await self.normalizer.normalize('foo+bar@example.com')
+        mx_records.assert_called_once_with('example.com')
+        self.assertEqual(result.normalized_address, 'foo@example.com')
+        self.assertEqual(result.mailbox_provider, 'Zoho')
+
+    async def test_normalize_many(self):
+        addresses = ['foo+bar@example.com', 'f.o.o@gmail.com',
+                     'foo+bar@icloud.com']
+        with mock.patch.object(self.normalizer, 'mx_records') as mx_records:
+            mx_records.return_value = []
+            results = await self.normalizer.normalize_many(addresses)
+            unordered = [result async for result in
+                         self.normalizer.iter_normalize(
+                             addresses, ordered=False)]
+        self.assertEqual(mx_records.call_count, 2)
+        self.assertListEqual(
+            [r.normalized_address for r in results],
+            ['foo+bar@example.com', 'foo@gmail.com', 'foo@icloud.com'])
+        self.assertListEqual(
+            [r.address for r in unordered],
+            ['f.o.o@gmail.com', 'foo+bar@icloud.com', 'foo+bar@example.com'])
+
+    async def test_disabled_by_default(self):
+        normalizer = email_normalize.Normalizer()
+        with mock.patch.object(normalizer, 'mx_records') as mx_records:
+            mx_records.return_value = []
+            result = await normalizer.normalize('f.o.o@gmail.com')
+        mx_records.assert_called_once_with('gmail.com')
+        self.assertEqual(result.normalized_address, 'f.o.o@gmail.com')
+
+
+class FrozenMXRecordsNormalizerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache())
+        self.normalizer.cache.set('example.com', email_normalize.CachedItem(
+            [(10, 'mx.zoho.com')], 60))
+
+    async def test_cached_records_are_not_copied(self):
+        records = await self.normalizer.mx_records('example.com')
+        self.assertIs(records, self.normalizer.cache['example.com'].mx_records)
+        result = await self.normalizer.normalize('foo+bar@example.com')
+        self.assertIs(result.mx_records, records)
+
+    async def test_provider_is_memoized(self):
+        with mock.patch('email_normalize.providers.lookup_hosts') as lookup:
+            lookup.return_value = email_normalize.providers.Zoho
+            for _offset in range(0, 3):
+                result = await self.normalizer.normalize('foo+b@example.com')
+                self.assertEqual(result.mailbox_provider, 'Zoho')
+        lookup.assert_called_once_with(('mx.zoho.com', ))
+
+
+class FailureHandlingTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.resolver = fakes.FakeResolver()
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), failure_ttls={'nodata': 60},
+            resolver=self.resolver)
+
+    async def test_failure_ttls_by_class(self):
+        expectations = [
+            (error.ARES_ENOTFOUND, 'nxdomain', 300),
+            (error.ARES_ENODATA, 'nodata', 60),
+            (error.ARES_ESERVFAIL, 'servfail', 30),
+            (error.ARES_ETIMEOUT, 'timeout', 30),
+            (error.ARES_ECONNREFUSED, 'error', 300)]
+        for code, failure, ttl in expectations:
+            domain = '{}.com'.format(failure)
+            self.resolver.fail(domain, error.DNSError(code, failure))
+            self.assertListEqual(await self.normalizer.mx_records(domain), [])
+            self.assertEqual(self.normalizer.cache[domain].error, failure)
+            self.assertEqual(self.normalizer.cache[domain].ttl, ttl)
+
+    async def test_refresh_ahead(self):
+        self.normalizer.refresh_ahead = 0.5
+        self.normalizer.refresh_hits = 2
+        await self.normalizer.mx_records('example.com')
+        item = self.normalizer.cache['example.com']
+        item.cached_at -= 45
+        await self.normalizer.mx_records('example.com')
+        self.assertEqual(len(self.resolver.queries), 1)
+        await self.normalizer.mx_records('example.com')
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.resolver.queries), 2)
+        refreshed = self.normalizer.cache['example.com']
+        self.assertIsNot(refreshed, item)
+        self.assertGreater(refreshed.remaining, 55)
+        self.assertEqual(refreshed.hits, 3)
+
+    async def test_serve_stale(self):
+        self.normalizer.serve_stale = 30
+        await self.normalizer.mx_records('example.com')
+        item = self.normalizer.cache['example.com']
+        item.cached_at -= 70
+        records = await self.normalizer.mx_records('example.com')
+        self.assertIs(records, item.mx_records)
+        self.assertEqual(len(self.resolver.queries), 1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(self.resolver.queries), 2)
+        self.assertFalse(self.normalizer.cache['example.com'].expired)
+
+    async def test_stale_kept_on_transient_failure(self):
+        self.normalizer.serve_stale = 30
+        await self.normalizer.mx_records('example.com')
+        item = self.normalizer.cache['example.com']
+        item.cached_at -= 70
+        self.resolver.fail(
+            'example.com', error.DNSError(error.ARES_ETIMEOUT, 'timeout'))
+        await self.normalizer.mx_records('example.com')
+        await asyncio.sleep(0.01)
+        self.assertIs(self.normalizer.cache['example.com'], item)
+
+    async def test_stale_replaced_on_nxdomain(self):
+        self.normalizer.serve_stale = 30
+        await self.normalizer.mx_records('example.com')
+        self.normalizer.cache['example.com'].cached_at -= 70
+        self.resolver.fail(
+            'example.com', error.DNSError(error.ARES_ENOTFOUND, 'nxdomain'))
+        await self.normalizer.mx_records('example.com')
+        await asyncio.sleep(0.01)
+        self.assertEqual(
+            self.normalizer.cache['example.com'].error, 'nxdomain')
+
+
+class StatsTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.events = []
+        self.resolver = fakes.FakeResolver()
+        self.resolver.fail(
+            'bad.com', error.DNSError(error.ARES_ENOTFOUND, ''))
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), cache_limit=2,
+            resolver=self.resolver,
+            on_hit=lambda domain: self.events.append(('hit', domain)),
+            on_miss=lambda domain: self.events.append(('miss', domain)),
+            on_evict=lambda domain: self.events.append(('evict', domain)),
+            on_resolve=lambda domain, duration, failure: self.events.append(
+                ('resolve', domain, failure)))
+
+    async def test_stats_and_callbacks(self):
+        await self.normalizer.mx_records('example.com')
+        await self.normalizer.mx_records('example.com')
+        await self.normalizer.mx_records('bad.com')
+        await self.normalizer.mx_records('other.com')
+        self.assertListEqual(self.events, [
+            ('miss', 'example.com'),
+            ('resolve', 'example.com', None),
+            ('hit', 'example.com'),
+            ('miss', 'bad.com'),
+            ('resolve', 'bad.com', 'nxdomain'),
+            ('miss', 'other.com'),
+            ('resolve', 'other.com', None),
+            ('evict', 'bad.com')])
+        stats = self.normalizer.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['hit_ratio'], 0.25)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['inflight'], 0)
+        self.assertEqual(stats['queries'], 3)
+        self.assertDictEqual(stats['failures'], {'nxdomain': 1})
+        self.assertEqual(stats['query_latency']['count'], 3)
+        self.assertEqual(
+            sum(stats['query_latency']['buckets'].values()), 3)
+        self.assertEqual(stats['cache']['size'], 2)
+
+    async def test_stale_and_refreshes(self):
+        self.normalizer.serve_stale = 60
+        await self.normalizer.mx_records('example.com')
+        self.normalizer.cache['example.com'].cached_at -= 90
+        await self.normalizer.mx_records('example.com')
+        await asyncio.sleep(0.01)
+        stats = self.normalizer.stats()
+        self.assertEqual(stats['stale'], 1)
+        self.assertEqual(stats['refreshes'], 1)
+        self.assertEqual(stats['queries'], 2)
+
+    def test_stats_without_lookups(self):
+        stats = self.normalizer.stats()
+        self.assertEqual(stats['hit_ratio'], 0.0)
+        self.assertEqual(stats['query_latency']['sum'], 0.0)
+
+
+class ResultCacheTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.resolver = fakes.FakeResolver()
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), cache_limit=2,
+            result_cache_size=2, resolver=self.resolver)
+
+    async def test_repeat_call_returns_result(self):
+        result = await self.normalizer.normalize('foo+bar@example.com')
+        self.assertIs(
+            await self.normalizer.normalize('foo+bar@example.com'), result)
+        self.assertEqual(result.normalized_address, 'foo@example.com')
+        self.assertListEqual(self.resolver.queries, ['example.com'])
+        stats = self.normalizer.stats()
+        self.assertEqual(stats['results'], 1)
+        self.assertEqual(stats['result_hits'], 1)
+        self.assertEqual(
+            self.normalizer.cache.get('example.com').hits, 2)
+
+    async def test_invalidated_on_expiry(self):
+        result = await self.normalizer.normalize('foo@example.com')
+        self.normalizer.cache.get('example.com').cached_at -= 120
+        self.assertIsNot(
+            await self.normalizer.normalize('foo@example.com'), result)
+        self.assertListEqual(
+            self.resolver.queries, ['example.com', 'example.com'])
+
+    async def test_invalidated_on_eviction(self):
+        result = await self.normalizer.normalize('foo@example.com')
+        await self.normalizer.normalize('foo@example.org')
+        await self.normalizer.normalize('foo@example.net')
+        self.assertNotIn('example.com', self.normalizer.cache)
+        self.assertIsNot(
+            await self.normalizer.normalize('foo@example.com'), result)
+        self.assertEqual(self.resolver.queries.count('example.com'), 2)
+
+    async def test_invalidated_on_refresh(self):
+        first = await self.normalizer.normalize('foo@example.com')
+        second = await self.normalizer.normalize('bar@example.com')
+        await self.normalizer._query(
+            'example.com', self.normalizer.cache.get('example.com'))
+        self.assertIsNot(
+            await self.normalizer.normalize('foo@example.com'), first)
+        self.assertIsNot(
+            await self.normalizer.normalize('bar@example.com'), second)
+
+    async def test_invalidated_by_normalizer_sharing_cache(self):
+        for cache in [email_normalize.LFRUCache(),
+                      email_normalize.CompactCache()]:
+            with self.subTest(cache=type(cache).__name__):
+                normalizer = email_normalize.Normalizer(
+                    cache=cache, result_cache_size=10,
+                    resolver=self.resolver)
+                other = email_normalize.Normalizer(
+                    cache=cache, resolver=fakes.FakeResolver(
+                        default=[(1, 'aspmx.l.google.com')]))
+                result = await normalizer.normalize('f.o.o@example.com')
+                self.assertIs(
+                    await normalizer.normalize('f.o.o@example.com'), result)
+                await other._query('example.com', cache.get('example.com'))
+                result = await normalizer.normalize('f.o.o@example.com')
+                self.assertEqual(result.mailbox_provider, 'Google')
+                self.assertEqual(result.normalized_address, 'foo@example.com')
+
+    async def test_least_recently_used_is_discarded(self):
+        for address in ['a@example.com', 'b@example.com', 'a@example.com',
+                        'c@example.com']:
+            await self.normalizer.normalize(address)
+        self.assertListEqual(list(self.normalizer._results),
+                             ['a@example.com', 'c@example.com'])
+
+    async def test_offline_result(self):
+        normalizer = email_normalize.Normalizer(
+            offline=True, result_cache_size=10)
+        result = await normalizer.normalize('f.o.o@gmail.com')
+        self.assertIs(await normalizer.normalize('f.o.o@gmail.com'), result)
+        self.assertEqual(normalizer.stats()['result_hits'], 1)
+
+    async def test_disabled_by_default(self):
+        normalizer = email_normalize.Normalizer()
+        self.assertIsNone(normalizer._results)
+        self.assertEqual(normalizer.stats()['results'], 0)
+
+
+class StreamTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.resolver = fakes.FakeResolver(delays={'slow.com': 0.05})
+        self.normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), resolver=self.resolver)
+        self.read = 0
+
+    async def _addresses(self, addresses):
+        for address in addresses:
+            self.read += 1
+            await asyncio.sleep(0)
+            yield address
+
+    async def _stream(self, addresses, **kwargs):
+        return [result.address async for result in self.normalizer.stream(
+            self._addresses(addresses), **kwargs)]
+
+    async def test_cached_addresses_skip_ahead(self):
+        self.normalizer.cache.set('fast.com', email_normalize.CachedItem(
+            [(10, 'mx.zoho.com')], 60))
+        addresses = ['a@slow.com', 'b@fast.com', 'c@slow.com', 'd@fast.com']
+        self.assertListEqual(
+            await self._stream(addresses),
+            ['b@fast.com', 'd@fast.com', 'a@slow.com', 'c@slow.com'])
+        self.assertListEqual(self.resolver.queries, ['slow.com'])
+
+    async def test_ordered(self):
+        addresses = ['a+x@slow.com', 'b@other.com', 'c@slow.com',
+                     'd@gmail.com']
+        results = [result async for result in self.normalizer.stream(
+            self._addresses(addresses), ordered=True)]
+        self.assertListEqual([r.address for r in results], addresses)
+        self.assertEqual(results[0].normalized_address, 'a@slow.com')
+        self.assertEqual(results[0].mailbox_provider, 'Zoho')
+        self.assertListEqual(
+            sorted(self.resolver.queries),
+            ['gmail.com', 'other.com', 'slow.com'])
+
+    async def test_backpressure(self):
+        addresses = ['user{}@slow.com'.format(offset)
+                     for offset in range(0, 100)]
+        stream = self.normalizer.stream(
+            self._addresses(addresses), window=10)
+        await stream.__anext__()
+        await asyncio.sleep(0.01)
+        self.assertLessEqual(self.read, 11)
+        remaining = [result async for result in stream]
+        self.assertEqual(len(remaining), 99)
+        self.assertListEqual(self.resolver.queries, ['slow.com'])
+
+    async def test_source_slower_than_resolver(self):
+        async def addresses():
+            for address in ['a@one.com', 'b@two.com', 'c@three.com']:
+                await asyncio.sleep(0.02)
+                yield address
+
+        results = [result.address async for result in
+                   self.normalizer.stream(addresses(), ordered=True)]
+        self.assertListEqual(
+            results, ['a@one.com', 'b@two.com', 'c@three.com'])
+        self.assertListEqual(
+            self.resolver.queries, ['one.com', 'two.com', 'three.com'])
+
+    async def test_offline_and_remembered_results(self):
+        normalizer = email_normalize.Normalizer(
+            cache=email_normalize.LFRUCache(), offline=True,
+            result_cache_size=10, resolver=self.resolver)
+        results = [result async for result in normalizer.stream(
+            self._addresses(['f.o.o@gmail.com', 'foo+a@fast.com',
+                             'f.o.o@gmail.com']), ordered=True)]
+        self.assertListEqual(
+            [r.normalized_address for r in results],
+            ['foo@gmail.com', 'foo@fast.com', 'foo@gmail.com'])
+        self.assertListEqual(self.resolver.queries, ['fast.com'])
+        self.assertEqual(normalizer.stats()['result_hits'], 1)
+
+    async def test_invalid_address_raises(self):
+        with self.assertRaises(email_normalize.InvalidAddressError):
+            await self._stream(['a@slow.com', 'invalid'])
+
+    async def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            await self._stream([], window=0)
+
+    async def test_empty(self):
+        self.assertListEqual(await self._stream([]), [])
@@ -0,0 +1,152 @@
+import typing
+import unittest
+from concurrent import futures
+from unittest import mock
+
+import email_normalize
+from email_normalize import parallel, providers
+
+MX_RECORDS = {
+    'gmail.com': [(5, 'gmail-smtp-in.l.google.com')],
+    'yahoo.com': [(1, 'mta5.am0.yahoodns.net')]
+}
+
+
+async def mx_records(domain_part):
+    return email_normalize.FrozenMXRecords(MX_RECORDS.get(domain_part, []))
+
+
+class ParallelNormalizerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        patcher = mock.patch('email_normalize.Normalizer.mx_records')
+        self.mx_records = patcher.start()
+        self.mx_records.side_effect = mx_records
+        self.addCleanup(patcher.stop)
+        self.normalizer = parallel.ParallelNormalizer(
+            processes=2, chunk_size=3, max_pending=2)
+        self.addCleanup(self.normalizer.close)
+
+    def test_normalize_many(self):
+        addresses = []
+        for offset in range(0, 20):
+            addresses += ['f.o.o+{}@gmail.com'.format(offset),
+                          'foo-{}@yahoo.com'.format(offset),
+                          'foo+{}@example.com'.format(offset)]
+        addresses.append('Foo Bar <f.o.o+bar@gmail.com>')
+        results = self.normalizer.normalize_many(addresses)
+        self.assertListEqual([r.address for r in results], addresses)
+        self.assertListEqual(
+            [r.normalized_address for r in results[:3]],
+            ['foo@gmail.com', 'foo@yahoo.com', 'foo+0@example.com'])
+        self.assertListEqual(
+            [r.mailbox_provider for r in results[:3]],
+            ['Google', 'Yahoo', None])
+        self.assertEqual(results[-1].normalized_address, 'foo@gmail.com')
+        self.assertListEqual(results[0].mx_records, MX_RECORDS['gmail.com'])
+        self.assertEqual(self.mx_records.call_count, 3)
+
+    def test_iter_normalize_unordered(self):
+        addresses = ['foo{}@gmail.com'.format(offset)
+                     for offset in range(0, 10)]
+        results = list(self.normalizer.iter_normalize(addresses, False))
+        self.assertListEqual(
+            sorted(r.address for r in results), sorted(addresses))
+
+    def test_input_read_in_windows(self):
+        read = []
+
+        def addresses():
+            for offset in range(0, 20):
+                read.append(offset)
+                yield 'foo+{}@gmail.com'.format(offset)
+
+        results = self.normalizer.iter_normalize(addresses(), window=5)
+        self.assertEqual(next(results).address, 'foo+0@gmail.com')
+        self.assertEqual(len(read), 5)
+        self.assertEqual(len(list(results)), 19)
+        with self.assertRaises(ValueError):
+            next(self.normalizer.iter_normalize(addresses(), window=0))
+
+    def test_pending_chunks_per_worker(self):
+        submitted: typing.List[futures.Future] = []
+        outstanding = []
+
+        def submit(executor):
+            def wrapper(*args):
+                outstanding.append(
+                    len([future for future in submitted
+                         if future.executor is executor
+                         and not future.done()]))
+                future = executor.original_submit(*args)
+                future.executor = executor
+                submitted.append(future)
+                return future
+            return wrapper
+
+        for executor in self.normalizer._executors:
+            executor.original_submit = executor.submit
+            executor.submit = submit(executor)
+        results = self.normalizer.normalize_many(
+            ['foo+{}@gmail.com'.format(offset) for offset in range(0, 30)])
+        self.assertEqual(len(results), 30)
+        self.assertEqual(len(submitted), 10)
+        self.assertLess(max(outstanding), self.normalizer.max_pending)
+        with self.assertRaises(ValueError):
+            parallel.ParallelNormalizer(max_pending=0)
+
+    def test_invalid_address(self):
+        with self.assertRaises(email_normalize.InvalidAddressError):
+            self.normalizer.normalize_many(['foo@gmail.com', 'foo'])
+        self.mx_records.assert_not_called()
+
+    def test_domain_part(self):
+        self.assertEqual(
+            parallel.ParallelNormalizer._domain_part('foo@Gmail.com'),
+            'gmail.com')
+        self.assertEqual(
+            parallel.ParallelNormalizer._domain_part('Foo <foo@Gmail.com>'),
+            'gmail.com')
+        with self.assertRaises(email_normalize.InvalidAddressError):
+            parallel.ParallelNormalizer._domain_part('Foo <foo>')
+
+
+class OfflineParallelNormalizerTestCase(unittest.TestCase):
+
+    def test_offline(self):
+        with mock.patch('email_normalize.Normalizer.mx_records') as mxr:
+            mxr.side_effect = mx_records
+            with parallel.ParallelNormalizer(
+                    processes=2, offline=True) as normalizer:
+                results = normalizer.normalize_many(
+                    ['f.o.o+bar@gmail.com', 'foo+bar@example.com'])
+        mxr.assert_called_once_with('example.com')
+        self.assertEqual(results[0].normalized_address, 'foo@gmail.com')
+        self.assertListEqual(results[0].mx_records, [])
+        self.assertEqual(results[1].normalized_address, 'foo+bar@example.com')
+
+
+class ParallelProvidersTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        registered = list(providers.Providers)
+
+        def restore() -> None:
+            providers.Providers[:] = registered
+            providers.register()
+
+        self.addCleanup(restore)
+        providers.register(providers.from_definition({
+            'name': 'Example', 'rules': ['PLUS_ADDRESSING'],
+            'domains': ['example.net'],
+            'aliases': {'example.org': 'example.net'}}))
+
+    def test_registered_providers_used_by_workers(self):
+        with parallel.ParallelNormalizer(
+                processes=1, offline=True) as normalizer:
+            result = normalizer.normalize_many(['foo+bar@example.org'])[0]
+            self.assertListEqual(
+                [value['name'] for value in
+                 normalizer._executors[0]._initargs[0]], ['Example'])
+        self.assertEqual(result.normalized_address, 'foo@example.net')
+        self.assertEqual(result.mailbox_provider, 'Example')
@@ -0,0 +1,156 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import email_normalize
+from email_normalize import providers
+
+
+class LookupHostTestCase(unittest.TestCase):
+
+    def test_subdomain_matches(self):
+        self.assertIs(
+            providers.lookup_host('alt1.gmail-smtp-in.l.google.com'),
+            providers.Google)
+
+    def test_exact_match(self):
+        self.assertIs(providers.lookup_host('mx.yandex.net'),
+                      providers.Yandex)
+
+    def test_case_and_trailing_dot(self):
+        self.assertIs(providers.lookup_host('ASPMX.L.Google.COM.'),
+                      providers.Google)
+
+    def test_partial_label_does_not_match(self):
+        self.assertIsNone(providers.lookup_host('mx.notgoogle.com'))
+        self.assertIsNone(providers.lookup_host('notgoogle.com'))
+        self.assertIsNone(providers.lookup_host('yandex.net'))
+
+    def test_no_match(self):
+        self.assertIsNone(providers.lookup_host('mx.example.com'))
+        self.assertIsNone(providers.lookup_host(''))
+
+    def test_lookup_provider_memoized_on_records(self):
+        mx_records = email_normalize.FrozenMXRecords(
+            [(1, 'mx.example.com'), (5, 'aspmx.l.google.com')])
+        self.assertIs(email_normalize.lookup_provider(mx_records),
+                      providers.Google)
+        self.assertIs(mx_records.provider, providers.Google)
+        self.assertIsNone(email_normalize.lookup_provider([]))
+
+    def test_lookup_hosts_uses_first_match(self):
+        self.assertIs(
+            providers.lookup_hosts(
+                ('mx.example.com', 'mx.zoho.com', 'aspmx.l.google.com')),
+            providers.Zoho)
+        self.assertIsNone(providers.lookup_hosts(()))
+
+
+class RulesTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        registered = list(providers.Providers)
+
+        def restore() -> None:
+            providers.Providers[:] = registered
+            providers.register()
+
+        self.addCleanup(restore)
+
+    def test_compiled_transforms(self):
+        for provider, local_part, domain_part, expectation in [
+                (providers.Google, 'f.o.o+bar', 'gmail.com',
+                 ('foo', 'gmail.com')),
+                (providers.Google, 'foo', 'googlemail.com',
+                 ('foo', 'gmail.com')),
+                (providers.Fastmail, 'foo+bar', 'bar.fastmail.com',
+                 ('bar', 'fastmail.com')),
+                (providers.Yahoo, 'foo-bar+baz', 'yahoo.com',
+                 ('foo', 'yahoo.com')),
+                (providers.Zoho, 'f.o.o+bar', 'zoho.com',
+                 ('f.o.o', 'zoho.com'))]:
+            with self.subTest(provider=provider.__name__):
+                self.assertEqual(
+                    provider.transform('', local_part, domain_part),
+                    expectation)
+
+    def test_custom_provider(self):
+
+        class Example(providers.MailboxProvider):
+            Flags = providers.Rules.PLUS_ADDRESSING
+            Separators = '=_'
+            Aliases = {'example.org': 'example.net'}
+            PreserveCase = True
+
+        self.assertEqual(providers.tag_separators(Example), '+=_')
+        self.assertEqual(
+            Example.transform('Foo <Foo_Bar@Example.org>', 'foo_bar',
+                              'example.org'),
+            ('Foo', 'example.net'))
+        self.assertEqual(
+            Example.transform('F=o+o@example.net', 'f=o+o', 'example.net'),
+            ('F', 'example.net'))
+
+    def test_preserve_case_only_parses_when_needed(self):
+
+        class Example(providers.MailboxProvider):
+            PreserveCase = True
+
+        with mock.patch('email.utils.parseaddr') as parseaddr:
+            self.assertEqual(
+                Example.transform(' Foo.Bar@example.net ', 'foo.bar',
+                                  'example.net'),
+                ('Foo.Bar', 'example.net'))
+        parseaddr.assert_not_called()
+
+    def test_load_and_register(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as handle:
+            json.dump([{'name': 'Example',
+                        'rules': ['plus_addressing', 'STRIP_PERIODS'],
+                        'mx_domains': ['MX.Example.net'],
+                        'domains': ['example.net'],
+                        'aliases': {'example.org': 'example.net'}}], handle)
+            handle.flush()
+            loaded = providers.load(handle.name)
+        providers.register(*loaded)
+        example = loaded[0]
+        self.assertIs(providers.lookup_host('a.mx.example.net'), example)
+        self.assertIs(providers.ProviderDomains['example.org'], example)
+        self.assertEqual(example.transform('', 'f.o.o+bar', 'example.org'),
+                         ('foo', 'example.net'))
+        self.assertDictEqual(providers.definition(example), {
+            'name': 'Example',
+            'rules': ['PLUS_ADDRESSING', 'STRIP_PERIODS'],
+            'mx_domains': ['mx.example.net'],
+            'domains': ['example.net'],
+            'aliases': {'example.org': 'example.net'},
+            'separators': '',
+            'preserve_case': False})
+
+        replacement = providers.from_definition(
+            dict(providers.definition(example), rules=[]))
+        providers.register(replacement)
+        self.assertEqual(
+            [provider.__name__ for provider in providers.Providers].count(
+                'Example'), 1)
+        self.assertIs(providers.lookup_host('mx.example.net'), replacement)
+
+    def test_invalid_definitions(self):
+        for value in [{}, {'name': 1}, {'name': 'Example', 'unknown': True},
+                      {'name': 'Example', 'rules': ['UNKNOWN']},
+                      {'name': 'Example', 'rules': 'STRIP_PERIODS'},
+                      {'name': 'Example', 'rules': [1]},
+                      {'name': 'Example', 'mx_domains': 'mx.example.net'},
+                      {'name': 'Example', 'domains': [None]},
+                      {'name': 'Example', 'aliases': ['example.org']},
+                      {'name': 'Example', 'aliases': {'example.org': 1}},
+                      {'name': 'Example', 'separators': ['=']}]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    providers.from_definition(value)
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as handle:
+            json.dump({'name': 'Example'}, handle)
+            handle.flush()
+            with self.assertRaises(ValueError):
+                providers.load(handle.name)
@@ -0,0 +1,108 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+import pycares
+
+import email_normalize
+
+
+class FakeDNSResolver:
+
+    def __init__(self, name_servers=None, **kwargs):
+        self.name_servers = name_servers
+        self.options = kwargs
+        self.queries = []
+
+    async def query(self, host, qtype):
+        self.queries.append(host)
+        await asyncio.sleep(0.01)
+        return [mock.Mock(priority=10, host='mx.zoho.com', ttl=60)]
+
+
+class ResolverPoolTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        patcher = mock.patch('aiodns.DNSResolver', FakeDNSResolver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_resolvers_created_on_first_query(self):
+        pool = email_normalize.ResolverPool(size=2)
+        self.assertListEqual(pool._resolvers, [])
+        await pool.query('example.com', 'MX')
+        self.assertEqual(len(pool._resolvers), 2)
+
+    async def test_options(self):
+        pool = email_normalize.ResolverPool(
+            timeout=1.5, tries=2, rotate=True, tcp=True, ndots=1)
+        await pool.query('example.com', 'MX')
+        self.assertDictEqual(pool._resolvers[0].options, {
+            'timeout': 1.5, 'tries': 2, 'rotate': True, 'ndots': 1,
+            'flags': pycares.ARES_FLAG_USEVC})
+
+    async def test_spread_across_name_servers(self):
+        pool = email_normalize.ResolverPool(['a', 'b', 'c'], size=4)
+        await pool.query('example.com', 'MX')
+        self.assertListEqual(
+            [resolver.name_servers for resolver in pool._resolvers],
+            [['a', 'b', 'c'], ['b', 'c', 'a'], ['c', 'a', 'b'],
+             ['a', 'b', 'c']])
+
+    async def test_least_outstanding_resolver(self):
+        pool = email_normalize.ResolverPool(size=3)
+        await asyncio.gather(*[
+            pool.query('{}.com'.format(offset), 'MX')
+            for offset in range(0, 6)])
+        self.assertListEqual(
+            [len(resolver.queries) for resolver in pool._resolvers],
+            [2, 2, 2])
+        self.assertEqual(pool.outstanding, 0)
+
+    async def test_max_queries(self):
+        pool = email_normalize.ResolverPool(size=2, max_queries=3)
+        observed = []
+
+        async def query(host):
+            await pool.query(host, 'MX')
+            observed.append(pool.outstanding)
+
+        tasks = [asyncio.ensure_future(query('{}.com'.format(offset)))
+                 for offset in range(0, 10)]
+        await asyncio.sleep(0.005)
+        self.assertEqual(pool.outstanding, 3)
+        await asyncio.gather(*tasks)
+        self.assertLessEqual(max(observed), 3)
+
+    async def test_shared_between_normalizers(self):
+        pool = email_normalize.ResolverPool(max_queries=1)
+        normalizers = [
+            email_normalize.Normalizer(
+                resolver=pool, cache=email_normalize.LFRUCache())
+            for _offset in range(0, 2)]
+        await asyncio.gather(
+            normalizers[0].mx_records('example.com'),
+            normalizers[1].mx_records('example.org'))
+        self.assertListEqual(
+            sorted(pool._resolvers[0].queries),
+            ['example.com', 'example.org'])
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            email_normalize.ResolverPool(size=0)
+
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_resolver_stack_not_imported(self):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import sys\n'
+             'import email_normalize\n'
+             'email_normalize.split_address("Foo <foo@gmail.com>")\n'
+             'print(sorted({"aiodns", "pycares", "sqlite3"} & '
+             'set(sys.modules)))'],
+            capture_output=True, check=True, text=True).stdout
+        self.assertEqual(output.strip(), '[]')